@@ -41,6 +41,7 @@ setup(
         'tldextract',
         'pexpect',
         'troposphere >= 3.2.2',
+        'PyYAML',
         'awacs',
         'deepdiff >= 4.3.2',
         'gitpython',
@@ -13,6 +13,8 @@ EC2 Launch Mangaer is currently linux-centric and does not yet work with Windows
 
 
 import base64
+import gzip
+import io
 import paco.cftemplates
 import json
 import os
@@ -113,23 +115,44 @@ fi
         self.bundle_files.append(file_config)
 
     def build(self):
-        """Builds the launch bundle. Puts the files for the bundle in a bundles tmp dir
-        and then creates a gzip archive.
-        Updates the bundle cache id based on the contents of the bundle.
+        """Updates the bundle cache id based on the contents of the bundle and, if the contents
+        have changed since the bundle was last uploaded, builds the gzip archive of the bundle files.
         """
-        orig_cwd = os.getcwd()
-        pathlib.Path(self.bundles_path).mkdir(parents=True, exist_ok=True)
-        os.chdir(self.bundles_path)
-        pathlib.Path(self.bundle_folder).mkdir(parents=True, exist_ok=True)
         contents_md5 = ""
         for bundle_file in self.bundle_files:
-            utils.write_to_file(self.bundle_folder, bundle_file['name'], bundle_file['contents'])
             contents_md5 += md5sum(str_data=bundle_file['contents'])
-        lb_tar = tarfile.open(self.package_filename, "w:gz")
-        lb_tar.add(self.bundle_folder, recursive=True)
-        lb_tar.close()
-        os.chdir(orig_cwd)
         self.cache_id = md5sum(str_data=contents_md5)
+        if not self.manager.paco_ctx.nocache and self.is_cached() and os.path.isfile(self.package_path):
+            return
+        pathlib.Path(self.bundles_path).mkdir(parents=True, exist_ok=True)
+        with open(self.package_path, 'wb') as package_fd:
+            package_fd.write(self.build_archive())
+
+    def build_archive(self):
+        """Returns a gzip tar archive of the bundle files as bytes. Archive headers have fixed
+        owners and timestamps, so the same files always create the same archive."""
+        files = {}
+        for bundle_file in self.bundle_files:
+            files[bundle_file['name']] = bundle_file['contents'].encode('utf-8')
+        tar_bytes = io.BytesIO()
+        with tarfile.open(fileobj=tar_bytes, mode="w", format=tarfile.GNU_FORMAT) as lb_tar:
+            folder_info = self.new_tarinfo(self.bundle_folder, tarfile.DIRTYPE, 0o755)
+            lb_tar.addfile(folder_info)
+            for name in sorted(files.keys()):
+                file_info = self.new_tarinfo(f'{self.bundle_folder}/{name}', tarfile.REGTYPE, 0o644)
+                file_info.size = len(files[name])
+                lb_tar.addfile(file_info, io.BytesIO(files[name]))
+        return gzip.compress(tar_bytes.getvalue(), mtime=0)
+
+    def new_tarinfo(self, name, tar_type, mode):
+        "TarInfo with fixed ownership and timestamp"
+        tar_info = tarfile.TarInfo(name)
+        tar_info.type = tar_type
+        tar_info.mode = mode
+        tar_info.mtime = 0
+        tar_info.uid = tar_info.gid = 0
+        tar_info.uname = tar_info.gname = ''
+        return tar_info
 
 
 class EC2LaunchManager():
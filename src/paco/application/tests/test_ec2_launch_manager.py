@@ -0,0 +1,100 @@
+from paco.application.ec2_launch_manager import LaunchBundle
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+
+
+class FakePacoContext():
+    nocache = False
+
+
+class FakeManager():
+
+    def __init__(self, build_path):
+        self.build_path = build_path
+        self.paco_ctx = FakePacoContext()
+
+
+class FakeResource():
+    group_name = 'things'
+    name = 'web'
+    paco_ref_parts = 'netenv.mynet.dev.us-west-2.applications.app.groups.things.resources.web'
+
+
+class TestLaunchBundle(unittest.TestCase):
+
+    def setUp(self):
+        self.build_dir = tempfile.TemporaryDirectory()
+        self.manager = FakeManager(self.build_dir.name)
+        self.bundle = self.new_bundle()
+
+    def tearDown(self):
+        self.build_dir.cleanup()
+
+    def new_bundle(self):
+        bundle = LaunchBundle(FakeResource(), self.manager, 'SSM')
+        bundle.add_file('launch.sh', '#!/bin/bash\necho launch\n')
+        bundle.add_file('config.json', '{}')
+        return bundle
+
+    def write_cache_id(self, bundle):
+        with open(bundle.package_cache_id_path, 'w') as cache_fd:
+            cache_fd.write(bundle.cache_id)
+
+    def test_build_archive_is_deterministic(self):
+        archive = self.bundle.build_archive()
+        self.assertEqual(archive, self.bundle.build_archive())
+        self.assertEqual(archive, self.new_bundle().build_archive())
+        # gzip header MTIME is zero
+        self.assertEqual(archive[4:8], b'\x00\x00\x00\x00')
+
+        with tarfile.open(fileobj=io.BytesIO(archive), mode='r:gz') as lb_tar:
+            members = lb_tar.getmembers()
+            self.assertEqual([member.name for member in members], ['SSM', 'SSM/config.json', 'SSM/launch.sh'])
+            self.assertEqual([member.mode for member in members], [0o755, 0o644, 0o644])
+            for member in members:
+                self.assertEqual(member.mtime, 0)
+                self.assertEqual((member.uid, member.gid, member.uname, member.gname), (0, 0, '', ''))
+            self.assertEqual(lb_tar.extractfile('SSM/config.json').read(), b'{}')
+
+    def test_build_skips_cached_package(self):
+        self.bundle.build()
+        self.write_cache_id(self.bundle)
+        # a stale package proves it is not rewritten
+        with open(self.bundle.package_path, 'wb') as package_fd:
+            package_fd.write(b'cached')
+        bundle = self.new_bundle()
+        bundle.build()
+        self.assertEqual(bundle.cache_id, self.bundle.cache_id)
+        with open(bundle.package_path, 'rb') as package_fd:
+            self.assertEqual(package_fd.read(), b'cached')
+
+    def test_build_with_nocache(self):
+        self.bundle.build()
+        self.write_cache_id(self.bundle)
+        with open(self.bundle.package_path, 'wb') as package_fd:
+            package_fd.write(b'cached')
+        self.manager.paco_ctx.nocache = True
+        self.bundle.build()
+        with open(self.bundle.package_path, 'rb') as package_fd:
+            self.assertEqual(package_fd.read(), self.bundle.build_archive())
+
+    def test_build_missing_package(self):
+        self.bundle.build()
+        self.write_cache_id(self.bundle)
+        os.remove(self.bundle.package_path)
+        self.bundle.build()
+        with open(self.bundle.package_path, 'rb') as package_fd:
+            self.assertEqual(package_fd.read(), self.bundle.build_archive())
+
+    def test_build_changed_contents(self):
+        self.bundle.build()
+        self.write_cache_id(self.bundle)
+        bundle = self.new_bundle()
+        bundle.add_file('extra.sh', 'echo extra')
+        bundle.build()
+        self.assertNotEqual(bundle.cache_id, self.bundle.cache_id)
+        with open(bundle.package_path, 'rb') as package_fd:
+            self.assertEqual(package_fd.read(), bundle.build_archive())
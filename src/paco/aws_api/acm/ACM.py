@@ -1,9 +1,76 @@
 from botocore.config import Config
 import tldextract
 from . import aws_helpers
+import threading
 import time
 
 
+# Route 53 accepts up to 1000 changes in a change batch
+MAX_CHANGES_PER_BATCH = 1000
+
+
+def get_route_53_client(account_ctx):
+    return account_ctx.get_aws_client(
+        'route53',
+        client_config=Config(retries={'max_attempts': 10})
+    )
+
+
+class HostedZoneIndex():
+    "Route 53 HostedZoneIds for an account keyed by zone name"
+
+    def __init__(self, account_ctx):
+        self.account_ctx = account_ctx
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.zones = {}
+
+    def load(self):
+        "List every hosted zone in the account"
+        zones = {}
+        paginator = get_route_53_client(self.account_ctx).get_paginator('list_hosted_zones')
+        for page in paginator.paginate():
+            for zone in page['HostedZones']:
+                # the first zone listed with a name is used, as list_hosted_zones did before
+                zones.setdefault(zone['Name'].lower(), zone['Id'].split('/')[-1])
+        self.zones = zones
+        self.loaded = True
+
+    def reload(self):
+        "Reload the index, for zones created since it was loaded"
+        with self.lock:
+            self.load()
+
+    def get_zone_id(self, record_name):
+        """Return the HostedZoneId of the zone with the longest name that is a parent of record_name and is
+        within its registered domain (e.g. given _x.www.example.com, try www.example.com and then example.com)
+        or None if there is no such zone."""
+        with self.lock:
+            if self.loaded == False:
+                self.load()
+            zones = self.zones
+        domain_tld_info = tldextract.extract(record_name)
+        registered_domain = '.'.join([domain_tld_info.domain, domain_tld_info.suffix])
+        subdomain_labels = domain_tld_info.subdomain.lower().split('.')[1:]
+        for index in range(len(subdomain_labels) + 1):
+            zone_name = '.'.join(subdomain_labels[index:] + [registered_domain.lower()]) + '.'
+            if zone_name in zones:
+                return zones[zone_name]
+        return None
+
+
+hosted_zone_indexes = {}
+hosted_zone_indexes_lock = threading.Lock()
+
+def get_hosted_zone_index(account_ctx):
+    "Return the HostedZoneIndex for an account"
+    key = account_ctx.get_name()
+    with hosted_zone_indexes_lock:
+        if key not in hosted_zone_indexes:
+            hosted_zone_indexes[key] = HostedZoneIndex(account_ctx)
+        return hosted_zone_indexes[key]
+
+
 class DNSValidatedACMCertClient():
 
     def __init__(self, account_ctx, domain, region):
@@ -20,9 +87,7 @@ class DNSValidatedACMCertClient():
     @property
     def route_53_client(self):
         if hasattr(self, '_route_53_client') == False:
-            self._route_53_client = self.account_ctx.get_aws_client(
-                'route53',
-                client_config=Config(retries={'max_attempts': 10}))
+            self._route_53_client = get_route_53_client(self.account_ctx)
         return self._route_53_client
 
     def get_certificate_arn_from_response(self, response):
@@ -93,43 +158,7 @@ class DNSValidatedACMCertClient():
         """Return the HostedZoneId of the zone tied to the root domain of the domain the
         to protect (e.g. given www.cnn.com, return cnn.com) if it exists in Route53.
         """
-
-        def get_domain_from_host(validation_dns_record):
-            """ Given an FQDN, return the domain
-                portion of a host
-            """
-            domain_tld_info = tldextract.extract(validation_dns_record)
-            return "%s.%s" % (domain_tld_info.domain, domain_tld_info.suffix)
-
-        def domain_matches_hosted_zone(domain, zone):
-            return zone.get('Name') == "%s." % (domain)
-
-        def get_zone_id_from_id_string(zone_id_string):
-            return zone_id_string.split('/')[-1]
-
-        domain_tld_info = tldextract.extract(validation_dns_record)
-        hosted_zone_subdomain = domain_tld_info.subdomain
-        while True:
-            hosted_zone_subdomain_list = hosted_zone_subdomain.split(".",1)
-            hosted_zone_domain = '.'.join([
-                domain_tld_info.domain,
-                domain_tld_info.suffix
-            ])
-            if len(hosted_zone_subdomain_list) > 1:
-                hosted_zone_subdomain = hosted_zone_subdomain.split(".", 1)[1]
-                hosted_zone_domain = '.'.join([
-                    hosted_zone_subdomain,
-                    domain_tld_info.domain,
-                    domain_tld_info.suffix
-                ])
-            list_hosted_zones_paginator = self.route_53_client.get_paginator('list_hosted_zones')
-            route53_zones = list_hosted_zones_paginator.paginate().build_full_result()
-            for zone in route53_zones.get('HostedZones'):
-                if domain_matches_hosted_zone(hosted_zone_domain, zone) == True:
-                    return get_zone_id_from_id_string(zone.get('Id'))
-            if len(hosted_zone_subdomain_list) == 1:
-                return None
-        return None
+        return get_hosted_zone_index(self.account_ctx).get_zone_id(validation_dns_record)
 
     def get_resource_record_data(self, r):
         """
@@ -169,18 +198,35 @@ class DNSValidatedACMCertClient():
             for record in domain_validation_records
         ]
         unique_changes = self.remove_duplicate_upsert_records(changes)
+        # group the changes by hosted zone
+        hosted_zone_index = get_hosted_zone_index(self.account_ctx)
+        zone_changes = {}
+        missing_changes = []
         for change in unique_changes:
-            record_name = change.get('ResourceRecordSet').get('Name')
-            hosted_zone_id = self.get_hosted_zone_id(record_name)
+            hosted_zone_id = hosted_zone_index.get_zone_id(change['ResourceRecordSet']['Name'])
             if hosted_zone_id == None:
-                print("ACM: Unable to get Hosted Zone id for: {}".format(record_name))
-                continue
-            response = self.route_53_client.change_resource_record_sets(
-            HostedZoneId=hosted_zone_id,
-            ChangeBatch={
-                'Changes': [change]
-            })
-            if not aws_helpers.response_succeeded(response):
-                print("Failed to create Route53 record set: {}".format(response))
-            #else:
-            #    print("Successfully created Route 53 record set for {}".format(record_name))
+                missing_changes.append(change)
+            else:
+                zone_changes.setdefault(hosted_zone_id, []).append(change)
+        if len(missing_changes) > 0:
+            # the zone may have been created after the index was loaded
+            hosted_zone_index.reload()
+            for change in missing_changes:
+                record_name = change['ResourceRecordSet']['Name']
+                hosted_zone_id = hosted_zone_index.get_zone_id(record_name)
+                if hosted_zone_id == None:
+                    print("ACM: Unable to get Hosted Zone id for: {}".format(record_name))
+                    continue
+                zone_changes.setdefault(hosted_zone_id, []).append(change)
+
+        # one change batch per hosted zone
+        for hosted_zone_id, changes in zone_changes.items():
+            for index in range(0, len(changes), MAX_CHANGES_PER_BATCH):
+                response = self.route_53_client.change_resource_record_sets(
+                    HostedZoneId=hosted_zone_id,
+                    ChangeBatch={
+                        'Changes': changes[index:index + MAX_CHANGES_PER_BATCH]
+                    }
+                )
+                if not aws_helpers.response_succeeded(response):
+                    print("Failed to create Route53 record set: {}".format(response))
@@ -0,0 +1,131 @@
+from paco.aws_api.acm import ACM
+from paco.aws_api.acm.ACM import DNSValidatedACMCertClient, HostedZoneIndex
+import contextlib
+import io
+import unittest
+
+
+class FakeRoute53():
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.list_calls = 0
+        self.change_calls = []
+
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self):
+        self.list_calls += 1
+        zones = [{'Name': name, 'Id': '/hostedzone/' + zone_id} for name, zone_id in self.zones.items()]
+        # two pages of zones
+        return [{'HostedZones': zones[:1]}, {'HostedZones': zones[1:]}]
+
+    def change_resource_record_sets(self, HostedZoneId, ChangeBatch):
+        self.change_calls.append((HostedZoneId, ChangeBatch['Changes']))
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+
+class FakeACM():
+
+    def __init__(self, record_names):
+        self.record_names = record_names
+
+    def describe_certificate(self, CertificateArn):
+        return {'Certificate': {'DomainValidationOptions': [
+            {'ResourceRecord': {'Type': 'CNAME', 'Name': name, 'Value': 'validation.acm-validations.aws.'}}
+            for name in self.record_names
+        ]}}
+
+
+class FakeAccountContext():
+
+    def __init__(self, route_53, acm=None):
+        self.route_53 = route_53
+        self.acm = acm
+
+    def get_name(self):
+        return 'test'
+
+    def get_aws_client(self, client_name, aws_region=None, client_config=None):
+        if client_name == 'route53':
+            return self.route_53
+        return self.acm
+
+
+class TestHostedZoneIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.route_53 = FakeRoute53({
+            'example.com.': 'ZEXAMPLE',
+            'www.example.com.': 'ZWWW',
+            'example.co.uk.': 'ZCOUK',
+        })
+        self.index = HostedZoneIndex(FakeAccountContext(self.route_53))
+
+    def test_longest_zone_name(self):
+        self.assertEqual(self.index.get_zone_id('_a.www.example.com.'), 'ZWWW')
+        self.assertEqual(self.index.get_zone_id('_a.api.example.com.'), 'ZEXAMPLE')
+        self.assertEqual(self.index.get_zone_id('_a.example.com.'), 'ZEXAMPLE')
+        # the zones are listed once
+        self.assertEqual(self.route_53.list_calls, 1)
+
+    def test_multi_part_suffix(self):
+        self.assertEqual(self.index.get_zone_id('_a.www.example.co.uk.'), 'ZCOUK')
+
+    def test_unknown_domain(self):
+        self.assertEqual(self.index.get_zone_id('_a.www.example.org.'), None)
+        # zones outside the registered domain are never matched
+        self.assertEqual(self.index.get_zone_id('_a.co.uk.'), None)
+
+
+class TestDomainValidationRecords(unittest.TestCase):
+
+    def setUp(self):
+        ACM.hosted_zone_indexes.clear()
+
+    def tearDown(self):
+        ACM.hosted_zone_indexes.clear()
+
+    def create_records(self, zones, record_names):
+        route_53 = FakeRoute53(zones)
+        account_ctx = FakeAccountContext(route_53, FakeACM(record_names))
+        client = DNSValidatedACMCertClient(account_ctx, 'example.com', 'us-west-2')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            client.create_domain_validation_records('arn:aws:acm:us-west-2:123456789012:certificate/test')
+        return route_53, output.getvalue()
+
+    def test_one_change_batch_per_zone(self):
+        route_53, output = self.create_records(
+            {'example.com.': 'ZEXAMPLE', 'example.org.': 'ZORG'},
+            ['_a.example.com.', '_b.www.example.com.', '_a.example.org.', '_a.example.com.'],
+        )
+        changes = dict(route_53.change_calls)
+        self.assertEqual(len(route_53.change_calls), 2)
+        self.assertEqual(
+            [change['ResourceRecordSet']['Name'] for change in changes['ZEXAMPLE']],
+            ['_a.example.com.', '_b.www.example.com.']
+        )
+        self.assertEqual(len(changes['ZORG']), 1)
+        self.assertEqual(output, '')
+
+    def test_large_change_batches_are_split(self):
+        record_names = ['_{}.example.com.'.format(index) for index in range(ACM.MAX_CHANGES_PER_BATCH + 1)]
+        route_53, output = self.create_records({'example.com.': 'ZEXAMPLE'}, record_names)
+        self.assertEqual(
+            [(zone_id, len(changes)) for zone_id, changes in route_53.change_calls],
+            [('ZEXAMPLE', ACM.MAX_CHANGES_PER_BATCH), ('ZEXAMPLE', 1)]
+        )
+
+    def test_missing_zone_reloads_once(self):
+        route_53, output = self.create_records(
+            {'example.com.': 'ZEXAMPLE'},
+            ['_a.example.com.', '_a.example.org.', '_b.example.org.'],
+        )
+        # loaded, then reloaded once for both missing records
+        self.assertEqual(route_53.list_calls, 2)
+        self.assertEqual(route_53.change_calls[0][0], 'ZEXAMPLE')
+        self.assertEqual(len(route_53.change_calls), 1)
+        self.assertEqual(output.count("Unable to get Hosted Zone id"), 2)
+        self.assertIn("Unable to get Hosted Zone id for: _a.example.org.", output)
@@ -1,45 +1,101 @@
 from paco.core.exception import InvalidFilesystemPath
-from paco.utils.zip import patched_make_zipfile
-from paco.utils import md5sum
+from paco.core.yaml import read_yaml_file
+from paco.utils.zip import list_zip_entries, make_zipfile, write_zip_entry
+from paco.utils import md5sum, write_to_file
 from pathlib import Path
 from os.path import basename
 import os
-import shutil
 import tempfile
 import zipfile
 
 
 def create_zip_artifact(artifact_prefix, src_dir):
     "create zip file from directory"
-    # patch make_archive so that it includes symbolic links
     # ToDo: excludes __pycache__ - make the excluded files depend upon Lambda runtime
-    shutil._ARCHIVE_FORMATS['zip'] = (patched_make_zipfile, [], "ZIP file")
     zip_output = tempfile.gettempdir() + os.sep + artifact_prefix + '.zip'
     if src_dir.is_file():
-        zipfile.ZipFile(zip_output, mode='w').write(src_dir, basename(src_dir))
+        os.makedirs(os.path.dirname(zip_output), exist_ok=True)
+        with zipfile.ZipFile(zip_output, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+            write_zip_entry(zf, src_dir, basename(src_dir))
     else:
-        shutil.make_archive(zip_output, 'zip', str(src_dir))
+        make_zipfile(zip_output, str(src_dir))
     md5_hash = md5sum(zip_output)
     return zip_output, md5_hash
 
-def init_lambda_code(paco_buckets, resource, src, account_ctx, aws_region, is_zip=False):
-    "Creates an S3 Bucket and uploads an artifact only if one does not yet exist"
+def source_fingerprint(src_path, previous_files):
+    """Fingerprint the files of a Lambda source directory or zip file.
+    File contents are only hashed if a file's size or mtime differs from previous_files.
+    Returns the fingerprint and a dict of [size, mtime, md5] lists keyed by file path."""
+    if src_path.is_file():
+        entries = [(basename(src_path), str(src_path))]
+    else:
+        entries = list_zip_entries(str(src_path))
+    files = {}
+    fingerprint = []
+    for arcname, path in entries:
+        if os.path.isdir(path):
+            fingerprint.append(f'{arcname}/')
+            continue
+        file_stat = os.stat(path)
+        previous = previous_files.get(arcname, None)
+        if previous != None and previous[0] == file_stat.st_size and previous[1] == file_stat.st_mtime_ns:
+            file_md5 = previous[2]
+        else:
+            file_md5 = md5sum(path)
+        files[arcname] = [file_stat.st_size, file_stat.st_mtime_ns, file_md5]
+        fingerprint.append(f'{arcname}:{oct(file_stat.st_mode & 0o777)}:{file_md5}')
+    return md5sum(str_data='\n'.join(fingerprint)), files
+
+def load_fingerprint(fingerprint_path):
+    "Load a saved Lambda source fingerprint or return an empty dict"
+    if fingerprint_path == None or not fingerprint_path.exists():
+        return {}
+    try:
+        saved = read_yaml_file(fingerprint_path)
+    except Exception:
+        return {}
+    if not isinstance(saved, dict):
+        return {}
+    return saved
+
+def init_lambda_code(paco_buckets, resource, src, account_ctx, aws_region, is_zip=False, fingerprint_path=None):
+    """Creates an S3 Bucket and uploads an artifact only if one does not yet exist.
+    If a fingerprint_path is given, the source files are fingerprinted and the artifact is
+    only zipped when the fingerprint differs from the previous run or the artifact is no
+    longer in S3."""
+    src_path = Path(src)
+    if not is_zip and not src_path.exists():
+        raise InvalidFilesystemPath(f"Source directory for Lambda code does not exist: {src}")
+    bucket_name = paco_buckets.get_bucket_name(account_ctx, aws_region)
+    fingerprint = None
+    if fingerprint_path != None:
+        saved = load_fingerprint(fingerprint_path)
+        fingerprint, files = source_fingerprint(src_path, saved.get('files', None) or {})
+        if saved.get('fingerprint', None) == fingerprint and saved.get('bucket_name', None) == bucket_name \
+            and 'artifact_name' in saved and 'md5_hash' in saved \
+            and paco_buckets.is_object_in_bucket(saved['artifact_name'], account_ctx, aws_region):
+            return bucket_name, saved['artifact_name'], saved['md5_hash']
+
     zip_output = src
     artifact_prefix = f'Paco/LambdaArtifacts/{resource.paco_ref_parts}'
     # create Zip file from src directory
     if not is_zip:
-        src_dir = Path(src)
-        if not src_dir.exists():
-            raise InvalidFilesystemPath(f"Source directory for Lambda code does not exist: {src}")
-        zip_output, md5_hash = create_zip_artifact(artifact_prefix, src_dir)
+        zip_output, md5_hash = create_zip_artifact(artifact_prefix, src_path)
     # create md5 of Zip file
     else:
         md5_hash = md5sum(src)
     artifact_name = f'Paco/LambdaArtifacts/{resource.paco_ref_parts}-{md5_hash}.zip'
-    if paco_buckets.is_object_in_bucket(artifact_name, account_ctx, aws_region):
-        bucket_name = paco_buckets.get_bucket_name(account_ctx, aws_region)
-    else:
+    if not paco_buckets.is_object_in_bucket(artifact_name, account_ctx, aws_region):
         bucket_name, artifact_name = upload_lambda_code(paco_buckets, zip_output, artifact_name, account_ctx, aws_region)
+
+    if fingerprint_path != None:
+        write_to_file(fingerprint_path.parent, fingerprint_path.name, {
+            'fingerprint': fingerprint,
+            'bucket_name': bucket_name,
+            'artifact_name': artifact_name,
+            'md5_hash': md5_hash,
+            'files': files,
+        })
     return bucket_name, artifact_name, md5_hash
 
 def upload_lambda_code(paco_buckets, zip_output, artifact_name, account_ctx, aws_region):
@@ -0,0 +1,68 @@
+from paco.aws_api.awslambda.code import init_lambda_code
+from paco.utils import md5sum
+from paco.utils.zip import make_zipfile
+import os
+import pathlib
+import tempfile
+import time
+import unittest
+
+
+class FakeResource():
+    paco_ref_parts = 'netenv.mynet.dev.us-west-2.applications.app.groups.lambda.resources.function'
+
+
+class FakePacoBuckets():
+
+    def __init__(self):
+        self.uploads = []
+        self.head_requests = 0
+
+    def get_bucket_name(self, account_ctx, region):
+        return 'paco-bucket'
+
+    def is_object_in_bucket(self, s3_key, account_ctx, region):
+        self.head_requests += 1
+        return s3_key in self.uploads
+
+    def upload_file(self, file_location, s3_key, account_ctx, region):
+        self.uploads.append(s3_key)
+        return 'paco-bucket'
+
+
+class TestLambdaCode(unittest.TestCase):
+
+    def setUp(self):
+        self.src_dir = pathlib.Path(tempfile.mkdtemp())
+        (self.src_dir / 'index.py').write_text('def handler(event, context):\n    return event\n')
+        (self.src_dir / 'lib').mkdir()
+        (self.src_dir / 'lib' / 'util.py').write_text('VALUE = 1\n')
+        self.fingerprint_path = pathlib.Path(tempfile.mkdtemp()) / 'function.yaml'
+
+    def test_reproducible_zip(self):
+        out_dir = pathlib.Path(tempfile.mkdtemp())
+        first = make_zipfile(str(out_dir / 'first.zip'), str(self.src_dir))
+        # touching the files does not change the zip
+        time.sleep(0.01)
+        os.utime(self.src_dir / 'index.py')
+        second = make_zipfile(str(out_dir / 'second.zip'), str(self.src_dir))
+        self.assertEqual(md5sum(first), md5sum(second))
+
+    def test_unchanged_source_is_not_zipped(self):
+        paco_buckets = FakePacoBuckets()
+        args = (paco_buckets, FakeResource(), str(self.src_dir), None, 'us-west-2')
+        bucket_name, artifact_name, md5_hash = init_lambda_code(*args, fingerprint_path=self.fingerprint_path)
+        self.assertEqual(len(paco_buckets.uploads), 1)
+        self.assertEqual(paco_buckets.head_requests, 1)
+        self.assertEqual(init_lambda_code(*args, fingerprint_path=self.fingerprint_path), (bucket_name, artifact_name, md5_hash))
+        self.assertEqual(paco_buckets.head_requests, 2)
+        self.assertEqual(len(paco_buckets.uploads), 1)
+        # an artifact that is no longer in S3 is uploaded again
+        paco_buckets.uploads.remove(artifact_name)
+        self.assertEqual(init_lambda_code(*args, fingerprint_path=self.fingerprint_path), (bucket_name, artifact_name, md5_hash))
+        self.assertEqual(paco_buckets.uploads, [artifact_name])
+        # changed source is zipped and uploaded
+        (self.src_dir / 'lib' / 'util.py').write_text('VALUE = 2\n')
+        _, new_artifact_name, _ = init_lambda_code(*args, fingerprint_path=self.fingerprint_path)
+        self.assertNotEqual(new_artifact_name, artifact_name)
+        self.assertEqual(len(paco_buckets.uploads), 2)
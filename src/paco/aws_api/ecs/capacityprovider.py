@@ -8,6 +8,12 @@ import re
 import time
 
 
+# Seconds between describes while waiting for a Capacity Provider update to finish
+POLL_INTERVAL = 1
+MAX_POLL_INTERVAL = 10
+POLL_BACKOFF_FACTOR = 1.5
+
+
 class ECSCapacityProviderClient():
 
     def __init__(self, project, account_ctx, aws_region, capacity_provider, asg_arn, asg):
@@ -93,6 +99,16 @@ class ECSCapacityProviderClient():
         )
         return response['capacityProviders'][0]
 
+    def wait_for_update(self, cp_name):
+        "Wait until a Capacity Provider update is no longer in progress and return its description"
+        interval = POLL_INTERVAL
+        while True:
+            cap_info = self.describe_capacity_provider(cp_name)
+            if cap_info['updateStatus'].find('PROGRESS') == -1:
+                return cap_info
+            time.sleep(interval)
+            interval = min(interval * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+
     def get_existing_capacity_providers(self):
         response = self.ecs_client.describe_capacity_providers()
         capacity_providers = []
@@ -116,13 +132,11 @@ class ECSCapacityProviderClient():
         "Create a new ECS Capacity Provider resource"
         existing_cps = self.get_existing_capacity_providers()
         if self.capacity_provider.aws_name in existing_cps:
-            # Wait for Provider to
-            while True:
-                cap_info = self.describe_capacity_provider(self.capacity_provider.aws_name)
-                if cap_info['updateStatus'] != 'DELETE_IN_PROGRESS':
-                    print(f"ERROR: Capacity Provider already exists with update status: {cap_info['updateStatus']}")
-                    raise
-                time.sleep(1)
+            # Wait for a Provider that is being deleted to finish deleting
+            cap_info = self.wait_for_update(self.capacity_provider.aws_name)
+            if cap_info['updateStatus'] != 'DELETE_COMPLETE':
+                print(f"ERROR: Capacity Provider already exists with update status: {cap_info['updateStatus']}")
+                raise
 
         response = self.ecs_client.create_capacity_provider(
             name=self.capacity_provider.aws_name,
@@ -180,11 +194,7 @@ class ECSCapacityProviderClient():
             print(error.response['Error']['Code'])
 
         # Wait for the capacity provider to finish updating
-        while True:
-            cap_info = self.describe_capacity_provider(cp_name_to_detach)
-            if cap_info['updateStatus'].find('PROGRESS') == -1:
-                break
-            time.sleep(1)
+        self.wait_for_update(cp_name_to_detach)
 
         # Remove scale-in protection from any ASG EC2 Instances
         asg_name = self.asg_arn.split('/')[1]
@@ -0,0 +1,112 @@
+"""
+Track an SSM Run Command across every instance that it targets.
+
+The status of every invocation of a command is read with one paginated
+list_command_invocations call per poll, instead of a get_command_invocation
+call for each instance. The result of each instance is reported as soon as it
+finishes. The poll interval backs off while no invocations finish and tracking
+stops when the command is done or the timeout is reached.
+"""
+
+import time
+
+
+# Statuses of a command or an invocation that is still running
+IN_PROGRESS_STATUSES = ('Pending', 'InProgress', 'Delayed', 'Cancelling')
+POLL_INTERVAL = 2
+MAX_POLL_INTERVAL = 30
+POLL_BACKOFF_FACTOR = 1.5
+# Seconds to track a command before giving up on the instances that have not finished
+COMMAND_TIMEOUT = 900
+
+
+class SSMCommandTracker():
+    "Waits for the invocations of an SSM Run Command to finish"
+
+    def __init__(
+        self,
+        account_ctx,
+        aws_region,
+        command_id,
+        poll_interval=POLL_INTERVAL,
+        max_poll_interval=MAX_POLL_INTERVAL,
+        timeout=COMMAND_TIMEOUT,
+    ):
+        self.account_ctx = account_ctx
+        self.aws_region = aws_region
+        self.command_id = command_id
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.timeout = timeout
+        self.ssm_client = account_ctx.get_aws_client('ssm', aws_region)
+        self.invocations = {}
+        self.reported = set()
+
+    def get_command_status(self):
+        "Status of the command, or None if SSM does not list it yet"
+        response = self.ssm_client.list_commands(CommandId=self.command_id)
+        if len(response['Commands']) == 0:
+            return None
+        return response['Commands'][0]['Status']
+
+    def list_invocations(self):
+        "Return a dict of the invocations of the command keyed by InstanceId"
+        invocations = {}
+        kwargs = {'CommandId': self.command_id, 'Details': True}
+        while True:
+            response = self.ssm_client.list_command_invocations(**kwargs)
+            for invocation in response['CommandInvocations']:
+                invocations[invocation['InstanceId']] = invocation
+            if not response.get('NextToken', None):
+                break
+            kwargs['NextToken'] = response['NextToken']
+        return invocations
+
+    def report(self, invocation):
+        "Print the result of a finished invocation"
+        instance_id = invocation['InstanceId']
+        if invocation['Status'] == 'Success':
+            print(f"ssm command: {self.command_id}: success on {instance_id}")
+            return
+        print(f"Command status: {instance_id}: {invocation['Status']}: {invocation['StatusDetails']}")
+        for plugin in invocation.get('CommandPlugins', []):
+            if plugin.get('Output', None):
+                print(f"Command output: {instance_id}: {plugin['Name']}: {plugin['Output']}")
+
+    def poll(self):
+        """Poll the command once and report newly finished invocations.
+        Returns a tuple of (done, number of invocations that finished since the last poll)."""
+        command_status = self.get_command_status()
+        self.invocations = self.list_invocations()
+        finished = 0
+        for instance_id in sorted(self.invocations.keys()):
+            invocation = self.invocations[instance_id]
+            if instance_id in self.reported or invocation['Status'] in IN_PROGRESS_STATUSES:
+                continue
+            self.reported.add(instance_id)
+            self.report(invocation)
+            finished += 1
+        done = command_status != None and command_status not in IN_PROGRESS_STATUSES
+        return done, finished
+
+    def wait(self):
+        """Wait for the command to finish on every instance and return the invocations keyed by InstanceId.
+        Instances that have not finished when the timeout is reached are reported and left running."""
+        deadline = time.time() + self.timeout
+        interval = self.poll_interval
+        while True:
+            done, finished = self.poll()
+            if done:
+                return self.invocations
+            if time.time() + interval > deadline:
+                pending = sorted(set(self.invocations.keys()) - self.reported)
+                message = f"ssm command: {self.command_id}: timed out after {self.timeout} seconds"
+                if len(pending) > 0:
+                    message += f" waiting for: {', '.join(pending)}"
+                print(message)
+                return self.invocations
+            time.sleep(interval)
+            if finished > 0:
+                interval = self.poll_interval
+            else:
+                interval = min(interval * POLL_BACKOFF_FACTOR, self.max_poll_interval)
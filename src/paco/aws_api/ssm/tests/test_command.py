@@ -0,0 +1,62 @@
+from paco.aws_api.ssm.command import SSMCommandTracker
+import unittest
+
+
+class FakeSSMClient():
+    "Each poll finishes one more instance. Invocations are returned two per page."
+
+    def __init__(self, instance_ids):
+        self.instance_ids = instance_ids
+        self.polls = 0
+        self.calls = []
+
+    def list_commands(self, CommandId):
+        self.calls.append('list_commands')
+        self.polls += 1
+        status = 'Success' if self.polls >= len(self.instance_ids) else 'InProgress'
+        return {'Commands': [{'CommandId': CommandId, 'Status': status}]}
+
+    def list_command_invocations(self, CommandId, Details, NextToken=None):
+        self.calls.append('list_command_invocations')
+        start = int(NextToken or 0)
+        invocations = []
+        for index, instance_id in enumerate(self.instance_ids[start:start + 2], start):
+            invocations.append({
+                'InstanceId': instance_id,
+                'Status': 'Success' if index < self.polls else 'InProgress',
+                'StatusDetails': '',
+            })
+        response = {'CommandInvocations': invocations}
+        if start + 2 < len(self.instance_ids):
+            response['NextToken'] = str(start + 2)
+        return response
+
+
+class FakeAccountContext():
+
+    def __init__(self, ssm_client):
+        self.ssm_client = ssm_client
+
+    def get_aws_client(self, service, aws_region, force=False):
+        return self.ssm_client
+
+
+class TestSSMCommandTracker(unittest.TestCase):
+
+    def test_wait(self):
+        instance_ids = ['i-{}'.format(index) for index in range(5)]
+        ssm_client = FakeSSMClient(instance_ids)
+        tracker = SSMCommandTracker(FakeAccountContext(ssm_client), 'us-west-2', 'command-id', poll_interval=0)
+        invocations = tracker.wait()
+        self.assertEqual(sorted(invocations.keys()), instance_ids)
+        self.assertEqual(tracker.reported, set(instance_ids))
+        # one list_commands and three pages of invocations per poll
+        self.assertEqual(ssm_client.polls, 5)
+        self.assertEqual(len(ssm_client.calls), 5 * 4)
+
+    def test_timeout(self):
+        ssm_client = FakeSSMClient(['i-1', 'i-2', 'i-3'])
+        tracker = SSMCommandTracker(FakeAccountContext(ssm_client), 'us-west-2', 'command-id', poll_interval=0, timeout=0)
+        tracker.wait()
+        self.assertEqual(ssm_client.polls, 1)
+        self.assertEqual(tracker.reported, set(['i-1']))
@@ -1,58 +1,86 @@
-from paco.cftemplates.cftemplates import StackTemplate
-from paco.cftemplates.vpc import VPC
-from paco.cftemplates.segment import Segment
-from paco.cftemplates.security_groups import SecurityGroups
-from paco.cftemplates.lb import ALB
-from paco.cftemplates.lb import NLB
-from paco.cftemplates.asg import ASG
-from paco.cftemplates.iam_managed_policies import IAMManagedPolicies
-from paco.cftemplates.iam_roles import IAMRoles
-from paco.cftemplates.iam_sl_roles import IAMSLRoles
-from paco.cftemplates.s3 import S3
-from paco.cftemplates.s3 import S3BucketPolicy
-from paco.cftemplates.codecommit import CodeCommit
-from paco.cftemplates.codedeploy import CodeDeploy
-from paco.cftemplates.codebuild import CodeBuild
-from paco.cftemplates.codepipeline import CodePipeline
-from paco.cftemplates.route53 import Route53
-from paco.cftemplates.nat_gateway import NATGateway
-from paco.cftemplates.kms import KMS
-from paco.cftemplates.cw_alarms import CWAlarms
-from paco.cftemplates.lambda_function import Lambda
-from paco.cftemplates.lambda_function import LambdaSNSSubscriptions
-from paco.cftemplates.eventsrule import EventsRule
-from paco.cftemplates.snstopics import SNSTopics
-from paco.cftemplates.sns import SNS
-from paco.cftemplates.loggroups import LogGroups
-from paco.cftemplates.cloudtrail import CloudTrail
-from paco.cftemplates.config import Config
-from paco.cftemplates.cloudfront import CloudFront
-from paco.cftemplates.rds import RDS, DBParameterGroup, DBClusterParameterGroup, RDSAurora
-from paco.cftemplates.elasticache import ElastiCache
-from paco.cftemplates.vpc_peering import VPCPeering
-from paco.cftemplates.apigateway import ApiGatewayRestApi, ApiGatewayLamdaPermissions
-from paco.cftemplates.iam_users import IAMUsers
-from paco.cftemplates.iam_user_account_delegates import IAMUserAccountDelegates
-from paco.cftemplates.efs import EFS
-from paco.cftemplates.eip import EIP
-from paco.cftemplates.route53healthcheck import Route53HealthCheck
-from paco.cftemplates.route53_hostedzone import Route53HostedZone
-from paco.cftemplates.route53_recordset import Route53RecordSet
-from paco.cftemplates.secrets_manager import SecretsManager
-from paco.cftemplates.ebs import EBS
-from paco.cftemplates.codedeployapplication import CodeDeployApplication
-from paco.cftemplates.backup import BackupVault
-from paco.cftemplates.dashboard import CloudWatchDashboard
-from paco.cftemplates.elasticsearch import ElasticsearchDomain
-from paco.cftemplates.iottopicrule import IoTTopicRule
-from paco.cftemplates.iotanalyticspipeline import IoTAnalyticsPipeline
-from paco.cftemplates.ssmdocument import SSMDocument
-from paco.cftemplates.ecs import ECSCluster, ECSServices
-from paco.cftemplates.ecr import ECRRepository
-from paco.cftemplates.iamuser import IAMUser
-from paco.cftemplates.pinpointapplication import PinpointApplication
-from paco.cftemplates.cognito import CognitoUserPool, CognitoIdentityPool
-from paco.cftemplates.dynamodb import DynamoDB
-from paco.cftemplates.notification_rules import NotificationRules
-from paco.cftemplates.vpcendpoints import VPCEndpoints
-from paco.cftemplates.waf import WAFWebACL
+"""
+CloudFormation templates.
+
+Template classes are imported from their modules the first time they are used,
+so that commands which do not generate templates do not import troposphere and awacs.
+"""
+
+import importlib
+
+
+template_modules = {
+    'StackTemplate': 'paco.cftemplates.cftemplates',
+    'VPC': 'paco.cftemplates.vpc',
+    'Segment': 'paco.cftemplates.segment',
+    'SecurityGroups': 'paco.cftemplates.security_groups',
+    'ALB': 'paco.cftemplates.lb',
+    'NLB': 'paco.cftemplates.lb',
+    'ASG': 'paco.cftemplates.asg',
+    'IAMManagedPolicies': 'paco.cftemplates.iam_managed_policies',
+    'IAMRoles': 'paco.cftemplates.iam_roles',
+    'IAMSLRoles': 'paco.cftemplates.iam_sl_roles',
+    'S3': 'paco.cftemplates.s3',
+    'S3BucketPolicy': 'paco.cftemplates.s3',
+    'CodeCommit': 'paco.cftemplates.codecommit',
+    'CodeDeploy': 'paco.cftemplates.codedeploy',
+    'CodeBuild': 'paco.cftemplates.codebuild',
+    'CodePipeline': 'paco.cftemplates.codepipeline',
+    'Route53': 'paco.cftemplates.route53',
+    'NATGateway': 'paco.cftemplates.nat_gateway',
+    'KMS': 'paco.cftemplates.kms',
+    'CWAlarms': 'paco.cftemplates.cw_alarms',
+    'Lambda': 'paco.cftemplates.lambda_function',
+    'LambdaSNSSubscriptions': 'paco.cftemplates.lambda_function',
+    'EventsRule': 'paco.cftemplates.eventsrule',
+    'SNSTopics': 'paco.cftemplates.snstopics',
+    'SNS': 'paco.cftemplates.sns',
+    'LogGroups': 'paco.cftemplates.loggroups',
+    'CloudTrail': 'paco.cftemplates.cloudtrail',
+    'Config': 'paco.cftemplates.config',
+    'CloudFront': 'paco.cftemplates.cloudfront',
+    'RDS': 'paco.cftemplates.rds',
+    'DBParameterGroup': 'paco.cftemplates.rds',
+    'DBClusterParameterGroup': 'paco.cftemplates.rds',
+    'RDSAurora': 'paco.cftemplates.rds',
+    'ElastiCache': 'paco.cftemplates.elasticache',
+    'VPCPeering': 'paco.cftemplates.vpc_peering',
+    'ApiGatewayRestApi': 'paco.cftemplates.apigateway',
+    'ApiGatewayLamdaPermissions': 'paco.cftemplates.apigateway',
+    'IAMUsers': 'paco.cftemplates.iam_users',
+    'IAMUserAccountDelegates': 'paco.cftemplates.iam_user_account_delegates',
+    'EFS': 'paco.cftemplates.efs',
+    'EIP': 'paco.cftemplates.eip',
+    'Route53HealthCheck': 'paco.cftemplates.route53healthcheck',
+    'Route53HostedZone': 'paco.cftemplates.route53_hostedzone',
+    'Route53RecordSet': 'paco.cftemplates.route53_recordset',
+    'SecretsManager': 'paco.cftemplates.secrets_manager',
+    'EBS': 'paco.cftemplates.ebs',
+    'CodeDeployApplication': 'paco.cftemplates.codedeployapplication',
+    'BackupVault': 'paco.cftemplates.backup',
+    'CloudWatchDashboard': 'paco.cftemplates.dashboard',
+    'ElasticsearchDomain': 'paco.cftemplates.elasticsearch',
+    'IoTTopicRule': 'paco.cftemplates.iottopicrule',
+    'IoTAnalyticsPipeline': 'paco.cftemplates.iotanalyticspipeline',
+    'SSMDocument': 'paco.cftemplates.ssmdocument',
+    'ECSCluster': 'paco.cftemplates.ecs',
+    'ECSServices': 'paco.cftemplates.ecs',
+    'ECRRepository': 'paco.cftemplates.ecr',
+    'IAMUser': 'paco.cftemplates.iamuser',
+    'PinpointApplication': 'paco.cftemplates.pinpointapplication',
+    'CognitoUserPool': 'paco.cftemplates.cognito',
+    'CognitoIdentityPool': 'paco.cftemplates.cognito',
+    'DynamoDB': 'paco.cftemplates.dynamodb',
+    'NotificationRules': 'paco.cftemplates.notification_rules',
+    'VPCEndpoints': 'paco.cftemplates.vpcendpoints',
+    'WAFWebACL': 'paco.cftemplates.waf',
+}
+
+def __getattr__(name):
+    if name in template_modules:
+        klass = getattr(importlib.import_module(template_modules[name]), name)
+        globals()[name] = klass
+        return klass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(template_modules.keys()))
@@ -1,5 +1,6 @@
 from awacs.aws import Allow, Statement, Policy, PolicyDocument, Principal, Action, Condition, StringEquals, StringLike
 from paco import utils
+from paco.core.cfn_yaml import dump_template
 from paco.core.exception import StackException, PacoErrorCode, PacoException
 from paco.models import schemas
 from paco.models.references import Reference, get_model_obj_from_ref, is_ref
@@ -11,29 +12,19 @@ import re
 import troposphere
 
 
-single_quoted_cfn_regex = re.compile(r"(.*)'(!Ref\W+\S+)'(.*)")
+# Sites in a template body that are replaced by StackTemplate.substitute_body()
+# ECS ContainerDefinitions set a Secret's ValueFrom to !ManualTroposphereRef SomeParameterName
+# in dicts used with .from_dict(), as a plain '!Ref SomeParameterName' string would be quoted.
+# It is replaced with !Ref 'SomeParameterName'.
+template_token_regex = re.compile(
+    r"paco\.sub[^'\n]*'(?P<sub>[^'\n]*)'"
+    r"|(?P<sub_error>paco\.sub)"
+    r"|(?P<manual>'!ManualTroposphereRef )"
+)
+# ${} variables in a paco.sub string, sub_ref is set if the variable is a paco.ref
+paco_sub_var_regex = re.compile(r"\$\{[^}]*?(?:(?P<sub_ref>paco\.ref [^}]*)|[^}]*)\}")
 
 
-def fix_yaml_tagged_string_quotes(body):
-    """
-    Remove single-quotes around CFN Tags from the generated CloudFormation YAML.
-
-    Works around a bug in Troposphere .to_yaml(). This uses the cfn-flip library,
-    which in turn uses PyYAML to generate the YAML from Troposphere. This is a known bug
-    where a desired YAML such as:
-
-        - !Ref SecretArnOne
-
-    Is incorrectly wrapped in single-quotes:
-
-        - '!Ref SecretArnOne'
-
-    The fix requries cfn-flip using another YAML library that offers better control over the output:
-    https://github.com/awslabs/aws-cfn-template-flip/issues/48
-    """
-    new_body = single_quoted_cfn_regex.sub(r'\1\2\3', body)
-    return new_body
-
 class StackTemplate():
     """A CloudFormation template with access to a Stack object and a Project object."""
     def __init__(
@@ -78,10 +69,8 @@ class StackTemplate():
     @property
     def body(self):
         if self._body == None:
-            # generate YAML from Troposphere and perform replacement on '!Ref SomeParam'
-            self._body = fix_yaml_tagged_string_quotes(
-                self.template.to_yaml()
-            )
+            # generate YAML from Troposphere
+            self._body = dump_template(self.template.to_dict())
         return self._body
 
     @body.setter
@@ -142,91 +131,75 @@ class StackTemplate():
             troposphere.cloudformation.WaitConditionHandle(title="EmptyTemplatePlaceholder")
         )
 
-    # There is a case in ECS where we need to manually set ValueFrom in the
-    # ContainerDefinitions Secerts KeyValuePair list with a !Ref SomeParameterName
-    # value in a dict that will be used in .from_dict(). When troposphere outputs
-    # the resource to yaml, it will wrap the !Ref SomeParameterName in single
-    # quotes which causes CloudFormation to complain. To workaround this we are
-    # using !ManualTroposphereRef (to create uniquieness) and performing the
-    # following replace.
-    def fix_troposphere_manual_ref(self):
-        search = "'!ManualTroposphereRef "
-        replace = "!Ref '"
-        self.body = self.body.replace(search, replace)
-
-    def paco_sub(self):
-        "Perform paco.sub expressions with the substitution string"
-        while True:
-            # Isolate string between quotes: paco.sub ''
-            sub_idx = self.body.find('paco.sub')
-            if sub_idx == -1:
-                break
-            end_idx = self.body.find('\n', sub_idx)
-            if end_idx == -1:
-                end_idx = len(self.body)
-            str_idx = self.body.find("'", sub_idx, end_idx)
-            if str_idx == -1:
+    def expand_paco_sub_ref(self, sub_ref):
+        "Replace the <account>, <environment> and <region> placeholders of a paco.ref in a paco.sub expression"
+        sub_ref = sub_ref.replace('<account>', self.account_ctx.get_name())
+        if sub_ref.find('<environment>') != -1:
+            sub_ref = sub_ref.replace('<environment>', self.environment_name)
+        return sub_ref.replace('<region>', self.aws_region)
+
+    def resolve_paco_sub_ref(self, sub_ref):
+        "Return the value of an expanded paco.ref in a paco.sub expression"
+        sub_value = self.paco_ctx.get_ref_cached(sub_ref)
+        if sub_value == None:
+            raise StackException(
+                PacoErrorCode.Unknown,
+                message="cftemplate: paco_sub: Unable to locate value for ref: " + sub_ref
+            )
+        # if a Stack is returned, then look-up the referenced Stack Output and use that
+        if paco.stack.interfaces.IStack.providedBy(sub_value):
+            sub_value = sub_value.get_saved_outputs_value(
+                sub_value.get_outputs_key_from_ref(
+                    Reference(sub_ref)
+                )
+            )
+        return str(sub_value)
+
+    def substitute_body(self):
+        """Perform paco.sub expressions and replace !ManualTroposphereRef in the template body
+        with a single pass. Each distinct paco.ref is resolved once per template body."""
+        body = self.body
+        resolved = {}
+        parts = []
+        pos = 0
+        for match in template_token_regex.finditer(body):
+            if match.group('manual') != None:
+                parts.append(body[pos:match.start()])
+                parts.append("!Ref '")
+            elif match.group('sub') != None:
+                parts.append(body[pos:match.start()])
+                sub_str = match.group('sub')
+                sub_pos = 0
+                found_var = False
+                for var_match in paco_sub_var_regex.finditer(sub_str):
+                    found_var = True
+                    if var_match.group('sub_ref') == None:
+                        continue
+                    sub_ref = self.expand_paco_sub_ref(var_match.group('sub_ref'))
+                    if sub_ref not in resolved:
+                        resolved[sub_ref] = self.resolve_paco_sub_ref(sub_ref)
+                    parts.append(sub_str[sub_pos:var_match.start()])
+                    parts.append(resolved[sub_ref])
+                    sub_pos = var_match.end()
+                if not found_var:
+                    message = 'Unable to find paco.ref in paco.sub expression.\n'
+                    message += 'Stack: {}\n'.format(self.stack.get_name())
+                    message += "paco.sub '{}'\n".format(sub_str)
+                    raise StackException(PacoErrorCode.Unknown, message = message)
+                parts.append(sub_str[sub_pos:])
+            else:
+                # paco.sub without a quoted string on the same line
                 raise StackException(PacoErrorCode.Unknown, message="paco.sub error")
-            str_idx += 1
-            end_str_idx = self.body.find("'", str_idx, end_idx)
-            if end_str_idx == -1:
-                raise StackException(PacoErrorCode.Unknown, message = "paco.sub error")
-            # Isolate any ${} replacements
-            first_pass = True
-            while True:
-                dollar_idx = self.body.find("${", str_idx, end_str_idx)
-                if dollar_idx == -1:
-                    if first_pass == True:
-                        message = 'Unable to find paco.ref in paco.sub expression.\n'
-                        message += 'Stack: {}\n'.format(self.stack.get_name())
-                        message += "paco.sub '{}'\n".format(self.body[str_idx:end_str_idx])
-                        raise StackException(PacoErrorCode.Unknown, message = message)
-                    else:
-                        break
-                rep_1_idx = dollar_idx
-                rep_2_idx = self.body.find("}", rep_1_idx, end_str_idx)+1
-                next_ref_idx = self.body.find("paco.ref ", rep_1_idx, rep_2_idx)
-                if next_ref_idx != -1:
-                    sub_ref_idx = next_ref_idx
-                    sub_ref = self.body[sub_ref_idx:sub_ref_idx+(rep_2_idx-sub_ref_idx-1)]
-                    if sub_ref.find('<account>') != -1:
-                        sub_ref = sub_ref.replace('<account>', self.account_ctx.get_name())
-                    if sub_ref.find('<environment>') != -1:
-                        sub_ref = sub_ref.replace('<environment>', self.environment_name)
-                    if sub_ref.find('<region>') != -1:
-                        sub_ref = sub_ref.replace('<region>', self.aws_region)
-
-                    sub_value = self.paco_ctx.get_ref(sub_ref)
-                    if sub_value == None:
-                        raise StackException(
-                            PacoErrorCode.Unknown,
-                            message="cftemplate: paco_sub: Unable to locate value for ref: " + sub_ref
-                        )
-                    # Replace the ${}
-                    sub_var = self.body[rep_1_idx:rep_1_idx+(rep_2_idx-rep_1_idx)]
-                    # if a Stack is returned, then look-up the referenced Stack Output and use that
-                    if paco.stack.interfaces.IStack.providedBy(sub_value):
-                        sub_value = sub_value.get_outputs_value(
-                            sub_value.get_outputs_key_from_ref(
-                                Reference(sub_ref)
-                            )
-                        )
-                    self.body = self.body.replace(sub_var, sub_value, 1)
-                else:
-                    #print("break 3")
-                    break
-                first_pass = False
-
-            # Remote paco.sub '' scaffolding
-            self.body = self.body[:sub_idx] + self.body[str_idx:]
-            end_idx = self.body.find('\n', sub_idx)
-            end_str_idx = self.body.find("'", sub_idx, end_idx)
-            self.body = self.body[:end_str_idx] + self.body[end_str_idx+1:]
+            pos = match.end()
+        if pos == 0:
+            return
+        parts.append(body[pos:])
+        self.body = ''.join(parts)
 
     def set_template(self, template_body=None):
         """Sets the template to the body attribute"""
         if template_body == None:
-            self.body = self.template.to_yaml()
+            self.body = dump_template(self.template.to_dict())
         else:
             self.body = template_body
 
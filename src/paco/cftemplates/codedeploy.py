@@ -22,7 +22,7 @@ class CodeDeploy(StackTemplate):
         )
         if not action_config.is_enabled():
             self.init_template('Code Deploy')
-            self.set_template(self.template.to_yaml())
+            self.set_template()
             return
 
         self.codedeploy_tools_delegate_role_name = self.get_tools_delegate_role_name()
@@ -530,6 +530,10 @@ class Lambda(StackTemplate):
         )
 
     def prepare_s3bucket_artifact_cache(self, hook, is_zip):
+        # with --nocache the artifact is always zipped and checked in S3
+        fingerprint_path = None
+        if self.paco_ctx.nocache == False:
+            fingerprint_path = self.paco_ctx.build_path / 'LambdaArtifacts' / f'{self.stack.resource.paco_ref_parts}.yaml'
         self.code_bucket_name, self.code_artifact_name, md5_hash = init_lambda_code(
             self.paco_ctx.paco_buckets,
             self.stack.resource,
@@ -537,6 +541,7 @@ class Lambda(StackTemplate):
             self.stack.account_ctx,
             self.stack.aws_region,
             is_zip=is_zip,
+            fingerprint_path=fingerprint_path,
         )
         return md5_hash
 
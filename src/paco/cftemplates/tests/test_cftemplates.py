@@ -1,62 +1,78 @@
 from paco.cftemplates import cftemplates
+from paco.core.cfn_yaml import dump_template
 from paco.cftemplates.tests import BaseTestStack
 from paco.core.yaml import YAML
+import troposphere
+import troposphere.ec2
 
 yaml=YAML(typ='safe')
 
 class TestStackTemplate(BaseTestStack):
 
-    def test_fix_yaml_tagged_string_quotes(self):
-        # replace single '!Ref Thing'
-        body = """SomeResource:
-  - '!Ref MyGoodRef'
-
-MoreTemplate:
-"""
-        expected = """SomeResource:
-  - !Ref MyGoodRef
-
-MoreTemplate:
-"""
-        new_body = cftemplates.fix_yaml_tagged_string_quotes(body)
-        assert new_body == expected
-
-        # replace multiple '!Ref Thing's
-        body = """SomeResource:
-  - '!Ref MyGoodRef'
-  - '!Ref MoreRef'
-
-MoreTemplate:
-  Foobs: '!Ref Foobs'
-"""
-        expected = """SomeResource:
-  - !Ref MyGoodRef
-  - !Ref MoreRef
-
-MoreTemplate:
-  Foobs: !Ref Foobs
-"""
-        new_body = cftemplates.fix_yaml_tagged_string_quotes(body)
-        assert new_body == expected
-
-        # Do not replace strings that start with !Ref
-        body = """SomeResource:
-  Title: '!Ref is a CFN Tag'
-"""
-        expected = """SomeResource:
-  Title: '!Ref is a CFN Tag'
+    def test_dump_template(self):
+        template = troposphere.Template()
+        template.add_resource(troposphere.ec2.SecurityGroup(
+            'SecurityGroup',
+            GroupDescription='!Ref is a CFN Tag',
+            VpcId='!Ref MyGoodRef',
+            Tags=[
+                troposphere.ec2.Tag('Name', '!ManualTroposphereRef SecretParam'),
+                troposphere.ec2.Tag('Account', '012345678901'),
+                troposphere.ec2.Tag('Region', troposphere.Ref('AWS::Region')),
+                troposphere.ec2.Tag('Sub', troposphere.Sub('${AWS::StackName}-sg')),
+            ]
+        ))
+        template.add_output(troposphere.Output('AZ', Value=troposphere.Select(0, troposphere.GetAZs(''))))
+        body = dump_template(template.to_dict())
+        expected = """Outputs:
+  AZ:
+    Value: !Select
+    - 0
+    - !GetAZs ''
+Resources:
+  SecurityGroup:
+    Properties:
+      GroupDescription: '!Ref is a CFN Tag'
+      Tags:
+      - Key: Name
+        Value: !Ref 'SecretParam'
+      - Key: Account
+        Value: '012345678901'
+      - Key: Region
+        Value: !Ref AWS::Region
+      - Key: Sub
+        Value: !Sub ${AWS::StackName}-sg
+      VpcId: !Ref MyGoodRef
+    Type: AWS::EC2::SecurityGroup
 """
-        new_body = cftemplates.fix_yaml_tagged_string_quotes(body)
-        assert new_body == expected
+        assert body == expected
+        # the same template is only rendered once
+        assert dump_template(template.to_dict()) is body
 
-        # Do not replace multi-line strings that start with !Ref
-        body = """SomeResource:
-  Title: '!Ref isA
-CFNTag'
+    def test_substitute_body(self):
+        class AccountContext():
+            def get_name(self):
+                return 'dev'
+        template = cftemplates.StackTemplate(self.stack, self.paco_ctx, environment_name='test')
+        template.account_ctx = AccountContext()
+        resolved_refs = []
+        def get_ref(paco_ref, account_ctx=None):
+            resolved_refs.append(paco_ref)
+            return {
+                'paco.ref accounts.dev': '123456789012',
+                'paco.ref netenv.mynet.test.us-west-2.name': 'mynet',
+            }.get(paco_ref, None)
+        self.paco_ctx.get_ref = get_ref
+        template._body = """Resources:
+  - paco.sub 'arn:aws:iam::${paco.ref accounts.<account>}:root'
+  - paco.sub '${paco.ref accounts.dev}-${AWS::Region}-${paco.ref netenv.mynet.<environment>.<region>.name}'
+  - Name: '!ManualTroposphereRef SecretParam'
 """
-        expected = """SomeResource:
-  Title: '!Ref isA
-CFNTag'
+        template.substitute_body()
+        assert template.body == """Resources:
+  - arn:aws:iam::123456789012:root
+  - 123456789012-${AWS::Region}-mynet
+  - Name: !Ref 'SecretParam'
 """
-        new_body = cftemplates.fix_yaml_tagged_string_quotes(body)
-        assert new_body == expected
+        # each distinct paco.ref is resolved once
+        assert resolved_refs == ['paco.ref accounts.dev', 'paco.ref netenv.mynet.test.us-west-2.name']
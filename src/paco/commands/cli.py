@@ -1,31 +1,58 @@
 import click
-import pkg_resources
-from paco.commands.cmd_provision import provision_command
-from paco.commands.cmd_init import init_group
-from paco.commands.cmd_delete import delete_command
-from paco.commands.cmd_describe import describe_command
-from paco.commands.cmd_validate import validate_command
-from paco.commands.cmd_shell import shell_command
-from paco.commands.cmd_set import set_command
-from paco.commands.cmd_lambda import lambda_group
+import importlib
 from paco.commands.helpers import pass_paco_context
 
 
-@click.group()
-@click.version_option(
-    version=pkg_resources.require("paco-cloud")[0].version,
-    prog_name="Paco: Prescribed automation for cloud orchestration"
+# Commands are imported when they are used so that the CLI starts quickly
+lazy_commands = {
+    'init': 'paco.commands.cmd_init:init_group',
+    'validate': 'paco.commands.cmd_validate:validate_command',
+    'provision': 'paco.commands.cmd_provision:provision_command',
+    'delete': 'paco.commands.cmd_delete:delete_command',
+    'set': 'paco.commands.cmd_set:set_command',
+    'lambda': 'paco.commands.cmd_lambda:lambda_group',
+    'describe': 'paco.commands.cmd_describe:describe_command',
+    #'shell': 'paco.commands.cmd_shell:shell_command',
+}
+
+
+class LazyGroup(click.Group):
+    "A click Group that imports its commands when they are first used"
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return list(self.lazy_commands.keys()) + super().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attr_name = self.lazy_commands[cmd_name].split(':')
+            self.add_command(getattr(importlib.import_module(module_name), attr_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+def print_version(ctx, param, value):
+    "Print the Paco version and exit"
+    if not value or ctx.resilient_parsing:
+        return
+    import pkg_resources
+    version = pkg_resources.get_distribution("paco-cloud").version
+    click.echo(f"Paco: Prescribed automation for cloud orchestration, version {version}")
+    ctx.exit()
+
+
+@click.group(cls=LazyGroup, lazy_commands=lazy_commands)
+@click.option(
+    '--version',
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_version,
+    help="Show the version and exit."
 )
 @pass_paco_context
 def cli(ctx):
     """Paco: Prescribed automation for cloud orchestration"""
     pass
-
-cli.add_command(init_group)
-cli.add_command(validate_command)
-cli.add_command(provision_command)
-cli.add_command(delete_command)
-cli.add_command(set_command)
-cli.add_command(lambda_group)
-cli.add_command(describe_command)
-#cli.add_command(shell_command)
@@ -1,4 +1,3 @@
-import paco.models
 import click
 import sys
 from paco.commands.helpers import (
@@ -9,6 +8,14 @@ from paco.core.exception import StackException
 
 
 @click.command('delete', short_help='Delete Paco managed resources')
+@click.option(
+    '-p', '--parallel',
+    default=1,
+    type=click.IntRange(min=1),
+    help="""
+Number of CloudFormation stacks to delete concurrently. Stacks are deleted as soon as the stacks that depend on them have been deleted. The stacks to delete are confirmed in one prompt before any are deleted.
+"""
+)
 @paco_home_option
 @cloud_args
 @cloud_options
@@ -25,9 +32,11 @@ def delete_command(
     hooks_only,
     cfn_lint,
     config_scope,
-    home='.'
+    home='.',
+    parallel=1,
 ):
     """Deletes provisioned Cloud Resources"""
+    paco_ctx.parallel = parallel
     command = 'delete'
     controller_type, obj = init_cloud_command(
         command,
@@ -1,5 +1,4 @@
 from paco.commands.helpers import pass_paco_context, paco_home_option, init_paco_home_option, handle_exceptions
-from paco.commands.display import display_project_as_html, display_project_as_json
 from paco.core.exception import InvalidOption
 import click
 import json
@@ -31,6 +30,7 @@ def describe_command(paco_ctx, home='.', output='html', display='chrome'):
     init_paco_home_option(paco_ctx, home)
     paco_ctx.load_project(validate_local_paths=False)
     project = paco_ctx.project
+    from paco.commands.display import display_project_as_html, display_project_as_json
 
     # Output HTML
     describe_path = pathlib.Path(paco_ctx.describe_path)
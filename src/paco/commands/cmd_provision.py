@@ -12,6 +12,30 @@ from paco.commands.helpers import paco_home_option, pass_paco_context, handle_ex
 Automatically update Lambda Code assets. Lambda resources that use the `zipfile:` to a local filesystem path will automatically publish new code if it differs from the currently published code asset.
 """
 )
+@click.option(
+    '-p', '--parallel',
+    default=1,
+    type=click.IntRange(min=1),
+    help="""
+Number of CloudFormation stacks to create or update concurrently. Stacks are provisioned as soon as the stacks they depend on have completed.
+"""
+)
+@click.option(
+    '-r', '--parallel-regions',
+    default=False,
+    is_flag=True,
+    help="""
+Provision the regions of a NetworkEnvironment concurrently. A region that uses the Stack Outputs of another region waits for that region to finish.
+"""
+)
+@click.option(
+    '-o', '--saved-outputs',
+    default=False,
+    is_flag=True,
+    help="""
+Resolve Stack Outputs from the outputs saved in the .paco-work directory by previous runs. Stacks that have not changed are checked against their cache without calling CloudFormation. Outputs of stacks changed in this run, or that have not been saved, are still read from AWS.
+"""
+)
 @paco_home_option
 @cloud_args
 @cloud_options
@@ -30,9 +54,14 @@ def provision_command(
     config_scope,
     home='.',
     auto_publish_code=False,
+    parallel=1,
+    parallel_regions=False,
+    saved_outputs=False,
 ):
     """Provision Cloud Resources"""
     paco_ctx.auto_publish_code = auto_publish_code
+    paco_ctx.parallel = parallel
+    paco_ctx.saved_outputs = saved_outputs
     command = 'provision'
     controller_type, obj = init_cloud_command(
         command,
@@ -48,6 +77,9 @@ def provision_command(
         config_scope,
         home
     )
+    if parallel_regions:
+        # the flag overrides the .pacoconfig option loaded by init_cloud_command
+        paco_ctx.parallel_regions = True
     controller = paco_ctx.get_controller(controller_type, command, obj)
     controller.provision()
 
@@ -1,4 +1,3 @@
-import paco.models
 import click
 import sys
 from paco.commands.helpers import (
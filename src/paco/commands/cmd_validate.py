@@ -8,6 +8,14 @@ from paco.commands.helpers import (
 
 
 @click.command('validate', short_help='Validate a Paco project')
+@click.option(
+    '-p', '--parallel',
+    default=1,
+    type=click.IntRange(min=1),
+    help="""
+Number of CloudFormation templates to upload and validate concurrently. Templates are generated and the results are reported in stack order.
+"""
+)
 @paco_home_option
 @cloud_args
 @cloud_options
@@ -24,9 +32,11 @@ def validate_command(
     hooks_only,
     cfn_lint,
     config_scope,
-    home='.'
+    home='.',
+    parallel=1,
 ):
     "Validate resources"
+    paco_ctx.parallel = parallel
     command = 'validate'
     controller_type, obj = init_cloud_command(
         command,
@@ -1,12 +1,9 @@
-from paco.config.paco_context import PacoContext, AccountContext
+# The Paco model, boto3 and the controllers are imported when a command runs
+# and not when the CLI starts, so that `paco --help` is fast
 from paco.core.exception import PacoException, StackException, InvalidPacoScope, PacoBaseException, InvalidPacoHome, InvalidVersionControl, \
     InvalidPacoConfigFile
 from paco.core.yaml import YAML
-from paco.models.exceptions import InvalidPacoProjectFile, UnusedPacoProjectField, InvalidPacoReference, InvalidAlarmConfiguration
-from paco.models.references import get_model_obj_from_ref
-from boto3.exceptions import Boto3Error
-from botocore.exceptions import BotoCoreError, ClientError
-from functools import wraps
+from functools import update_wrapper, wraps
 import click
 import os
 import sys
@@ -16,7 +13,13 @@ import pathlib
 yaml=YAML()
 yaml.default_flow_sytle = False
 
-pass_paco_context = click.make_pass_decorator(PacoContext, ensure=True)
+def pass_paco_context(func):
+    "Pass the PacoContext to a command, creating it if needed"
+    @click.pass_context
+    def new_func(ctx, *args, **kwargs):
+        from paco.config.paco_context import PacoContext
+        return ctx.invoke(func, ctx.ensure_object(PacoContext), *args, **kwargs)
+    return update_wrapper(new_func, func)
 
 config_types = """
 CONFIG_SCOPE must be a Paco reference to a Paco object. This will select
@@ -54,6 +57,23 @@ def load_paco_config_options(paco_ctx):
         if type(config['verbose']) != type(bool()):
             raise InvalidPacoConfigFile("The 'verbose' option must be a boolean in the paco config file at:\n{}.".format(config_path))
         paco_ctx.verbose = config['verbose']
+    if 'model_cache' in config:
+        if type(config['model_cache']) != type(bool()):
+            raise InvalidPacoConfigFile("The 'model_cache' option must be a boolean in the paco config file at:\n{}.".format(config_path))
+        paco_ctx.model_cache = config['model_cache']
+    if 'warm_up_accounts' in config:
+        if type(config['warm_up_accounts']) != type(bool()):
+            raise InvalidPacoConfigFile("The 'warm_up_accounts' option must be a boolean in the paco config file at:\n{}.".format(config_path))
+        paco_ctx.warm_up_accounts = config['warm_up_accounts']
+    if 'parallel_regions' in config:
+        if type(config['parallel_regions']) != type(bool()):
+            raise InvalidPacoConfigFile("The 'parallel_regions' option must be a boolean in the paco config file at:\n{}.".format(config_path))
+        paco_ctx.parallel_regions = config['parallel_regions']
+    for option in ('stack_poll_interval', 'stack_poll_max_interval', 'ssm_command_timeout'):
+        if option in config:
+            if type(config[option]) not in (int, float) or config[option] <= 0:
+                raise InvalidPacoConfigFile("The '{}' option must be a positive number of seconds in the paco config file at:\n{}.".format(option, config_path))
+            setattr(paco_ctx, option, config[option])
 
 def init_cloud_command(
     command_name,
@@ -241,6 +261,7 @@ Expected to be on branch named '{}' for a change with a global scope of '{}', bu
         controller_type = scope_parts[0]
 
     paco_ref = 'paco.ref {}'.format(config_scope)
+    from paco.models.references import get_model_obj_from_ref
     obj = get_model_obj_from_ref(paco_ref, paco_ctx.project)
     return controller_type, obj
 
@@ -327,6 +348,10 @@ def handle_exceptions(func):
     """
     @wraps(func)
     def decorated(*args, **kwargs):
+        from paco.models.exceptions import InvalidPacoProjectFile, UnusedPacoProjectField, InvalidPacoReference, \
+            InvalidAlarmConfiguration
+        from boto3.exceptions import Boto3Error
+        from botocore.exceptions import BotoCoreError, ClientError
         # return func(*args, **kwargs)
         try:
             # new Paco Error types will be caught here
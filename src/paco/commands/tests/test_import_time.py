@@ -0,0 +1,62 @@
+"""
+Import-time checks for the paco CLI entry point.
+
+Run with `python -m pytest paco/commands/tests/test_import_time.py` to catch startup regressions.
+"""
+
+import subprocess
+import sys
+import unittest
+
+
+# Modules that `paco --help` must not import
+DEFERRED_MODULES = (
+    'troposphere',
+    'awacs',
+    'parliament',
+    'deepdiff',
+    'chameleon',
+    'git',
+    'pkg_resources',
+    'boto3',
+    'paco.models.loader',
+    'paco.cftemplates.vpc',
+    'paco.controllers.ctl_network_environment',
+)
+
+# Upper bound in seconds for the cumulative import time of paco.commands.cli
+MAX_CLI_IMPORT_SECS = 1.0
+
+def import_times(statement):
+    "Run a statement in a new interpreter and return the cumulative import time of each module in seconds"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative) / 1000000
+    return times
+
+
+class TestCLIImportTime(unittest.TestCase):
+
+    def test_cli_defers_imports(self):
+        times = import_times('import paco.commands.cli')
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, times, f"{module} is imported when the paco CLI starts")
+        self.assertLess(times['paco.commands.cli'], MAX_CLI_IMPORT_SECS)
+
+    def test_commands_defer_imports(self):
+        times = import_times(
+            'import importlib, paco.commands.cli as cli\n'
+            'for name in cli.lazy_commands.values(): importlib.import_module(name.split(":")[0])'
+        )
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, times, f"{module} is imported by a paco command module")
@@ -0,0 +1,191 @@
+"""
+Retries, rate limiting and credential refresh for the AWS clients of an AccountContext.
+
+Every client is created with botocore's adaptive retry mode. Requests also take a token
+from a RateLimiter that is shared by all of the clients for the same account, region and
+service, so concurrent Stacks and controllers slow down together when AWS throttles them.
+
+Account sessions get their credentials from an AccountCredentialProvider, so every client
+of an account signs requests with the same AccountCredentials. These are botocore
+RefreshableCredentials that renew themselves shortly before they expire. When a request
+fails with ExpiredToken the credentials are renewed without using the credentials cache and
+the request is retried once, so callers do not need to handle expired credentials themselves.
+"""
+
+from botocore.config import Config
+from botocore.credentials import CredentialProvider, RefreshableCredentials
+from paco.config.aws_credentials import CREDENTIALS_EXPIRY_MARGIN_SECS
+import threading
+import time
+
+
+DEFAULT_MAX_ATTEMPTS = 10
+# Requests per second for each account, region and service
+MAX_REQUEST_RATE = 40.0
+MIN_REQUEST_RATE = 0.5
+# The rate is multiplied by this after a throttling error and grows by the increase after a success
+THROTTLE_RATE_FACTOR = 0.5
+SUCCESS_RATE_INCREASE = 0.5
+# Credentials renewed this recently are not renewed again for an ExpiredToken error
+SESSION_REFRESH_INTERVAL_SECS = 60
+
+THROTTLING_ERROR_CODES = (
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'TransactionInProgressException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException',
+)
+EXPIRED_TOKEN_ERROR_CODES = ('ExpiredToken', 'ExpiredTokenException', 'RequestExpired')
+
+
+class RateLimiter():
+    "Token bucket shared by the clients of an account, region and service"
+
+    def __init__(self, max_rate=MAX_REQUEST_RATE, min_rate=MIN_REQUEST_RATE):
+        self.lock = threading.Lock()
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.capacity = max_rate
+        self.tokens = max_rate
+        self.last_refill = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, **kwargs):
+        "Take a token, waiting until one is available"
+        while True:
+            with self.lock:
+                self.refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        "Slow down after a throttling error"
+        with self.lock:
+            self.refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * THROTTLE_RATE_FACTOR)
+            self.capacity = max(1, self.rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def succeeded(self):
+        "Speed up after a successful request"
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + SUCCESS_RATE_INCREASE)
+                self.capacity = max(1, self.rate)
+
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(account_name, aws_region, service_name):
+    "Return the RateLimiter for an account, region and service"
+    key = (account_name, aws_region, service_name)
+    with rate_limiters_lock:
+        if key not in rate_limiters:
+            rate_limiters[key] = RateLimiter()
+        return rate_limiters[key]
+
+
+class AccountCredentials(RefreshableCredentials):
+    """RefreshableCredentials of an account that can also be renewed after AWS rejects them.
+    Use new() to create them with a load_metadata(use_cache) function that returns the metadata of new credentials."""
+    renew_requested = False
+
+    @classmethod
+    def new(cls, metadata, load_metadata):
+        credentials = None
+        def refresh():
+            renew = credentials.renew_requested
+            new_metadata = load_metadata(use_cache=not renew)
+            if renew:
+                credentials.renew_requested = False
+            return new_metadata
+        credentials = cls.create_from_metadata(
+            metadata,
+            refresh_using=refresh,
+            method=AccountCredentialProvider.METHOD,
+            # cached credentials are renewed once they are within the expiry margin
+            advisory_timeout=CREDENTIALS_EXPIRY_MARGIN_SECS,
+            mandatory_timeout=CREDENTIALS_EXPIRY_MARGIN_SECS // 2,
+        )
+        return credentials
+
+    def renew(self):
+        "Renew the credentials before the next request is signed"
+        self.renew_requested = True
+
+    def refresh_needed(self, refresh_in=None):
+        if self.renew_requested:
+            return True
+        return super().refresh_needed(refresh_in)
+
+
+class AccountCredentialProvider(CredentialProvider):
+    "Provides the AccountCredentials of an account to a botocore session"
+    METHOD = 'paco'
+    CANONICAL_NAME = 'custom-paco'
+
+    def __init__(self, credentials):
+        super().__init__()
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+
+def get_client_config(client_config=None):
+    "Return a botocore Config with adaptive retries merged with client_config"
+    retries = {'mode': 'adaptive', 'max_attempts': DEFAULT_MAX_ATTEMPTS}
+    if client_config != None and client_config.retries != None:
+        retries.update(client_config.retries)
+    config = Config(retries=retries)
+    if client_config != None:
+        config = client_config.merge(config)
+    return config
+
+def get_error_code(response):
+    "Error code of a botocore response tuple or None"
+    if response == None:
+        return None
+    return response[1].get('Error', {}).get('Code', None)
+
+def configure_client(account_ctx, client, aws_region):
+    "Install the shared rate limiter and the ExpiredToken retry on a client"
+    service_name = client.meta.service_model.service_name
+    limiter = get_rate_limiter(account_ctx.get_name(), aws_region, service_name)
+
+    def needs_retry(response=None, request_dict=None, **kwargs):
+        error_code = get_error_code(response)
+        if error_code in THROTTLING_ERROR_CODES:
+            limiter.throttled()
+        elif error_code in EXPIRED_TOKEN_ERROR_CODES:
+            # renew the credentials and retry the request once with the new credentials
+            context = request_dict['context']
+            if context.get('paco_session_refreshed', False) == False:
+                context['paco_session_refreshed'] = True
+                account_ctx.refresh_session()
+                return 0
+        elif error_code == None and response != None:
+            limiter.succeeded()
+        return None
+
+    client.meta.events.register('before-send', limiter.acquire)
+    client.meta.events.register('needs-retry', needs_retry)
+    return client
@@ -1,9 +1,41 @@
 from paco.core.exception import AuthenticationError
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
+from datetime import datetime, timedelta, timezone
 import boto3
+import botocore.loaders
+import botocore.session
 import json
 import os
 import sys
+import threading
+
+
+# Cached credentials that expire within this many seconds are renewed
+CREDENTIALS_EXPIRY_MARGIN_SECS = 300
+
+# One botocore data loader is shared by every session so that service models are only parsed once
+shared_loader = None
+shared_loader_lock = threading.Lock()
+
+def new_boto3_session(credential_provider=None, **kwargs):
+    """Create a boto3 Session that uses the shared botocore data loader.
+    A credential_provider is tried before the providers of the environment and AWS config files."""
+    global shared_loader
+    botocore_session = botocore.session.get_session()
+    if credential_provider != None:
+        botocore_session.get_component('credential_provider').insert_before('env', credential_provider)
+    with shared_loader_lock:
+        if shared_loader == None:
+            shared_loader = botocore.loaders.create_loader(botocore_session.get_config_variable('data_path'))
+        botocore_session.register_component('data_loader', shared_loader)
+        session = boto3.Session(botocore_session=botocore_session, **kwargs)
+        # boto3 adds its resource data path to the loader for every Session
+        search_paths = []
+        for search_path in shared_loader.search_paths:
+            if search_path not in search_paths:
+                search_paths.append(search_path)
+        shared_loader.search_paths[:] = search_paths
+    return session
 
 
 class PacoSTS():
@@ -41,27 +73,58 @@ class PacoSTS():
         self.admin_iam_role_arn = admin_iam_role_arn
         self.org_admin_iam_role_arn = org_admin_iam_role_arn
         self.session = None
-        self.sts_client = boto3.client('sts')
 
     def get_temporary_credentials(self):
         return self.credentials
 
     def load_temp_creds(self, creds_path):
+        """Load cached credentials. Returns None if there are no cached credentials or they
+        have expired. Credentials cached without an Expiration are checked with STS."""
         try:
             with open(creds_path, 'r') as tmp_creds:
                 credentials = json.loads(tmp_creds.read())
-                client = boto3.client(
-                    'sts',
-                    aws_access_key_id=credentials['AccessKeyId'],
-                    aws_secret_access_key=credentials['SecretAccessKey'],
-                    aws_session_token=credentials['SessionToken']
-                )
-                _ = client.get_caller_identity()['Account']
-        except:
+        except (OSError, ValueError):
+            return None
+        if not isinstance(credentials, dict):
+            return None
+        for key in ('AccessKeyId', 'SecretAccessKey', 'SessionToken'):
+            if key not in credentials:
+                return None
+
+        expiration = self.parse_expiration(credentials.get('Expiration', None))
+        if expiration != None:
+            expiry_margin = timedelta(seconds=CREDENTIALS_EXPIRY_MARGIN_SECS)
+            if datetime.now(timezone.utc) + expiry_margin >= expiration:
+                return None
+            return credentials
+
+        # Credentials cached by older versions of Paco do not have an Expiration
+        try:
+            client = boto3.client(
+                'sts',
+                aws_access_key_id=credentials['AccessKeyId'],
+                aws_secret_access_key=credentials['SecretAccessKey'],
+                aws_session_token=credentials['SessionToken']
+            )
+            client.get_caller_identity()
+        except (ClientError, BotoCoreError):
             return None
 
         return credentials
 
+    def parse_expiration(self, expiration):
+        "Return a cached Expiration as a timezone aware datetime or None if it is missing or invalid"
+        if expiration == None:
+            return None
+        try:
+            expiration = datetime.fromisoformat(expiration)
+        except (TypeError, ValueError):
+            return None
+        if expiration.tzinfo == None:
+            # STS returns expiry times in UTC
+            expiration = expiration.replace(tzinfo=timezone.utc)
+        return expiration
+
     def save_temp_creds(self, credentials, creds_path):
         select_creds = {
             'AccessKeyId': credentials['AccessKeyId'],
@@ -70,6 +133,11 @@ class PacoSTS():
         }
         if 'AWSDefaultRegion' in credentials.keys():
             select_creds['AWSDefaultRegion'] = credentials['AWSDefaultRegion']
+        if 'Expiration' in credentials.keys():
+            expiration = credentials['Expiration']
+            if isinstance(expiration, datetime):
+                expiration = expiration.isoformat()
+            select_creds['Expiration'] = expiration
         with open(creds_path, 'w') as tmp_creds:
             tmp_creds.write(json.dumps(select_creds))
             os.chmod(creds_path, 0o600)
@@ -128,7 +196,18 @@ Try running `paco init credentials` to create one.
                 break
         return role_creds
 
-    def get_temporary_session(self):
+    def get_temporary_session(self, prompt=True):
+        "Session with the temporary AssumeRole credentials, or None if prompt is False and an MFA token is needed"
+        role_creds = self.get_role_credentials(prompt)
+        if role_creds == None:
+            return None
+        return new_boto3_session(
+            aws_access_key_id=role_creds['AccessKeyId'],
+            aws_secret_access_key=role_creds['SecretAccessKey'],
+            aws_session_token=role_creds['SessionToken'],
+        )
+
+    def get_role_credentials(self, prompt=True, use_cache=True):
         """
         1. Load Temporary AssumeRole Credentials
             1.1 If NOT exist: Load Temporary Session Credentials
@@ -139,16 +218,35 @@ Try running `paco init credentials` to create one.
             2.1 If Session Credentials expired
                 2.1.1 Generate and store Session Credentails
             2.2 Generate and store AssumeRole Credentials from Session
+
+        If prompt is False, returns None instead of prompting for an MFA token.
+        If use_cache is False, the cached AssumeRole Credentials are not used, for when AWS has
+        rejected them before the local clock says they expire.
         """
-        role_creds = self.load_temp_creds(self.role_creds_path)
+        role_creds = None
+        if use_cache:
+            role_creds = self.load_temp_creds(self.role_creds_path)
         if role_creds == None:
             session_creds = self.load_temp_creds(self.session_creds_path)
             if session_creds == None:
+                if prompt == False:
+                    return None
                 session_creds = self.create_session_temp_creds()
             role_creds = self.get_assume_role_temporary_credentials(session_creds)
+        return role_creds
 
-        return boto3.Session(
-            aws_access_key_id=role_creds['AccessKeyId'],
-            aws_secret_access_key=role_creds['SecretAccessKey'],
-            aws_session_token=role_creds['SessionToken'],
-        )
+
+def get_credentials_metadata(credentials):
+    """Convert STS or cached Credentials to the metadata of botocore RefreshableCredentials.
+    Credentials cached without an Expiration are checked again after twice the expiry margin."""
+    expiration = credentials.get('Expiration', None)
+    if expiration == None:
+        expiration = datetime.now(timezone.utc) + timedelta(seconds=CREDENTIALS_EXPIRY_MARGIN_SECS * 2)
+    if isinstance(expiration, datetime):
+        expiration = expiration.isoformat()
+    return {
+        'access_key': credentials['AccessKeyId'],
+        'secret_key': credentials['SecretAccessKey'],
+        'token': credentials['SessionToken'],
+        'expiry_time': expiration,
+    }
@@ -1,7 +1,15 @@
+from paco import utils
 from paco.config.interfaces import IAccountContext
+from paco.core.yaml import read_yaml_file
 from paco.models.vocabulary import aws_regions
 from botocore.exceptions import ClientError
 import io
+import threading
+
+
+# Increment when create_bucket changes the configuration applied to Paco Buckets
+# so that buckets recorded in the on-disk registry are configured again
+BUCKET_CONFIG_VERSION = 1
 
 
 class PacoBuckets():
@@ -12,10 +20,88 @@ class PacoBuckets():
     Paco S3 Buckets are named in the format:
 
     paco-<project-name>-<account>-<region-short_name>[-<s3bucket-hash>]
+
+    A bucket is created and configured once per run. If a registry_path is given,
+    buckets that have been configured are recorded in that file, and after
+    load_registry() they are not configured again by later runs.
     """
 
-    def __init__(self, project):
+    def __init__(self, project, registry_path=None):
         self.project = project
+        self.registry_path = registry_path
+        self.configured_buckets = set()
+        self.lock = threading.Lock()
+        self.bucket_locks = {}
+        self.uploaded_objects = set()
+
+    def load_registry(self):
+        "Load the names of configured buckets from the on-disk registry"
+        if self.registry_path == None or not self.registry_path.exists():
+            return
+        try:
+            registry = read_yaml_file(self.registry_path)
+        except Exception:
+            # an unreadable registry only means the buckets are configured again
+            return
+        if not isinstance(registry, dict) or registry.get('version') != BUCKET_CONFIG_VERSION:
+            return
+        self.configured_buckets.update(registry.get('buckets', None) or [])
+
+    def save_registry(self):
+        "Save the names of configured buckets to the on-disk registry"
+        if self.registry_path == None:
+            return
+        registry = {
+            'version': BUCKET_CONFIG_VERSION,
+            'buckets': sorted(self.configured_buckets),
+        }
+        utils.write_to_file(self.registry_path.parent, self.registry_path.name, registry)
+
+    def forget_bucket(self, account_ctx, region):
+        "Remove a bucket from the registry of configured buckets, for example when it has been deleted outside of Paco"
+        bucket_name = self.get_bucket_name(account_ctx, region)
+        with self.lock:
+            if bucket_name in self.configured_buckets:
+                self.configured_buckets.discard(bucket_name)
+                self.save_registry()
+
+    def ensure_bucket(self, account_ctx, region):
+        "Create and configure the Paco S3 Bucket for an account and region if that has not been done yet"
+        bucket_name = self.get_bucket_name(account_ctx, region)
+        with self.lock:
+            if bucket_name in self.configured_buckets:
+                return
+            bucket_lock = self.bucket_locks.setdefault(bucket_name, threading.Lock())
+        # only one thread configures a bucket, other threads wait for it to finish
+        with bucket_lock:
+            with self.lock:
+                if bucket_name in self.configured_buckets:
+                    return
+            self.create_bucket(account_ctx, region)
+            with self.lock:
+                self.configured_buckets.add(bucket_name)
+                self.save_registry()
+
+    def is_no_such_bucket(self, error):
+        "True if a ClientError is for a bucket that does not exist"
+        return isinstance(error, ClientError) and error.response['Error']['Code'] == 'NoSuchBucket'
+
+    def with_bucket(self, account_ctx, region, s3_action):
+        """Run an S3 action against the Paco Bucket for an account and region, creating the bucket first if needed.
+        If the bucket was recorded as configured but no longer exists, it is created again and the action retried."""
+        self.ensure_bucket(account_ctx, region)
+        bucket_name = self.get_bucket_name(account_ctx, region)
+        try:
+            s3_action(bucket_name)
+        except Exception as error:
+            # S3Transfer wraps ClientErrors raised by uploads
+            cause = error.__cause__ if error.__cause__ != None else error
+            if not self.is_no_such_bucket(error) and not self.is_no_such_bucket(cause):
+                raise error
+            self.forget_bucket(account_ctx, region)
+            self.ensure_bucket(account_ctx, region)
+            s3_action(bucket_name)
+        return bucket_name
 
     def get_bucket_name(self, account_ctx, region):
         "Name of an Paco S3 Bucket in an account and region"
@@ -31,20 +117,35 @@ class PacoBuckets():
 
     def upload_file(self, file_location, s3_key, account_ctx, region):
         "Upload a file to a Paco Bucket"
-
-        self.create_bucket(account_ctx, region)
-        bucket_name = self.get_bucket_name(account_ctx, region)
         s3_client = account_ctx.get_aws_client('s3', region)
-        s3_client.upload_file(file_location, bucket_name, s3_key)
-        return bucket_name
+        return self.with_bucket(
+            account_ctx,
+            region,
+            lambda bucket_name: s3_client.upload_file(file_location, bucket_name, s3_key)
+        )
 
     def upload_fileobj(self, file_contents, s3_key, account_ctx, region):
         "Upload a file to a Paco Bucket"
-        fileobj = io.BytesIO(file_contents.encode())
-        self.create_bucket(account_ctx, region)
-        bucket_name = self.get_bucket_name(account_ctx, region)
         s3_client = account_ctx.get_aws_client('s3', region)
-        s3_client.upload_fileobj(fileobj, bucket_name, s3_key)
+        return self.with_bucket(
+            account_ctx,
+            region,
+            lambda bucket_name: s3_client.upload_fileobj(io.BytesIO(file_contents.encode()), bucket_name, s3_key)
+        )
+
+    def upload_fileobj_if_missing(self, file_contents, s3_key, account_ctx, region):
+        """Upload a file to a Paco Bucket unless an object with that key already exists.
+        Only use this for keys that are unique to the file contents."""
+        self.ensure_bucket(account_ctx, region)
+        bucket_name = self.get_bucket_name(account_ctx, region)
+        object_id = (bucket_name, s3_key)
+        with self.lock:
+            if object_id in self.uploaded_objects:
+                return bucket_name
+        if not self.is_object_in_bucket(s3_key, account_ctx, region):
+            self.upload_fileobj(file_contents, s3_key, account_ctx, region)
+        with self.lock:
+            self.uploaded_objects.add(object_id)
         return bucket_name
 
     def get_object(self, s3_key, account_ctx, region):
@@ -58,6 +159,9 @@ class PacoBuckets():
             response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
             return response["Body"].read()
         except ClientError as error:
+            if self.is_no_such_bucket(error):
+                self.forget_bucket(account_ctx, region)
+                return None
             if error.response['Error']['Code'] != 'NoSuchKey':
                 raise error
             else:
@@ -65,13 +169,14 @@ class PacoBuckets():
 
     def put_object(self, s3_key, obj, account_ctx, region):
         """Put an S3 Object in a Paco Bucket"""
-        self.create_bucket(account_ctx, region)
-        bucket_name = self.get_bucket_name(account_ctx, region)
         s3_client = account_ctx.get_aws_client('s3', region)
         if type(obj) != bytes:
             obj = obj.encode('utf-8')
-        s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=obj)
-        return bucket_name
+        return self.with_bucket(
+            account_ctx,
+            region,
+            lambda bucket_name: s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=obj)
+        )
 
     def create_bucket(self, account_ctx, region):
         "Create a Paco S3 Bucket for an account and region"
@@ -124,25 +229,16 @@ class PacoBuckets():
     def is_bucket_created(self, account_ctx, region):
         "True if the S3 Bucket for the account and region exists"
         bucket_name = self.get_bucket_name(account_ctx, region)
+        with self.lock:
+            if bucket_name in self.configured_buckets:
+                return True
         s3_client = account_ctx.get_aws_client('s3', region)
-        retry_count = 0
-        while True:
-            try:
-                s3_client.get_bucket_location(Bucket=bucket_name)
-            except ClientError as error:
-                if error.response['Error']['Code'] == 'ExpiredToken':
-                    retry_count += 1
-                    s3_client = account_ctx.get_aws_client('s3', region, force=True)
-                    print(f"paco_buckets: is_bucket_created: S3 Client Token Expired: Retry number {retry_count}")
-                    if retry_count > 10:
-                        print(f"paco_buckets: is_bucket_created: S3 client token refresh tried too many times, aborting.")
-                        raise error
-                    continue
-                elif error.response['Error']['Code'] != 'NoSuchBucket':
-                    raise error
-                else:
-                    return False
-            break
+        try:
+            s3_client.get_bucket_location(Bucket=bucket_name)
+        except ClientError as error:
+            if error.response['Error']['Code'] != 'NoSuchBucket':
+                raise error
+            return False
         return True
 
     def is_object_in_bucket(self, s3_key, account_ctx, region):
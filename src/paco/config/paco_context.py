@@ -1,18 +1,24 @@
 from paco import utils
 from paco.core.exception import StackException
-from paco.core.exception import PacoErrorCode, MissingAccountId, InvalidAccountName
+from paco.core.exception import PacoErrorCode, MissingAccountId, InvalidAccountName, AuthenticationError
 from paco.models import vocabulary
 from paco.models.references import Reference
 from paco.models.exceptions import InvalidPacoProjectFile
 from paco.models import references
 from paco.models import load_project_from_yaml
+from paco.models import schemas
+from paco.models.locations import get_parent_by_interface
 from paco.models.references import get_model_obj_from_ref
-from paco.core.yaml import read_yaml_file
 from paco.core.yaml import YAML
 from paco.config.interfaces import IAccountContext
 from paco.config.paco_buckets import PacoBuckets
+from paco.stack.interfaces import IStack
+from paco.config import aws_clients
+from paco.utils.cache import load_cached_project
+from paco.utils.yaml_diff import diff_yaml_files
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from shutil import copyfile
-from deepdiff import DeepDiff
 from zope.interface import implementer
 import json
 import paco.config.aws_credentials
@@ -21,6 +27,8 @@ import paco.controllers
 import paco.models.services
 import os, sys, re
 import pathlib
+import threading
+import time
 
 @implementer(IAccountContext)
 class AccountContext(object):
@@ -49,6 +57,10 @@ Paco projects `accounts/` directory.
         self.mfa_account = mfa_account
         self.aws_session = None
         self.temp_aws_session = None
+        self.client_lock = threading.RLock()
+        self.session_lock = threading.RLock()
+        self.session_refreshed_at = None
+        self.credentials = None
         role_cache_filename = '-'.join(['paco', paco_ctx.project.name, self.name]) + '.role'
         cache_dir = pathlib.Path.home() / '.aws' / 'cli' / 'cache'
         cache_dir.mkdir(parents=True, exist_ok=True)
@@ -109,6 +121,16 @@ Add this manually or run `paco provision accounts` for this project.
     def get_session(self, force=False):
         if self.paco_ctx.skip_account_ctx:
             return None
+        with self.session_lock:
+            session = self._get_session(force, prompt=False)
+        if session != None:
+            return session
+        # getting a session can prompt for an MFA token
+        with self.paco_ctx.interactive_lock:
+            with self.session_lock:
+                return self._get_session(force)
+
+    def _get_session(self, force=False, prompt=True):
         if self.aws_session == None:
             self.aws_session = paco.config.aws_credentials.PacoSTS(
                     self,
@@ -121,10 +143,51 @@ Add this manually or run `paco provision accounts` for this project.
                     mfa_session_expiry_secs=self.mfa_session_expiry_secs,
                     assume_role_session_expiry_secs=self.assume_role_session_expiry_secs
             )
-        if self.temp_aws_session == None or force == True:
-            self.temp_aws_session = self.aws_session.get_temporary_session()
+        if self.temp_aws_session == None:
+            role_creds = self.aws_session.get_role_credentials(prompt)
+            if role_creds == None:
+                return None
+            # clients of the session share credentials that renew themselves
+            self.credentials = aws_clients.AccountCredentials.new(
+                paco.config.aws_credentials.get_credentials_metadata(role_creds),
+                self.load_credentials_metadata,
+            )
+            self.temp_aws_session = paco.config.aws_credentials.new_boto3_session(
+                credential_provider=aws_clients.AccountCredentialProvider(self.credentials)
+            )
+        elif force == True:
+            self.credentials.renew()
         return self.temp_aws_session
 
+    def load_credentials_metadata(self, use_cache=True):
+        """Metadata of new AssumeRole credentials for the AccountCredentials.
+        botocore calls this while other threads wait to sign their requests, so it never prompts
+        for an MFA token, which could wait on a thread that holds the interactive lock."""
+        with self.session_lock:
+            role_creds = self.aws_session.get_role_credentials(prompt=False, use_cache=use_cache)
+        if role_creds == None:
+            raise AuthenticationError(
+                f"The MFA session used for the '{self.name}' account expired during this run.\n"
+                "Run the command again to enter a new MFA token.\n"
+            )
+        return paco.config.aws_credentials.get_credentials_metadata(role_creds)
+
+    def refresh_session(self):
+        "Renew the credentials after AWS has rejected them, unless another thread just renewed them"
+        with self.session_lock:
+            now = time.monotonic()
+            if self.session_refreshed_at != None and now - self.session_refreshed_at < aws_clients.SESSION_REFRESH_INTERVAL_SECS:
+                return
+            self.session_refreshed_at = now
+        self.get_session(force=True)
+
+    def warm_up(self, aws_regions):
+        "Assume the account role and create the CloudFormation and S3 clients for each region"
+        self.get_session()
+        for aws_region in aws_regions:
+            self.get_aws_client('cloudformation', aws_region)
+            self.get_aws_client('s3', aws_region)
+
     @property
     def model_obj(self):
         return self.config
@@ -142,8 +205,11 @@ Add this manually or run `paco provision accounts` for this project.
             client_id += aws_region
         if client_id not in self.client_cache.keys() or force == True:
             session = self.get_session(force)
-            self.client_cache[client_id] = session.client(
-                client_name, region_name=aws_region, config=client_config)
+            # boto3 Sessions are not thread-safe
+            with self.client_lock:
+                client = session.client(
+                    client_name, region_name=aws_region, config=aws_clients.get_client_config(client_config))
+                self.client_cache[client_id] = aws_clients.configure_client(self, client, aws_region)
         return self.client_cache[client_id]
 
     def get_aws_resource(self, resource_name, aws_region=None, resource_config=None):
@@ -152,14 +218,17 @@ Add this manually or run `paco provision accounts` for this project.
             resource_id += aws_region
         if resource_id not in self.resource_cache.keys():
             session = self.get_session()
-            self.resource_cache[resource_id] = session.resource(
-                resource_name, region_name=aws_region, config=resource_config)
+            with self.client_lock:
+                resource = session.resource(
+                    resource_name, region_name=aws_region, config=aws_clients.get_client_config(resource_config))
+                aws_clients.configure_client(self, resource.meta.client, aws_region)
+                self.resource_cache[resource_id] = resource
         return self.resource_cache[resource_id]
 
 
 # deep diff formatting
 def getFromSquareBrackets(s):
-    return re.findall(r"\['?([A-Za-z0-9_]+)'?\]", s.replace('{', '').replace('}',''))
+    return re.findall(r"\['?(!?[A-Za-z0-9_:]+)'?\]", s.replace('{', '').replace('}',''))
 
 def print_diff_list(change_t, level=1):
     print('', end='\n')
@@ -248,6 +317,25 @@ class PacoContext(object):
         self.quiet_changes_only = False
         self.hooks_only = False
         self.cfn_lint = False
+        # Number of Stacks to provision concurrently
+        self.parallel = 1
+        # Provision the EnvironmentRegions of a NetworkEnvironment concurrently
+        self.parallel_regions = False
+        # Assume roles and create clients for the accounts in the config scope concurrently after loading
+        self.warm_up_accounts = False
+        # Reuse the model loaded from YAML by a previous run if the project has not changed
+        self.model_cache = True
+        # Resolve Stack Outputs from .paco-work/outputs for Stacks not changed in this run
+        self.saved_outputs = False
+        # Seconds between polls of in-flight CloudFormation stacks, backing off to the max when nothing changes
+        self.stack_poll_interval = 3
+        self.stack_poll_max_interval = 20
+        # Seconds to wait for an SSM Run Command to finish on the instances it targets
+        self.ssm_command_timeout = 900
+        # Held while prompting on the CLI so that concurrent Stacks do not interleave prompts
+        self.interactive_lock = threading.RLock()
+        # Per-thread prefix for log lines, such as the region of a concurrently provisioned EnvironmentRegion
+        self.log_context = threading.local()
 
         self.paco_path = os.getcwd()
         self.aws_name = "Paco"
@@ -263,6 +351,8 @@ class PacoContext(object):
         self.paco_buckets = None
         self.skip_account_ctx = False
         self.auto_publish_code = False
+        # References resolved by get_ref_cached during this run
+        self.ref_cache = {}
 
     def get_account_context(self, account_ref=None, account_name=None, netenv_ref=None):
         """
@@ -297,6 +387,47 @@ class PacoContext(object):
 
         return account_ctx
 
+    def get_scope_accounts(self, model_obj):
+        """Return a dict of region name lists keyed by account name for the accounts used by a config scope.
+        Scopes outside of a NetworkEnvironment use every account and all active regions."""
+        scope_accounts = {}
+        env = None
+        if model_obj != None:
+            env = get_parent_by_interface(model_obj, schemas.IEnvironment)
+        if env != None:
+            env_regions = env.env_regions.values()
+            scope_env_region = get_parent_by_interface(model_obj, schemas.IEnvironmentRegion)
+            if scope_env_region != None:
+                env_regions = [scope_env_region]
+            for env_region in env_regions:
+                if env_region.network == None or env_region.network.aws_account == None:
+                    continue
+                account_name = Reference(env_region.network.aws_account).parts[1]
+                scope_accounts.setdefault(account_name, [])
+                if env_region.name not in scope_accounts[account_name]:
+                    scope_accounts[account_name].append(env_region.name)
+        else:
+            for account in self.project['accounts'].values():
+                if account.account_id != None:
+                    scope_accounts[account.name] = list(self.project.active_regions)
+        return scope_accounts
+
+    def warm_up_account_contexts(self, model_obj):
+        "Create the AccountContexts for a config scope and assume their roles concurrently"
+        scope_accounts = self.get_scope_accounts(model_obj)
+        if len(scope_accounts) == 0:
+            return
+        account_ctxs = [self.get_account_context(account_name=account_name) for account_name in scope_accounts]
+        # prompt for an MFA token once before the roles are assumed concurrently
+        self.master_account.get_session()
+        with ThreadPoolExecutor(max_workers=len(account_ctxs), thread_name_prefix='paco-account') as executor:
+            futures = [
+                executor.submit(account_ctx.warm_up, scope_accounts[account_ctx.name])
+                for account_ctx in account_ctxs
+            ]
+            for future in futures:
+                future.result()
+
     def get_region_from_ref(self, netenv_ref):
         region = netenv_ref.split(' ')[1]
         region = region.split('.')[3]
@@ -312,6 +443,7 @@ This directory contains several sub-directories that Paco uses:
 
   .paco-work/
     build/
+    cache/
     outputs/
     applied/
     describe/
@@ -324,6 +456,11 @@ This directory contains several sub-directories that Paco uses:
         "Return the path to the Paco outputs directory"
         return self.paco_work_path / 'outputs'
 
+    @property
+    def model_cache_path(self):
+        "Return the path to the Paco model cache directory"
+        return self.paco_work_path / 'cache'
+
     @property
     def applied_path(self):
         "Return the path to the Paco applied directory"
@@ -355,12 +492,23 @@ This directory contains several sub-directories that Paco uses:
 
         # Load the model from YAML
         print("Loading Paco project: %s" % (self.home))
-        self.project = load_project_from_yaml(
-            self.project_folder,
-            warn=self.warn,
-            validate_local_paths=validate_local_paths,
-        )
-        self.paco_buckets = PacoBuckets(self.project)
+        if self.model_cache == True:
+            self.project = load_cached_project(
+                self.project_folder,
+                self.model_cache_path,
+                warn=self.warn,
+                validate_local_paths=validate_local_paths,
+                refresh=self.nocache,
+            )
+        else:
+            self.project = load_project_from_yaml(
+                self.project_folder,
+                warn=self.warn,
+                validate_local_paths=validate_local_paths,
+            )
+        self.paco_buckets = PacoBuckets(self.project, self.paco_work_path / 'paco-buckets.yaml')
+        if self.nocache == False:
+            self.paco_buckets.load_registry()
         if self.verbose:
             print("Finished loading.")
         if project_only == True:
@@ -401,6 +549,9 @@ This directory contains several sub-directories that Paco uses:
         if master_only or self.config_scope == 'accounts':
             return
 
+        if self.warm_up_accounts == True and self.skip_account_ctx == False:
+            self.warm_up_account_contexts(model_obj)
+
         # Initialize Controllers so they can set their resolve_ref_obj's for reference lookups
         self.get_controller('Route53')
         self.get_controller('CodeCommit')
@@ -468,6 +619,19 @@ This directory contains several sub-directories that Paco uses:
             account_ctx=account_ctx
         )
 
+    def get_ref_cached(self, paco_ref, account_ctx=None):
+        """Same as get_ref but each distinct reference to a Stack is only resolved once per run.
+        Other values are resolved every time, as they can be read from the Outputs of a Stack
+        that has been updated since."""
+        key = (paco_ref, None if account_ctx == None else account_ctx.get_name())
+        if key in self.ref_cache:
+            return self.ref_cache[key]
+        value = self.get_ref(paco_ref, account_ctx=account_ctx)
+        if IStack.providedBy(value):
+            # the Stack Output is looked up by the caller
+            self.ref_cache[key] = value
+        return value
+
     def check_notification_config(self):
         """Detect misconfigured alarm notification situations.
         This happens after both MonitorConfig and NetworkEnvironments have loaded.
@@ -504,15 +668,8 @@ This directory contains several sub-directories that Paco uses:
         applied_file_path, new_file_path = self.init_model_obj_store(model_obj)
         if applied_file_path.exists() == False:
             return
-        applied_file_dict = read_yaml_file(applied_file_path)
-        new_file_dict = read_yaml_file(new_file_path)
-        deep_diff = DeepDiff(
-            applied_file_dict,
-            new_file_dict,
-            verbose_level=1,
-            view='tree'
-        )
-        if len(deep_diff.keys()) == 0:
+        deep_diff = diff_yaml_files(applied_file_path, new_file_path)
+        if deep_diff == None:
             return
 
         print("---------------------------------------------------------")
@@ -605,23 +762,37 @@ This directory contains several sub-directories that Paco uses:
         applied_file_path, new_file_path = self.init_model_obj_store(model_obj)
         copyfile(new_file_path, applied_file_path)
 
+    def get_log_prefix(self):
+        "Log prefix of the current thread"
+        return getattr(self.log_context, 'prefix', '')
+
+    @contextmanager
+    def log_prefix(self, prefix):
+        "Prefix the log lines of the current thread"
+        previous = self.get_log_prefix()
+        self.log_context.prefix = prefix
+        try:
+            yield
+        finally:
+            self.log_context.prefix = previous
+
     def log_section_start(self, action, obj):
         "Log start with a bar header"
         if not self.verbose:
             return
-        print("=== {}: {} ===".format(action, obj.paco_ref_parts))
+        print(self.get_log_prefix() + "=== {}: {} ===".format(action, obj.paco_ref_parts))
 
     def log_start(self, action, obj):
         "Log start with a table header"
         if not self.verbose:
             return
-        print("> {}: start: {}".format(action, obj.paco_ref_parts))
+        print(self.get_log_prefix() + "> {}: start: {}".format(action, obj.paco_ref_parts))
 
     def log_finish(self, action, obj):
         "Log Init finish for a controller"
         if not self.verbose:
             return
-        print("< {}: finish: {}".format(action, obj.paco_ref_parts))
+        print(self.get_log_prefix() + "< {}: finish: {}".format(action, obj.paco_ref_parts))
 
     def log_action_col(
         self,
@@ -672,7 +843,8 @@ This directory contains several sub-directories that Paco uses:
             bars = '| '
         else:
             bars = ''
-        message = bars + create_log_col(col_1, col_1_size, 0)
+        prefix = self.get_log_prefix()
+        message = prefix + bars + create_log_col(col_1, col_1_size, len(prefix))
         if col_2 != None:
             message += bars + create_log_col(col_2, col_2_size, len(message), col_2_wrap_text)
             if col_3 != None:
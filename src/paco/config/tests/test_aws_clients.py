@@ -0,0 +1,121 @@
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta, timezone
+from paco.config.aws_clients import AccountCredentials, AccountCredentialProvider, RateLimiter, \
+    configure_client, get_client_config, get_rate_limiter
+from paco.config.aws_credentials import new_boto3_session
+from paco.config.paco_context import AccountContext
+from paco.core.exception import AuthenticationError
+import threading
+import unittest
+
+
+class FakeRaw():
+
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class FakeAccountContext():
+    "Renews the AccountCredentials of a session when AWS rejects them"
+
+    def __init__(self):
+        self.loads = []
+        self.credentials = AccountCredentials.new(self.load_credentials_metadata(), self.load_credentials_metadata)
+
+    def get_name(self):
+        return 'test'
+
+    def load_credentials_metadata(self, use_cache=True):
+        self.loads.append(use_cache)
+        return {
+            'access_key': f'key{len(self.loads)}',
+            'secret_key': 'secret',
+            'token': 'token',
+            'expiry_time': (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
+        }
+
+    def refresh_session(self):
+        self.credentials.renew()
+
+
+class TestAWSClients(unittest.TestCase):
+
+    def test_client_config(self):
+        config = get_client_config()
+        self.assertEqual(config.retries['mode'], 'adaptive')
+        config = get_client_config(Config(connect_timeout=5, retries={'max_attempts': 3}))
+        self.assertEqual(config.connect_timeout, 5)
+        self.assertEqual(config.retries, {'mode': 'adaptive', 'max_attempts': 3})
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(max_rate=8, min_rate=1)
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 4)
+        for _ in range(4):
+            limiter.throttled()
+        self.assertEqual(limiter.rate, 1)
+        limiter.succeeded()
+        self.assertEqual(limiter.rate, 1.5)
+        self.assertIs(get_rate_limiter('dev', 'us-west-2', 'ecs'), get_rate_limiter('dev', 'us-west-2', 'ecs'))
+        self.assertIsNot(get_rate_limiter('dev', 'us-west-2', 'ecs'), get_rate_limiter('dev', 'us-east-1', 'ecs'))
+
+    def test_expired_token_renews_credentials_once(self):
+        account_ctx = FakeAccountContext()
+        session = new_boto3_session(credential_provider=AccountCredentialProvider(account_ctx.credentials))
+        client = session.client('ecs', region_name='us-west-2', config=get_client_config())
+        configure_client(account_ctx, client, 'us-west-2')
+        access_keys = []
+        def expired_token(request, **kwargs):
+            access_keys.append(request.headers['Authorization'].decode().split('Credential=')[1].split('/')[0])
+            body = b'{"__type": "ExpiredTokenException", "message": "The security token included in the request is expired"}'
+            return AWSResponse(request.url, 400, {}, FakeRaw(body))
+        client.meta.events.register('before-send', expired_token)
+        with self.assertRaises(ClientError):
+            client.list_clusters()
+        # the request was retried once, signed with renewed credentials that did not come from the cache
+        self.assertEqual(access_keys, ['key1', 'key2'])
+        self.assertEqual(account_ctx.loads, [True, False])
+
+    def test_refresh_does_not_wait_for_prompts(self):
+        # the MFA session has expired, so new AssumeRole credentials would need an MFA token
+        refreshing = threading.Event()
+        class ExpiredPacoSTS():
+            def get_role_credentials(self, prompt=True, use_cache=True):
+                refreshing.set()
+                return None
+        class FakePacoContext():
+            interactive_lock = threading.RLock()
+        account_ctx = AccountContext.__new__(AccountContext)
+        account_ctx.name = 'test'
+        account_ctx.paco_ctx = FakePacoContext()
+        account_ctx.session_lock = threading.RLock()
+        account_ctx.aws_session = ExpiredPacoSTS()
+        # credentials within the mandatory refresh window
+        account_ctx.credentials = AccountCredentials.new({
+            'access_key': 'key', 'secret_key': 'secret', 'token': 'token',
+            'expiry_time': (datetime.now(timezone.utc) + timedelta(seconds=60)).isoformat(),
+        }, account_ctx.load_credentials_metadata)
+        errors = []
+        def sign():
+            try:
+                account_ctx.credentials.get_frozen_credentials()
+            except AuthenticationError as error:
+                errors.append(error)
+        def provision():
+            # a Stack that is prompting holds the interactive lock while it signs a request
+            with account_ctx.paco_ctx.interactive_lock:
+                watcher = threading.Thread(target=sign)
+                watcher.start()
+                refreshing.wait(5)
+                sign()
+            watcher.join(5)
+        thread = threading.Thread(target=provision, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 2)
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from paco.config.aws_credentials import PacoSTS, new_boto3_session
+import pathlib
+import tempfile
+import unittest
+
+
+class TestCachedCredentials(unittest.TestCase):
+
+    def setUp(self):
+        self.creds_path = pathlib.Path(tempfile.mkdtemp()) / 'role-creds'
+        self.paco_sts = PacoSTS()
+
+    def save_creds(self, expires_in):
+        self.paco_sts.save_temp_creds({
+            'AccessKeyId': 'AKIA',
+            'SecretAccessKey': 'secret',
+            'SessionToken': 'token',
+            'Expiration': datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+        }, self.creds_path)
+
+    def test_unexpired_credentials(self):
+        self.save_creds(3600)
+        credentials = self.paco_sts.load_temp_creds(self.creds_path)
+        self.assertEqual(credentials['AccessKeyId'], 'AKIA')
+
+    def test_expired_credentials(self):
+        self.save_creds(-60)
+        self.assertEqual(self.paco_sts.load_temp_creds(self.creds_path), None)
+        # credentials about to expire are renewed
+        self.save_creds(60)
+        self.assertEqual(self.paco_sts.load_temp_creds(self.creds_path), None)
+
+    def test_missing_credentials(self):
+        self.assertEqual(self.paco_sts.load_temp_creds(self.creds_path), None)
+        self.creds_path.write_text('not json')
+        self.assertEqual(self.paco_sts.load_temp_creds(self.creds_path), None)
+
+    def test_renew_skips_cached_role_credentials(self):
+        self.save_creds(3600)
+        self.paco_sts.role_creds_path = self.creds_path
+        self.paco_sts.session_creds_path = self.creds_path.parent / 'session-creds'
+        self.assertEqual(self.paco_sts.get_role_credentials(prompt=False)['AccessKeyId'], 'AKIA')
+        # rejected credentials are not loaded from the cache again
+        self.assertEqual(self.paco_sts.get_role_credentials(prompt=False, use_cache=False), None)
+
+
+class TestNewBoto3Session(unittest.TestCase):
+
+    def test_sessions_share_loader(self):
+        first_session = new_boto3_session()
+        loader = first_session._session.get_component('data_loader')
+        search_paths = list(loader.search_paths)
+        second_session = new_boto3_session(region_name='us-west-2')
+        self.assertIs(second_session._session.get_component('data_loader'), loader)
+        # boto3 resource data paths are not added again
+        self.assertEqual(loader.search_paths, search_paths)
+        self.assertEqual(len(set(loader.search_paths)), len(loader.search_paths))
+        self.assertEqual(second_session.region_name, 'us-west-2')
@@ -0,0 +1,106 @@
+from botocore.exceptions import ClientError
+from paco.config.paco_buckets import PacoBuckets
+from paco.config.interfaces import IAccountContext
+from zope.interface import implementer
+import pathlib
+import tempfile
+import unittest
+
+
+class FakeProject():
+    name = 'test'
+    s3bucket_hash = None
+
+
+class FakeS3():
+
+    def __init__(self):
+        self.calls = []
+        self.buckets = set()
+        self.objects = set()
+
+    def get_bucket_location(self, Bucket):
+        self.calls.append('get_bucket_location')
+        if Bucket not in self.buckets:
+            raise ClientError({'Error': {'Code': 'NoSuchBucket'}}, 'GetBucketLocation')
+
+    def create_bucket(self, Bucket, **kwargs):
+        self.calls.append('create_bucket')
+        self.buckets.add(Bucket)
+
+    def put_bucket_versioning(self, **kwargs):
+        self.calls.append('put_bucket_versioning')
+
+    def put_public_access_block(self, **kwargs):
+        self.calls.append('put_public_access_block')
+
+    def put_bucket_encryption(self, **kwargs):
+        self.calls.append('put_bucket_encryption')
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append('put_object')
+        if Bucket not in self.buckets:
+            raise ClientError({'Error': {'Code': 'NoSuchBucket'}}, 'PutObject')
+
+    def upload_fileobj(self, fileobj, bucket_name, s3_key):
+        self.calls.append('upload_fileobj')
+        self.objects.add(s3_key)
+
+    def head_object(self, Bucket, Key):
+        self.calls.append('head_object')
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}, 'ResponseMetadata': {'HTTPStatusCode': 404}}, 'HeadObject')
+
+
+@implementer(IAccountContext)
+class FakeAccountContext():
+
+    def __init__(self, client):
+        self.name = 'dev'
+        self.client = client
+
+    def get_aws_client(self, client_name, aws_region=None, force=False):
+        return self.client
+
+
+class TestPacoBuckets(unittest.TestCase):
+
+    def setUp(self):
+        self.s3 = FakeS3()
+        self.account_ctx = FakeAccountContext(self.s3)
+        self.registry_path = pathlib.Path(tempfile.mkdtemp()) / 'paco-buckets.yaml'
+
+    def test_bucket_configured_once(self):
+        paco_buckets = PacoBuckets(FakeProject(), self.registry_path)
+        paco_buckets.put_object('one', 'body', self.account_ctx, 'us-west-2')
+        paco_buckets.put_object('two', 'body', self.account_ctx, 'us-west-2')
+        self.assertEqual(self.s3.calls.count('create_bucket'), 1)
+        self.assertEqual(self.s3.calls.count('put_bucket_encryption'), 1)
+        self.assertEqual(self.s3.calls.count('put_object'), 2)
+
+    def test_registry(self):
+        paco_buckets = PacoBuckets(FakeProject(), self.registry_path)
+        paco_buckets.put_object('one', 'body', self.account_ctx, 'us-west-2')
+        self.s3.calls = []
+        # a later run skips the bucket set up
+        paco_buckets = PacoBuckets(FakeProject(), self.registry_path)
+        paco_buckets.load_registry()
+        paco_buckets.put_object('two', 'body', self.account_ctx, 'us-west-2')
+        self.assertEqual(self.s3.calls, ['put_object'])
+        # a bucket deleted outside of Paco is created again
+        self.s3.buckets = set()
+        self.s3.calls = []
+        paco_buckets.put_object('three', 'body', self.account_ctx, 'us-west-2')
+        self.assertEqual(self.s3.calls.count('create_bucket'), 1)
+        self.assertEqual(self.s3.calls.count('put_object'), 2)
+
+    def test_upload_if_missing(self):
+        paco_buckets = PacoBuckets(FakeProject(), self.registry_path)
+        paco_buckets.upload_fileobj_if_missing('body', 'stack/md5-a.yaml', self.account_ctx, 'us-west-2')
+        paco_buckets.upload_fileobj_if_missing('body', 'stack/md5-a.yaml', self.account_ctx, 'us-west-2')
+        self.assertEqual(self.s3.calls.count('upload_fileobj'), 1)
+        self.assertEqual(self.s3.calls.count('head_object'), 1)
+        # an object uploaded by an earlier run is not uploaded again
+        paco_buckets = PacoBuckets(FakeProject(), self.registry_path)
+        paco_buckets.upload_fileobj_if_missing('body', 'stack/md5-a.yaml', self.account_ctx, 'us-west-2')
+        self.assertEqual(self.s3.calls.count('upload_fileobj'), 1)
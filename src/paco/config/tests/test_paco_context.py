@@ -0,0 +1,97 @@
+from paco.config.paco_context import PacoContext
+from paco.models.accounts import Account, Accounts
+from paco.models.networks import NetworkEnvironment, Environment, EnvironmentRegion, Network
+from paco.models.project import Project
+import tempfile
+import threading
+import unittest
+
+
+class FakeAccountContext():
+
+    def __init__(self, name):
+        self.name = name
+        self.sessions = 0
+        self.warmed_up_regions = None
+        self.thread_name = None
+
+    def get_session(self):
+        self.sessions += 1
+
+    def warm_up(self, aws_regions):
+        self.warmed_up_regions = aws_regions
+        self.thread_name = threading.current_thread().name
+
+
+class TestScopeAccounts(unittest.TestCase):
+
+    def setUp(self):
+        project = Project('test', None)
+        project.active_regions = ['us-west-2', 'eu-central-1']
+        project['accounts'] = Accounts('accounts', project)
+        for name, account_id in [('master', '111111111111'), ('dev', '222222222222'), ('prod', '333333333333'), ('tools', None)]:
+            account = Account(name, project['accounts'])
+            account.account_id = account_id
+            project['accounts'][name] = account
+        netenv = NetworkEnvironment('mynet', project)
+        project['netenv'] = {'mynet': netenv}
+        self.env = Environment('dev', netenv)
+        netenv['dev'] = self.env
+        for region, account_name in [('us-west-2', 'dev'), ('eu-central-1', 'prod'), ('ca-central-1', 'dev')]:
+            env_region = EnvironmentRegion(region, self.env)
+            env_region.network = Network('network', env_region)
+            env_region.network.aws_account = 'paco.ref accounts.' + account_name
+            self.env[region] = env_region
+        self.netenv = netenv
+        self.home = tempfile.TemporaryDirectory()
+        self.paco_ctx = PacoContext(self.home.name)
+        self.paco_ctx.project = project
+
+    def tearDown(self):
+        self.home.cleanup()
+
+    def test_env_region_scope(self):
+        self.assertEqual(
+            self.paco_ctx.get_scope_accounts(self.env['us-west-2']),
+            {'dev': ['us-west-2']}
+        )
+
+    def test_env_scope(self):
+        self.assertEqual(
+            self.paco_ctx.get_scope_accounts(self.env),
+            {'dev': ['us-west-2', 'ca-central-1'], 'prod': ['eu-central-1']}
+        )
+
+    def test_env_region_without_network_account(self):
+        self.env['ca-central-1'].network.aws_account = None
+        self.assertEqual(self.paco_ctx.get_scope_accounts(self.env['ca-central-1']), {})
+
+    def test_non_netenv_scope(self):
+        # every account with an account_id in all active regions
+        all_accounts = {
+            'master': ['us-west-2', 'eu-central-1'],
+            'dev': ['us-west-2', 'eu-central-1'],
+            'prod': ['us-west-2', 'eu-central-1'],
+        }
+        self.assertEqual(self.paco_ctx.get_scope_accounts(self.netenv), all_accounts)
+        self.assertEqual(self.paco_ctx.get_scope_accounts(None), all_accounts)
+
+    def test_warm_up_account_contexts(self):
+        self.paco_ctx.master_account = FakeAccountContext('master')
+        for name in ('dev', 'prod'):
+            self.paco_ctx.accounts[name] = FakeAccountContext(name)
+        self.paco_ctx.warm_up_account_contexts(self.env)
+
+        # the MFA token is prompted for once before the roles are assumed concurrently
+        self.assertEqual(self.paco_ctx.master_account.sessions, 1)
+        self.assertEqual(self.paco_ctx.accounts['dev'].warmed_up_regions, ['us-west-2', 'ca-central-1'])
+        self.assertEqual(self.paco_ctx.accounts['prod'].warmed_up_regions, ['eu-central-1'])
+        for name in ('dev', 'prod'):
+            self.assertTrue(self.paco_ctx.accounts[name].thread_name.startswith('paco-account'))
+
+    def test_warm_up_without_accounts(self):
+        self.paco_ctx.master_account = FakeAccountContext('master')
+        for env_region in self.env.env_regions.values():
+            env_region.network.aws_account = None
+        self.paco_ctx.warm_up_account_contexts(self.env)
+        self.assertEqual(self.paco_ctx.master_account.sessions, 0)
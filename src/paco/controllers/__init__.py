@@ -1,31 +1,66 @@
-from paco.controllers.ctl_network_environment import NetEnvController
-from paco.controllers.ctl_s3 import S3Controller
-from paco.controllers.ctl_codecommit import CodeCommitController
-from paco.controllers.ctl_route53 import Route53Controller
-from paco.controllers.ctl_iam import IAMController
-from paco.controllers.ctl_account import AccountController
-from paco.controllers.ctl_project import ProjectController
-from paco.controllers.ctl_ec2 import EC2Controller
-from paco.controllers.ctl_cloudwatch import CloudWatchController
-from paco.controllers.ctl_snstopics import SNTopicsGroupsController
-from paco.controllers.ctl_cloudtrail import CloudTrailController
-from paco.controllers.ctl_ssm import SSMController
-from paco.controllers.ctl_config import ConfigController
-from paco.controllers.ctl_sns import SNSController
-
-klass = {
-    'netenv': NetEnvController,
-    's3': S3Controller,
-    'codecommit': CodeCommitController,
-    'route53': Route53Controller,
-    'iam': IAMController,
-    'account': AccountController, # deprecated
-    'accounts': AccountController, # required to support `paco provision acocunts` command
-    'project': ProjectController,
-    'ec2': EC2Controller,
-    'cloudwatch': CloudWatchController,
-    'sns': SNSController,
-    'cloudtrail': CloudTrailController,
-    'ssm': SSMController,
-    'config': ConfigController,
+"""
+Controllers are imported from their modules the first time they are used,
+so that a command only imports the controllers that it needs.
+"""
+
+import importlib
+
+
+controller_modules = {
+    'NetEnvController': 'paco.controllers.ctl_network_environment',
+    'S3Controller': 'paco.controllers.ctl_s3',
+    'CodeCommitController': 'paco.controllers.ctl_codecommit',
+    'Route53Controller': 'paco.controllers.ctl_route53',
+    'IAMController': 'paco.controllers.ctl_iam',
+    'AccountController': 'paco.controllers.ctl_account',
+    'ProjectController': 'paco.controllers.ctl_project',
+    'EC2Controller': 'paco.controllers.ctl_ec2',
+    'CloudWatchController': 'paco.controllers.ctl_cloudwatch',
+    'SNTopicsGroupsController': 'paco.controllers.ctl_snstopics',
+    'CloudTrailController': 'paco.controllers.ctl_cloudtrail',
+    'SSMController': 'paco.controllers.ctl_ssm',
+    'ConfigController': 'paco.controllers.ctl_config',
+    'SNSController': 'paco.controllers.ctl_sns',
 }
+
+controller_names = {
+    'netenv': 'NetEnvController',
+    's3': 'S3Controller',
+    'codecommit': 'CodeCommitController',
+    'route53': 'Route53Controller',
+    'iam': 'IAMController',
+    'account': 'AccountController', # deprecated
+    'accounts': 'AccountController', # required to support `paco provision acocunts` command
+    'project': 'ProjectController',
+    'ec2': 'EC2Controller',
+    'cloudwatch': 'CloudWatchController',
+    'sns': 'SNSController',
+    'cloudtrail': 'CloudTrailController',
+    'ssm': 'SSMController',
+    'config': 'ConfigController',
+}
+
+def get_controller_class(class_name):
+    "Import and return a controller class"
+    return getattr(importlib.import_module(controller_modules[class_name]), class_name)
+
+
+class ControllerClasses():
+    "Controller classes keyed by controller type, imported on first use"
+
+    def __getitem__(self, controller_type):
+        return get_controller_class(controller_names[controller_type])
+
+    def __contains__(self, controller_type):
+        return controller_type in controller_names
+
+    def keys(self):
+        return controller_names.keys()
+
+
+klass = ControllerClasses()
+
+def __getattr__(name):
+    if name in controller_modules:
+        return get_controller_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
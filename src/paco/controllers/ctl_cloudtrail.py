@@ -3,6 +3,7 @@ import paco.models.applications
 import os
 from paco.controllers.controllers import Controller
 from paco.stack import Stack, StackGroup
+from paco.stack.fanout import StackGroupFanOut
 from paco.models.loader import apply_attributes_from_config
 from paco.core.exception import PacoBucketExists
 from paco.models.references import get_model_obj_from_ref
@@ -173,6 +174,10 @@ class CloudTrailController(Controller):
             stack_grp.validate()
 
     def provision(self):
+        if self.paco_ctx.parallel > 1 and len(self.stack_grps) > 1:
+            # the first StackGroup has the S3 Bucket and KMS Key that the others use
+            StackGroupFanOut(self.paco_ctx, self.stack_grps, leaders=self.stack_grps[:1]).provision()
+            return
         for stack_grp in self.stack_grps:
             stack_grp.provision()
 
@@ -7,6 +7,7 @@ from paco.models.locations import get_parent_by_interface
 from paco.models import schemas
 from paco.models.base import Named
 from paco.stack import StackOrder, StackGroup, StackTags, StackHooks
+from paco.stack.fanout import StackGroupFanOut
 from paco.utils import md5sum, get_support_resource_ref_ext
 from parliament import analyze_policy_string
 import paco
@@ -761,6 +762,14 @@ class IAMController(Controller):
     def provision(self):
         # Master first due to IAM Users needing to be created first
         # before account delegate roles
+        if self.paco_ctx.parallel > 1:
+            master_stack_grp = self.iam_user_stack_groups['master']
+            StackGroupFanOut(
+                self.paco_ctx,
+                list(self.iam_user_stack_groups.values()),
+                leaders=[master_stack_grp]
+            ).provision()
+            return
         self.iam_user_stack_groups['master'].provision()
         for account_name in self.iam_user_stack_groups.keys():
             if account_name == 'master':
@@ -1,7 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from paco import utils
 from paco.controllers.controllers import Controller
 from paco.controllers.mixins import LambdaDeploy
-from paco.core.exception import UnknownSetCommand
+from paco.core.exception import UnknownSetCommand, StackException, PacoErrorCode
 from paco.core.yaml import YAML
 from paco.models import schemas
 from paco.models.locations import get_parent_by_interface
@@ -10,7 +11,10 @@ from paco.stack_grps.grp_network import NetworkStackGroup
 from paco.stack_grps.grp_secretsmanager import SecretsManagerStackGroup
 from paco.stack_grps.grp_backup import BackupVaultsStackGroup
 from paco.stack import StackTags, StackGroup
+from paco.stack.scheduler import StackScheduler
+from paco.stack.validator import StackValidator
 import getpass
+import threading
 
 
 yaml=YAML(typ="safe", pure=True)
@@ -150,11 +154,21 @@ class EnvironmentRegionContext():
                 data= merged_config['netenv'][self.netenv.name][self.env.name][self.env_region.name]
             )
 
-    def validate(self):
+    def get_stacks(self):
+        "List of the Stacks of every StackGroup"
+        return [order_item.stack for stack_grp in self.stack_grps for _, order_item in stack_grp.flatten_stack_orders()]
+
+    def validate(self, cancel_event=None):
+        if self.paco_ctx.parallel > 1:
+            # check the templates of all StackGroups together so that the checks overlap
+            StackValidator(self.paco_ctx, self.stack_grps, cancel_event=cancel_event).validate()
+            return
         for stack_grp in self.stack_grps:
+            if cancel_event != None and cancel_event.is_set():
+                return
             stack_grp.validate()
 
-    def provision(self):
+    def provision(self, cancel_event=None):
         self.paco_ctx.log_start('Provision', self.env_region)
         # provision EC2LM SSM Document first
         if self.env_region.has_ec2lm_resources():
@@ -163,14 +177,22 @@ class EnvironmentRegionContext():
         if 'paco_ecs_docker_exec' in self.paco_ctx.project['resource']['ssm'].ssm_documents:
             ssm_ctl.provision(f'resource.ssm.ssm_documents.paco_ecs_docker_exec.{self.account_ctx.name}.{self.env_region.name}')
         if len(self.stack_grps) > 0:
-            for stack_grp in self.stack_grps:
-                stack_grp.provision()
+            if self.paco_ctx.parallel > 1 or cancel_event != None:
+                # schedule all StackGroups together so that independent Stacks overlap
+                StackScheduler(self.paco_ctx, self.stack_grps, cancel_event=cancel_event).provision()
+            else:
+                for stack_grp in self.stack_grps:
+                    stack_grp.provision()
             self.save_stack_output_config()
         else:
             self.paco_ctx.log_action_col("Provision", "Nothing to provision.")
         self.paco_ctx.log_finish('Provision', self.env_region)
 
     def delete(self):
+        if self.paco_ctx.parallel > 1 and len(self.stack_grps) > 0:
+            # schedule all StackGroups together so that independent Stacks are deleted at the same time
+            StackScheduler(self.paco_ctx, self.stack_grps).delete()
+            return
         for stack_grp in reversed(self.stack_grps):
             stack_grp.delete()
 
@@ -261,21 +283,123 @@ class NetEnvController(Controller, LambdaDeploy):
         else:
             raise UnknownSetCommand(f"Unable to apply set command for resource of type '{resource.__class__.__name__}'\nObject: {resource.paco_ref_parts}")
 
-    def validate(self):
-        self.paco_ctx.log_start("Validate", self.netenv)
+    def get_env_region_ctxs(self):
+        "List of the EnvironmentRegionContexts of the NetworkEnvironment"
+        env_ctxs = []
         for env_name in self.sub_envs[self.netenv.name].keys():
             for region in self.sub_envs[self.netenv.name][env_name].keys():
-                self.paco_ctx.log_start('Validate', self.netenv[env_name][region])
-                self.sub_envs[self.netenv.name][env_name][region].validate()
-                self.paco_ctx.log_finish('Validate', self.netenv[env_name][region])
+                env_ctxs.append(self.sub_envs[self.netenv.name][env_name][region])
+        return env_ctxs
+
+    def get_env_region_dependencies(self, env_ctxs):
+        "Map each EnvironmentRegionContext to the set of other EnvironmentRegionContexts whose Stacks its Stacks depend on"
+        stack_owners = {}
+        stack_grps = []
+        for env_ctx in env_ctxs:
+            stack_grps.extend(env_ctx.stack_grps)
+            for stack in env_ctx.get_stacks():
+                stack_owners[id(stack)] = env_ctx
+        # the StackScheduler links the Stacks of every region by Stack Output Parameters, paco.sub and dependency groups
+        scheduler = StackScheduler(self.paco_ctx, stack_grps)
+        dependencies = {env_ctx: set() for env_ctx in env_ctxs}
+        for node in scheduler.nodes:
+            env_ctx = stack_owners[id(node.stack)]
+            for dep_node in node.depends_on:
+                owner = stack_owners.get(id(dep_node.stack))
+                if owner != None and owner is not env_ctx:
+                    dependencies[env_ctx].add(owner)
+        return dependencies
+
+    def check_env_region_cycles(self, env_ctxs, remaining, dependents):
+        "Raise a StackException if EnvironmentRegions use each other's Stack Outputs"
+        ready = [env_ctx for env_ctx in env_ctxs if remaining[env_ctx] == 0]
+        visited = 0
+        while ready:
+            env_ctx = ready.pop()
+            visited += 1
+            for dependent in dependents[env_ctx]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if visited != len(env_ctxs):
+            names = [env_ctx.env_region.paco_ref_parts for env_ctx, count in remaining.items() if count > 0]
+            message = "EnvironmentRegions use each other's Stack Outputs and can not be provisioned concurrently:\n"
+            message += '\n'.join(f'  {name}' for name in names) + '\n'
+            raise StackException(PacoErrorCode.Unknown, message=message)
+
+    def run_env_region(self, env_ctx, action, cancel_event):
+        "Run an action for an EnvironmentRegionContext with its log lines prefixed by the environment and region"
+        with self.paco_ctx.log_prefix(f'[{env_ctx.env.name}.{env_ctx.region}] '):
+            if action == 'validate':
+                self.paco_ctx.log_start('Validate', env_ctx.env_region)
+                # Stacks hold the interactive lock only while confirming template changes
+                env_ctx.validate(cancel_event)
+                self.paco_ctx.log_finish('Validate', env_ctx.env_region)
+            else:
+                env_ctx.provision(cancel_event)
+
+    def run_env_regions(self, action):
+        """Validate or provision the EnvironmentRegions concurrently.
+        An EnvironmentRegion starts once the EnvironmentRegions whose Stack Outputs it uses have finished.
+        If one fails, no more Stacks are started in the others, running Stacks are waited on and the error is raised."""
+        env_ctxs = self.get_env_region_ctxs()
+        dependencies = self.get_env_region_dependencies(env_ctxs)
+        dependents = {env_ctx: [] for env_ctx in env_ctxs}
+        for env_ctx, deps in dependencies.items():
+            for dep_ctx in deps:
+                dependents[dep_ctx].append(env_ctx)
+        remaining = {env_ctx: len(deps) for env_ctx, deps in dependencies.items()}
+        self.check_env_region_cycles(env_ctxs, dict(remaining), dependents)
+        ready = [env_ctx for env_ctx in env_ctxs if remaining[env_ctx] == 0]
+        cancel_event = threading.Event()
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=max(1, len(env_ctxs)), thread_name_prefix='paco-region') as executor:
+            while ready or running:
+                while ready and error == None:
+                    env_ctx = ready.pop(0)
+                    running[executor.submit(self.run_env_region, env_ctx, action, cancel_event)] = env_ctx
+                if not running:
+                    break
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    env_ctx = running.pop(future)
+                    exc = future.exception()
+                    if exc != None:
+                        # the first error is raised, the cancelled EnvironmentRegions raise their own
+                        if error == None:
+                            error = exc
+                            cancel_event.set()
+                        continue
+                    for dependent in dependents[env_ctx]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            ready.append(dependent)
+        if error != None:
+            raise error
+
+    def validate(self):
+        self.paco_ctx.log_start("Validate", self.netenv)
+        if self.paco_ctx.parallel_regions:
+            self.run_env_regions('validate')
+        else:
+            for env_name in self.sub_envs[self.netenv.name].keys():
+                for region in self.sub_envs[self.netenv.name][env_name].keys():
+                    self.paco_ctx.log_start('Validate', self.netenv[env_name][region])
+                    self.sub_envs[self.netenv.name][env_name][region].validate()
+                    self.paco_ctx.log_finish('Validate', self.netenv[env_name][region])
         self.paco_ctx.log_finish("Validate", self.netenv)
 
     def provision(self):
         self.confirm_yaml_changes(self.netenv)
         self.paco_ctx.log_start("Provision", self.netenv)
-        for env_name in self.sub_envs[self.netenv.name].keys():
-            for region in self.sub_envs[self.netenv.name][env_name].keys():
-                self.sub_envs[self.netenv.name][env_name][region].provision()
+        if self.paco_ctx.parallel_regions:
+            # every EnvironmentRegion has finished before the model is applied
+            self.run_env_regions('provision')
+        else:
+            for env_name in self.sub_envs[self.netenv.name].keys():
+                for region in self.sub_envs[self.netenv.name][env_name].keys():
+                    self.sub_envs[self.netenv.name][env_name][region].provision()
         self.apply_model_obj()
         self.paco_ctx.log_finish("Provision", self.netenv)
 
@@ -2,6 +2,7 @@ from paco import utils
 from paco.controllers.controllers import Controller
 from paco.core.exception import StackException
 from paco.stack import StackGroup, Stack, StackTags
+from paco.stack.fanout import StackGroupFanOut
 from paco.models.references import get_model_obj_from_ref, resolve_ref_outputs, Reference
 from paco.models import deepcopy_except_parent
 from paco.models.metrics import SNSTopics
@@ -143,6 +144,12 @@ class SNSController(Controller):
 
     def provision(self):
         "Provision"
+        if self.paco_ctx.parallel > 1:
+            stack_grps = []
+            for account in self.sns.computed.keys():
+                stack_grps.extend(self.sns.computed[account].stackgroups)
+            StackGroupFanOut(self.paco_ctx, stack_grps).provision()
+            return
         for account in self.sns.computed.keys():
             account_ctx = self.sns.computed[account].account_ctx
             for stackgroup in self.sns.computed[account].stackgroups:
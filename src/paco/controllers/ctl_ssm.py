@@ -1,4 +1,5 @@
 import json
+from paco.aws_api.ssm.command import SSMCommandTracker
 from paco.aws_api.ssm.document import SSMDocumentClient
 from paco.core.exception import StackException
 from paco.controllers.controllers import Controller
@@ -36,20 +37,13 @@ class SSMController(Controller):
         self.model_obj = model_obj
 
     def paco_ec2lm_update_instance(self, resource, account_ctx, region, cache_id):
-        ssm_client = account_ctx.get_aws_client('ssm', aws_region=region)
-        ssm_log_group_name = prefixed_name(resource, 'paco_ssm', self.paco_ctx.legacy_flag)
-        ssm_client.send_command(
-            Targets=[{
-                'Key': 'tag:aws:cloudformation:stack-name',
-                'Values': [resource.stack.get_name()]
-            },],
-            DocumentName='paco_ec2lm_update_instance',
-            Parameters={ 'CacheId': [cache_id] },
-            CloudWatchOutputConfig={
-                'CloudWatchLogGroupName': ssm_log_group_name,
-                'CloudWatchOutputEnabled': True,
-            },
-        )
+        parameters = { 'CacheId': [cache_id] }
+        targets=[{
+            'Key': 'tag:aws:cloudformation:stack-name',
+            'Values': [resource.stack.get_name()]
+        }]
+        # instances apply the update on their own, the provision does not wait for them
+        self.send_command(account_ctx, region, resource, parameters, targets, 'paco_ec2lm_update_instance', wait=False)
 
     def command_update_codedeploy_agent(self, resource, account_ctx, region):
         parameters = {
@@ -65,72 +59,33 @@ class SSMController(Controller):
         self.send_command(account_ctx, region, resource, parameters, targets, 'AWS-ConfigureAWSPackage')
 
     def command_update_ssm_agent(self, resource, account_ctx, region):
-        ssm_client = account_ctx.get_aws_client('ssm', aws_region=region)
-        ssm_log_group_name = prefixed_name(resource, 'paco_ssm', self.paco_ctx.legacy_flag)
-        response = ssm_client.send_command(
-            Targets=[{
-                'Key': 'tag:aws:cloudformation:stack-name',
-                'Values': [resource.stack.get_name()]
-            },],
-            CloudWatchOutputConfig={
-                'CloudWatchLogGroupName': ssm_log_group_name,
-                'CloudWatchOutputEnabled': True,
-            },
-            DocumentName='AWS-UpdateSSMAgent',
-        )
-
-    def wait_for_command(self, ssm_client, account_ctx, region, resource, command_id):
-        ec2_client = account_ctx.get_aws_client('ec2', aws_region=region)
-        ec2_response = ec2_client.describe_instances(
-            Filters=[
-                {
-                    'Name': 'tag:Paco-Stack-Name',
-                    'Values': [resource.stack.get_name()]
-                }
+        targets=[{
+            'Key': 'tag:aws:cloudformation:stack-name',
+            'Values': [resource.stack.get_name()]
+        }]
+        self.send_command(account_ctx, region, resource, None, targets, 'AWS-UpdateSSMAgent', wait=False)
 
-            ]
-        )
-        for instance in ec2_response['Reservations'][0]['Instances']:
-            instance_id = instance['InstanceId']
-            if instance['State']['Name'] != 'Running':
-                continue
-            while True:
-                # TODO: Needs a try for InvocationDoesNotExist Exception
-                try:
-                    command_response = ssm_client.get_command_invocation(
-                        CommandId=command_id,
-                        InstanceId=instance_id,
-                    )
-                except Exception as e:
-                    # An instance may need more time if we get here, try again.
-                    print(f"{instance_id}: {e}")
-                    break
-                if command_response['Status'] not in ('Pending', 'InProgress', 'Delayed'):
-                    if command_response['Status'] == 'Success':
-                        print(f"ssm command: {command_id}: success on {instance_id}")
-                    else:
-                        print(f"Command status: {instance_id}: {command_response['Status']}: {command_response['StatusDetails']}")
-                        if 'StandardOutputContent' in command_response.keys():
-                            print(f"Command stdout: {instance_id}: {command_response['StandardOutputContent']}")
-                        if 'StandardErrorContent' in command_response.keys():
-                            print(f"Command stderr: {instance_id}: {command_response['StandardErrorContent']}")
-                    break
+    def wait_for_command(self, account_ctx, region, command_id):
+        "Wait for an SSM Run Command to finish on all of the instances it targets"
+        return SSMCommandTracker(account_ctx, region, command_id, timeout=self.paco_ctx.ssm_command_timeout).wait()
 
     # Send SSM Command
-    def send_command(self, account_ctx, region, resource, parameters, targets, document_name):
+    def send_command(self, account_ctx, region, resource, parameters, targets, document_name, wait=True):
         ssm_client = account_ctx.get_aws_client('ssm', aws_region=region)
         ssm_log_group_name = prefixed_name(resource, 'paco_ssm', self.paco_ctx.legacy_flag)
-        response = ssm_client.send_command(
-            Parameters=parameters,
-            Targets=targets,
-            CloudWatchOutputConfig={
+        kwargs = {
+            'Targets': targets,
+            'CloudWatchOutputConfig': {
                 'CloudWatchLogGroupName': ssm_log_group_name,
                 'CloudWatchOutputEnabled': True,
             },
-            DocumentName=document_name
-        )
-
-        self.wait_for_command(ssm_client, account_ctx, region, resource, response['Command']['CommandId'])
+            'DocumentName': document_name,
+        }
+        if parameters != None:
+            kwargs['Parameters'] = parameters
+        response = ssm_client.send_command(**kwargs)
+        if wait:
+            self.wait_for_command(account_ctx, region, response['Command']['CommandId'])
 
     def gen_cloudwatch_config_param_store_name(self, resource):
         return f'Paco-CloudWatch-Config-{resource.stack.get_name()}'
@@ -145,7 +100,8 @@ class SSMController(Controller):
             ssm_doc.enabled = True
             ssm_documents['paco_windows_cloudwatch_agent_update'] = ssm_doc
         else:
-            ssm_documents['paco_windows_cloudwatch_agent_update'].add_location(
+            ssm_doc = ssm_documents['paco_windows_cloudwatch_agent_update']
+            ssm_doc.add_location(
                 account_ctx.paco_ref,
                 region
             )
@@ -0,0 +1,141 @@
+"""
+Batched and cached cfn-lint checks of CloudFormation templates.
+
+Running cfn-lint once per template pays for interpreter start up and loading the
+CloudFormation spec for every template. A CfnLinter collects the templates that are
+linted at the same time into batches and lints each batch with one cfn-lint process,
+so the spec is loaded once per batch. Up to one batch per CPU core runs at once.
+
+Templates that pass are recorded in the .paco-work/cfn-lint directory by the MD5 of
+their body, the cfn-lint options and the installed cfn-lint, so an unchanged template
+is not linted again by later runs. Templates with errors are always linted again.
+"""
+
+from paco.utils import md5sum
+import os
+import pathlib
+import shutil
+import subprocess
+import threading
+import time
+
+
+CFN_LINT_ARGS = ('-i', 'W')
+# Most templates in one cfn-lint process
+MAX_BATCH_SIZE = 25
+# Seconds to wait for more templates before a batch is started
+BATCH_WAIT_SECS = 0.1
+
+
+class LintRequest():
+    "A template waiting to be linted"
+
+    def __init__(self, template_path, cache_key):
+        self.template_path = str(template_path)
+        self.cache_key = cache_key
+        self.event = threading.Event()
+        self.errors = None
+        self.exception = None
+
+
+class CfnLinter():
+    "Lints CloudFormation templates in batches with a cache of the templates that passed"
+
+    def __init__(self, cache_path, use_cache=True, max_processes=None):
+        self.cache_path = pathlib.Path(cache_path)
+        self.use_cache = use_cache
+        if max_processes == None:
+            max_processes = os.cpu_count() or 1
+        self.process_semaphore = threading.Semaphore(max(1, max_processes))
+        self.lock = threading.Lock()
+        self.queue = []
+        self.dispatcher = None
+        self.cfn_lint_id = None
+
+    def get_cfn_lint_id(self):
+        "Identifies the installed cfn-lint so that an upgrade lints every template again"
+        if self.cfn_lint_id == None:
+            executable = shutil.which('cfn-lint')
+            if executable == None:
+                self.cfn_lint_id = 'missing'
+            else:
+                stat = os.stat(executable)
+                self.cfn_lint_id = f'{executable}:{stat.st_size}:{stat.st_mtime}'
+        return self.cfn_lint_id
+
+    def get_cache_key(self, template_body):
+        return md5sum(str_data='\n'.join([self.get_cfn_lint_id(), ' '.join(CFN_LINT_ARGS), template_body]))
+
+    def lint(self, template_path, template_body):
+        "Return a list of the cfn-lint errors of a template, which is empty if the template passed"
+        cache_key = self.get_cache_key(template_body)
+        if self.use_cache and (self.cache_path / cache_key).exists():
+            return []
+        request = LintRequest(template_path, cache_key)
+        with self.lock:
+            self.queue.append(request)
+            if self.dispatcher == None:
+                self.dispatcher = threading.Thread(target=self.dispatch, name='paco-cfn-lint', daemon=True)
+                self.dispatcher.start()
+        request.event.wait()
+        if request.exception != None:
+            raise request.exception
+        return request.errors
+
+    def dispatch(self):
+        "Start a batch for the queued templates until the queue is empty"
+        while True:
+            # give concurrent validations a moment to add their templates to the batch
+            time.sleep(BATCH_WAIT_SECS)
+            self.process_semaphore.acquire()
+            with self.lock:
+                batch = self.queue[:MAX_BATCH_SIZE]
+                self.queue = self.queue[MAX_BATCH_SIZE:]
+                if len(batch) == 0:
+                    self.dispatcher = None
+                    self.process_semaphore.release()
+                    return
+            threading.Thread(target=self.run_batch, args=(batch,), name='paco-cfn-lint-batch', daemon=True).start()
+
+    def run_batch(self, batch):
+        try:
+            self.lint_batch(batch)
+        except Exception as error:
+            for request in batch:
+                request.exception = error
+        finally:
+            self.process_semaphore.release()
+            for request in batch:
+                request.event.set()
+
+    def lint_batch(self, batch):
+        "Lint a batch of templates with one cfn-lint process"
+        args = ['cfn-lint', '--format', 'parseable'] + list(CFN_LINT_ARGS) + ['-t']
+        args.extend(request.template_path for request in batch)
+        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        output_lines = process.stdout.splitlines()
+        for request in batch:
+            request.errors = [line for line in output_lines if line.startswith(request.template_path + ':')]
+        if process.returncode != 0 and not any(request.errors for request in batch):
+            # cfn-lint failed without reporting an error for a template
+            for request in batch:
+                request.errors = output_lines or [f'cfn-lint exited with status {process.returncode}']
+        for request in batch:
+            if len(request.errors) == 0:
+                self.cache_path.mkdir(parents=True, exist_ok=True)
+                (self.cache_path / request.cache_key).touch()
+
+
+cfn_linters = {}
+cfn_linters_lock = threading.Lock()
+
+def get_cfn_linter(paco_ctx):
+    "Return the shared CfnLinter of a project"
+    key = str(paco_ctx.paco_work_path)
+    with cfn_linters_lock:
+        if key not in cfn_linters:
+            cfn_linters[key] = CfnLinter(
+                paco_ctx.paco_work_path / 'cfn-lint',
+                use_cache=not paco_ctx.nocache,
+            )
+        return cfn_linters[key]
@@ -0,0 +1,157 @@
+"""
+CloudFormation YAML for Troposphere templates.
+
+The dict from troposphere.Template.to_dict() is emitted directly as YAML with
+short-form intrinsic function tags (!Ref, !GetAtt, !Sub, ...), instead of going
+through Template.to_yaml() which dumps the template to JSON and converts it back
+with cfn-flip. The libyaml C emitter is used when PyYAML was built with it.
+
+Strings are styled the same way as cfn-flip: keys are sorted, empty strings and strings
+that start with 0 are quoted so that account ids stay strings, multi-line strings are double-quoted
+or literal blocks and long strings are folded.
+
+Strings of the form '!Ref SomeParam' are emitted as !Ref tags and strings of the form
+'!ManualTroposphereRef SomeParam' as !Ref 'SomeParam'.
+
+YAML files are loaded with the libyaml C loader when available. Tagged scalars are
+loaded as '!Tag value' strings and tagged sequences and mappings as {'!Tag': value}.
+"""
+
+from paco.utils import md5sum
+import json
+import re
+import yaml
+
+try:
+    from yaml import CSafeDumper as BaseDumper
+    from yaml import CSafeLoader as BaseLoader
+except ImportError:
+    from yaml import SafeDumper as BaseDumper
+    from yaml import SafeLoader as BaseLoader
+
+
+TAG_STR = 'tag:yaml.org,2002:str'
+TAG_MAP = 'tag:yaml.org,2002:map'
+
+# Strings this long are folded and strings with this many lines are literal blocks
+STR_MAX_LENGTH_QUOTED = 200
+STR_MAX_LINES_QUOTED = 10
+
+# Single key dicts that are short-form intrinsic functions
+FN_PREFIX = 'Fn::'
+CONVERTED_KEYS = ('Ref', 'Condition')
+
+tagged_ref_regex = re.compile(r"!Ref\s+(\S+)")
+manual_ref_regex = re.compile(r"!ManualTroposphereRef (.*)", re.DOTALL)
+
+
+class Tagged():
+    "A scalar emitted with a YAML tag"
+
+    def __init__(self, tag, value, style=None):
+        self.tag = tag
+        self.value = value
+        self.style = style
+
+
+class TemplateDumper(BaseDumper):
+    "Dumps a CloudFormation template dict as YAML"
+
+
+class TemplateLoader(BaseLoader):
+    "Loads YAML with any tags"
+
+
+def get_str_style(value, style=None):
+    "Return the YAML style for a string"
+    if style != None:
+        return style
+    if value == '':
+        # an empty tagged scalar is quoted, e.g. !GetAZs ''
+        return "'"
+    if sum(1 for char in value if char in ('\n', '\r')) >= STR_MAX_LINES_QUOTED:
+        return '|'
+    if len(value) >= STR_MAX_LENGTH_QUOTED and '\n' not in value:
+        return '>'
+    if value.startswith('0'):
+        return "'"
+    if '\n' in value or '\r' in value:
+        return '"'
+    return None
+
+def represent_str(dumper, value):
+    match = tagged_ref_regex.fullmatch(value)
+    if match != None:
+        return dumper.represent_scalar('!Ref', match.group(1))
+    match = manual_ref_regex.fullmatch(value)
+    if match != None:
+        return dumper.represent_scalar('!Ref', match.group(1), style="'")
+    return dumper.represent_scalar(TAG_STR, value, style=get_str_style(value))
+
+def represent_tagged(dumper, value):
+    return dumper.represent_scalar(value.tag, value.value, style=get_str_style(value.value, value.style))
+
+def represent_function(dumper, fn_name, value):
+    tag = '!' + fn_name
+    if tag == '!GetAtt' and isinstance(value, list):
+        value = '.'.join(value)
+    if isinstance(value, list):
+        return dumper.represent_sequence(tag, value)
+    if isinstance(value, dict):
+        return dumper.represent_mapping(tag, value)
+    return represent_tagged(dumper, Tagged(tag, str(value)))
+
+def represent_dict(dumper, value):
+    if len(value) == 1:
+        key = next(iter(value))
+        if key in CONVERTED_KEYS:
+            return represent_function(dumper, key, value[key])
+        if isinstance(key, str) and key.startswith(FN_PREFIX):
+            return represent_function(dumper, key[len(FN_PREFIX):], value[key])
+    return dumper.represent_mapping(TAG_MAP, value)
+
+TemplateDumper.add_representer(str, represent_str)
+TemplateDumper.add_representer(Tagged, represent_tagged)
+TemplateDumper.add_representer(dict, represent_dict)
+
+# Rendered YAML keyed by the hash of the template dict
+rendered_templates = {}
+
+def dump_template(data):
+    """Return CloudFormation YAML for the dict of a Troposphere template.
+    A template with the same structure is only rendered once per run."""
+    key = md5sum(str_data=json.dumps(data, sort_keys=True, default=str))
+    body = rendered_templates.get(key, None)
+    if body == None:
+        body = yaml.dump(
+            data,
+            Dumper=TemplateDumper,
+            default_flow_style=False,
+            allow_unicode=True,
+            width=STR_MAX_LENGTH_QUOTED,
+        )
+        rendered_templates[key] = body
+    return body
+
+def construct_tagged(loader, tag_suffix, node):
+    tag = '!' + tag_suffix
+    if isinstance(node, yaml.ScalarNode):
+        return tag + ' ' + node.value
+    if isinstance(node, yaml.SequenceNode):
+        return {tag: loader.construct_sequence(node, deep=True)}
+    return {tag: loader.construct_mapping(node, deep=True)}
+
+TemplateLoader.add_multi_constructor('!', construct_tagged)
+
+def load_yaml_file(path):
+    """Load a YAML file with the C loader if available.
+    Falls back to ruamel.yaml for YAML that PyYAML can not load."""
+    with open(path, 'r') as stream:
+        data = stream.read()
+    try:
+        return yaml.load(data, Loader=TemplateLoader)
+    except yaml.YAMLError:
+        from paco.core.yaml import YAML
+        ruamel_yaml = YAML(pure=True)
+        ruamel_yaml.allow_duplicate_keys = True
+        return ruamel_yaml.load(data)
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from paco.core.cfn_lint import CfnLinter
+import os
+import pathlib
+import tempfile
+import unittest
+
+
+# Records each invocation and reports an error for templates named bad*.yaml
+FAKE_CFN_LINT = """#!/bin/sh
+echo run >> "{calls}"
+status=0
+for arg in "$@"; do
+  case "$arg" in
+    *bad*.yaml) echo "$arg:1:1:1:2:E3001:Invalid resource"; status=2;;
+  esac
+done
+exit $status
+"""
+
+
+class TestCfnLinter(unittest.TestCase):
+
+    def setUp(self):
+        self.path = pathlib.Path(tempfile.mkdtemp())
+        self.calls = self.path / 'calls'
+        bin_path = self.path / 'bin'
+        bin_path.mkdir()
+        cfn_lint = bin_path / 'cfn-lint'
+        cfn_lint.write_text(FAKE_CFN_LINT.format(calls=self.calls))
+        cfn_lint.chmod(0o755)
+        self.orig_path = os.environ['PATH']
+        os.environ['PATH'] = str(bin_path) + os.pathsep + self.orig_path
+
+    def tearDown(self):
+        os.environ['PATH'] = self.orig_path
+
+    def template(self, name):
+        template_path = self.path / name
+        template_path.write_text(f'Description: {name}\n')
+        return template_path, template_path.read_text()
+
+    def lint_all(self, linter, names):
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            return list(executor.map(lambda name: linter.lint(*self.template(name)), names))
+
+    def test_batches_and_cache(self):
+        linter = CfnLinter(self.path / 'cache', max_processes=2)
+        results = self.lint_all(linter, ['one.yaml', 'two.yaml', 'bad.yaml'])
+        self.assertEqual(results[:2], [[], []])
+        self.assertEqual(len(results[2]), 1)
+        self.assertIn('E3001', results[2][0])
+        self.assertEqual(len(self.calls.read_text().splitlines()), 1)
+        # templates that passed are not linted again, templates with errors are
+        results = self.lint_all(linter, ['one.yaml', 'two.yaml', 'bad.yaml'])
+        self.assertEqual(len(results[2]), 1)
+        self.assertEqual(len(self.calls.read_text().splitlines()), 2)
+        self.assertEqual(linter.lint(*self.template('one.yaml')), [])
+        self.assertEqual(len(self.calls.read_text().splitlines()), 2)
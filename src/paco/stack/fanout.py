@@ -0,0 +1,126 @@
+"""
+Concurrent provisioning of StackGroups that span many accounts and regions.
+
+Controllers for resources that are provisioned in every account or region, such as
+AWS Config, CloudTrail, SNS Topics and IAM Users, create one StackGroup per account or
+per account and region. A StackGroupFanOut provisions those StackGroups concurrently:
+
+  * leader StackGroups, which own resources that the others use such as a shared
+    S3 Bucket or the IAM Users of the master account, are provisioned first,
+  * at most max_per_account StackGroups are provisioned at once in each account,
+  * a progress line is logged as each StackGroup finishes and a summary of every
+    StackGroup is logged at the end in the order the StackGroups were given,
+  * when a StackGroup fails no more StackGroups are started, the running ones are
+    waited on and the first error is raised after the summary.
+
+Log lines of each StackGroup are prefixed with its account and region.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class FanOutItem():
+    "A StackGroup and the result of provisioning it"
+
+    def __init__(self, stack_group, index, leader):
+        self.stack_group = stack_group
+        self.index = index
+        self.leader = leader
+        self.account_name = stack_group.account_ctx.get_name()
+        self.status = 'Skipped'
+        self.error = None
+
+    @property
+    def label(self):
+        "Account and region of the StackGroup"
+        regions = sorted(set(stack.aws_region for stack in self.stack_group.stacks))
+        if len(regions) == 1:
+            return f'{self.account_name}.{regions[0]}'
+        return self.account_name
+
+
+class StackGroupFanOut():
+    "Provisions StackGroups in many accounts and regions concurrently"
+
+    def __init__(self, paco_ctx, stack_groups, leaders=None, max_per_account=None):
+        self.paco_ctx = paco_ctx
+        if leaders == None:
+            leaders = []
+        if max_per_account == None:
+            max_per_account = paco_ctx.parallel
+        self.max_per_account = max(1, max_per_account)
+        leader_ids = set(id(stack_group) for stack_group in leaders)
+        self.items = [
+            FanOutItem(stack_group, index, id(stack_group) in leader_ids)
+            for index, stack_group in enumerate(stack_groups)
+        ]
+
+    def run_item(self, item):
+        with self.paco_ctx.log_prefix(f'[{item.label}] '):
+            item.stack_group.provision()
+
+    def log_progress(self, running):
+        finished = len([item for item in self.items if item.status in ('Done', 'Failed')])
+        failed = len([item for item in self.items if item.status == 'Failed'])
+        self.paco_ctx.log_action_col(
+            'FanOut',
+            'Progress',
+            f'{finished} of {len(self.items)} done',
+            f'{running} running, {failed} failed',
+        )
+
+    def log_summary(self):
+        "Log the result of every StackGroup in the order they were given"
+        for item in self.items:
+            message = item.stack_group.get_aws_name()
+            if item.error != None:
+                message += ': ' + str(item.error).strip().split('\n')[0]
+            self.paco_ctx.log_action_col('FanOut', item.status, item.label, message)
+
+    def provision(self):
+        "Provision the leader StackGroups and then the others, at most max_per_account at once in each account"
+        if len(self.items) == 0:
+            return
+        pending = [item for item in self.items if item.leader]
+        followers = [item for item in self.items if not item.leader]
+        if len(pending) == 0:
+            pending, followers = followers, []
+        running = {}
+        account_running = {}
+        error = None
+        num_accounts = len(set(item.account_name for item in self.items))
+        max_workers = min(len(self.items), self.max_per_account * num_accounts)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='paco-fanout') as executor:
+            while pending or running or followers:
+                if not pending and not running:
+                    # every leader has finished
+                    pending, followers = followers, []
+                for item in list(pending):
+                    if error != None:
+                        break
+                    if account_running.get(item.account_name, 0) >= self.max_per_account:
+                        continue
+                    pending.remove(item)
+                    account_running[item.account_name] = account_running.get(item.account_name, 0) + 1
+                    running[executor.submit(self.run_item, item)] = item
+                if not running:
+                    break
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = running.pop(future)
+                    account_running[item.account_name] -= 1
+                    exc = future.exception()
+                    if exc != None:
+                        item.status = 'Failed'
+                        item.error = exc
+                        if error == None:
+                            error = exc
+                    else:
+                        item.status = 'Done'
+                self.log_progress(len(running))
+                if error != None:
+                    pending = []
+                    followers = []
+        self.log_summary()
+        if error != None:
+            raise error
@@ -0,0 +1,309 @@
+"""
+Dependency-aware concurrent provisioning and deletion of Stacks.
+
+A StackScheduler flattens the stack orders of one or more StackGroups into a graph
+of Stacks and provisions every Stack whose dependencies have completed on a pool of
+worker threads. A Stack depends on another Stack when:
+
+  * one of its Parameters is a StackOutputParam for that Stack,
+  * its template uses a paco.sub expression that resolves to that Stack's Outputs,
+  * it was linked to that Stack with Stack.set_dependency(). A dependency group
+    updates a Stack after other Stacks have been created, so the dependent Stack
+    also waits for every Stack ordered before it in its StackGroup,
+  * both Stacks share the same CloudFormation stack name, in which case they are
+    provisioned in stack order.
+
+The PROVISION/WAIT/WAITLAST stack orders decide which Stacks are provisioned and
+which are waited on. Ready Stacks are started in stack order, so output remains
+close to a sequential run.
+
+Stacks are deleted in the reverse of the same graph: a Stack is deleted as soon as every
+Stack that depends on it has been deleted. The Stacks to delete are confirmed together
+before the first one is deleted, so deletes run concurrently without --yes. A Stack that
+is filtered, protected or not confirmed is kept along with every Stack it depends on.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from paco.core.exception import StackException, PacoErrorCode
+from paco.stack.interfaces import ICloudFormationStack
+from paco.stack.stack import StackOutputParam
+from paco.stack.stack_group import StackOrder
+import re
+
+
+paco_sub_ref_regex = re.compile(r"\$\{(paco\.ref [^}]+)\}")
+
+
+class StackNode():
+    "A Stack in the provisioning graph"
+
+    def __init__(self, stack, stack_group, index):
+        self.stack = stack
+        self.stack_group = stack_group
+        self.index = index
+        self.provision = False
+        self.wait = False
+        self.depends_on = set()
+        self.dependents = set()
+
+    def add_dependency(self, node):
+        if node is self:
+            return
+        self.depends_on.add(node)
+        node.dependents.add(self)
+
+    def __repr__(self):
+        return f'StackNode: {self.stack.get_name()}'
+
+
+class StackScheduler():
+    """Provisions or deletes the Stacks of one or more StackGroups concurrently, in dependency order.
+
+    max_workers limits the number of Stacks that are being created, updated, deleted or waited on at once.
+    When cancel_event is set no more Stacks are started, the running ones are waited on and
+    a StackException is raised.
+    """
+
+    def __init__(self, paco_ctx, stack_groups, max_workers=None, cancel_event=None):
+        self.paco_ctx = paco_ctx
+        self.cancel_event = cancel_event
+        if not isinstance(stack_groups, (list, tuple)):
+            stack_groups = [stack_groups]
+        self.stack_groups = stack_groups
+        if max_workers == None:
+            max_workers = paco_ctx.parallel
+        self.max_workers = max(1, max_workers)
+        self.nodes = []
+        self.node_map = {}
+        self.build_graph()
+
+    def build_graph(self):
+        "Create a StackNode for every Stack and link them to the Stacks they depend on"
+        for stack_group in self.stack_groups:
+            for owner_group, order_item in stack_group.flatten_stack_orders():
+                node = self.node_map.get(id(order_item.stack))
+                if node == None:
+                    node = StackNode(order_item.stack, owner_group, len(self.nodes))
+                    self.nodes.append(node)
+                    self.node_map[id(order_item.stack)] = node
+                if order_item.order == StackOrder.PROVISION:
+                    node.provision = True
+                else:
+                    node.wait = True
+
+        stack_ref_map = {}
+        stack_name_map = {}
+        group_nodes = {}
+        for node in self.nodes:
+            stack_ref = node.stack.stack_ref
+            if stack_ref:
+                stack_ref_map.setdefault(stack_ref, []).append(node)
+            name_key = (id(node.stack.account_ctx), node.stack.aws_region, node.stack.get_name())
+            stack_name_map.setdefault(name_key, []).append(node)
+            group_nodes.setdefault(id(node.stack_group), []).append(node)
+
+        for node in self.nodes:
+            # Stack Output Parameters
+            for param in node.stack.parameters:
+                if isinstance(param, StackOutputParam):
+                    for entry in param.entry_list:
+                        dep_node = self.node_map.get(id(entry.get('stack')))
+                        if dep_node != None:
+                            node.add_dependency(dep_node)
+            # paco.sub expressions resolved from Stack Outputs
+            if ICloudFormationStack.providedBy(node.stack) and self.has_template_body(node.stack):
+                for sub_ref in paco_sub_ref_regex.findall(node.stack.template.body):
+                    for dep_node in self.lookup_stack_ref(stack_ref_map, sub_ref):
+                        node.add_dependency(dep_node)
+            # Dependency groups
+            dependency_stack = getattr(node.stack, 'dependency_stack', None)
+            if dependency_stack != None:
+                for prior_node in group_nodes[id(node.stack_group)]:
+                    if prior_node.index < node.index:
+                        node.add_dependency(prior_node)
+                dep_node = self.node_map.get(id(dependency_stack))
+                if dep_node != None:
+                    node.add_dependency(dep_node)
+
+        # Stacks that share a CloudFormation stack name are applied in order
+        for name_nodes in stack_name_map.values():
+            for prior_node, next_node in zip(name_nodes, name_nodes[1:]):
+                next_node.add_dependency(prior_node)
+
+        self.check_for_cycles()
+
+    def has_template_body(self, stack):
+        "True if the Stack's template can render a body"
+        template = stack.template
+        if template == None:
+            return False
+        return template._body != None or template.template != None
+
+    def lookup_stack_ref(self, stack_ref_map, ref):
+        "Return the StackNodes whose stack_ref is the longest prefix of a paco.ref string"
+        parts = ref.split(' ', 1)[1].split('.')
+        for idx in range(len(parts), 0, -1):
+            nodes = stack_ref_map.get('.'.join(parts[:idx]))
+            if nodes != None:
+                return nodes
+        return []
+
+    def check_for_cycles(self):
+        "Raise a StackException if the dependency graph is not acyclic"
+        remaining = {node: len(node.depends_on) for node in self.nodes}
+        ready = [node for node, count in remaining.items() if count == 0]
+        visited = 0
+        while ready:
+            node = ready.pop()
+            visited += 1
+            for dependent in node.dependents:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if visited != len(self.nodes):
+            cycle_names = [node.stack.get_name() for node, count in remaining.items() if count > 0]
+            message = "Stack dependencies contain a cycle. Unable to provision these Stacks in parallel:\n"
+            message += '\n'.join(f'  {name}' for name in cycle_names) + '\n'
+            raise StackException(PacoErrorCode.Unknown, message=message)
+
+    def is_cancelled(self):
+        return self.cancel_event != None and self.cancel_event.is_set()
+
+    def run_node(self, run_method, node, log_prefix=''):
+        "Provision or delete a Stack with the log prefix of the thread that scheduled it"
+        with self.paco_ctx.log_prefix(log_prefix):
+            run_method(node)
+
+    def provision_node(self, node):
+        "Provision a Stack and wait for it to complete"
+        stack = node.stack
+        if node.provision:
+            # Stacks hold the interactive lock only while prompting for confirmation of changes
+            node.stack_group.filtered_stack_action(stack, stack.provision)
+        # Stacks with dependents must complete even when their stack orders do not include a WAIT
+        if node.wait or len(node.dependents) > 0:
+            if stack.cached == False:
+                stack.wait_for_complete()
+
+    def delete_node(self, node):
+        "Delete a Stack that has already been confirmed and wait for it to be deleted"
+        stack = node.stack
+        if ICloudFormationStack.providedBy(stack):
+            stack.delete(confirmed=True)
+        else:
+            stack.delete()
+        # Stacks that other Stacks depend on are deleted after this one is gone
+        if node.wait or len(node.depends_on) > 0:
+            stack.wait_for_complete()
+
+    def run(self, run_method, upstream, downstream, first):
+        """Run a method for every Stack on the worker threads. A Stack is started once every node in its
+        upstream set has finished. Ready Stacks are started in order of the first() sort key."""
+        remaining = {node: len(upstream(node)) for node in self.nodes}
+        ready = sorted([node for node, count in remaining.items() if count == 0], key=first)
+        running = {}
+        error = None
+        log_prefix = self.paco_ctx.get_log_prefix()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='paco-stack') as executor:
+            while ready or running:
+                while ready and error == None and not self.is_cancelled():
+                    node = ready.pop(0)
+                    running[executor.submit(self.run_node, run_method, node, log_prefix)] = node
+                if not running:
+                    break
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    exc = future.exception()
+                    if exc != None:
+                        # stop starting new Stacks and let the running ones finish
+                        if error == None:
+                            error = exc
+                        continue
+                    for next_node in downstream(node):
+                        remaining[next_node] -= 1
+                        if remaining[next_node] == 0:
+                            ready.append(next_node)
+                ready.sort(key=first)
+                if error != None:
+                    ready = []
+        if error != None:
+            raise error
+        if self.is_cancelled() and len(ready) > 0:
+            raise StackException(
+                PacoErrorCode.Unknown,
+                message="Provisioning was cancelled before these Stacks were started:\n" + \
+                    '\n'.join(f'  {node.stack.get_name()}' for node in ready) + '\n'
+            )
+
+    def provision(self):
+        "Provision all Stacks, starting each one as soon as the Stacks it depends on have completed"
+        self.run(
+            self.provision_node,
+            lambda node: node.depends_on,
+            lambda node: node.dependents,
+            lambda node: node.index,
+        )
+
+    def confirm_delete(self):
+        """Return the StackNodes to delete. Unless --yes is given, the Stacks are confirmed in one prompt
+        and Stacks with termination protection in a second prompt."""
+        delete_nodes = []
+        for node in self.nodes:
+            if not node.provision:
+                continue
+            if not node.stack_group.is_stack_in_scope(node.stack):
+                node.stack.log_action('Filtered', 'Filtered')
+                continue
+            if getattr(node.stack, 'change_protected', False) == True:
+                node.stack.log_action("Delete", "Protected")
+                continue
+            delete_nodes.append(node)
+        if self.paco_ctx.yes or len(delete_nodes) == 0:
+            return delete_nodes
+        cfn_nodes = [node for node in delete_nodes if ICloudFormationStack.providedBy(node.stack)]
+        with self.paco_ctx.interactive_lock:
+            print("\nStacks to delete:")
+            for node in reversed(cfn_nodes):
+                print(f"  {node.stack.account_ctx.get_name()}.{node.stack.aws_region}: {node.stack.get_name()}")
+            answer = self.paco_ctx.input_confirm_action(f"DELETE these {len(cfn_nodes)} stacks? Are you sure?", default='n')
+            if answer == False:
+                for node in cfn_nodes:
+                    node.stack.log_action("Delete", "Aborted")
+                return [node for node in delete_nodes if node not in cfn_nodes]
+            protected_nodes = [node for node in cfn_nodes if node.stack.termination_protection == True]
+            if len(protected_nodes) > 0:
+                print("\nThese Stacks have Termination Protection enabled:")
+                for node in reversed(protected_nodes):
+                    print(f"  {node.stack.get_name()}")
+                answer = self.paco_ctx.input_confirm_action("Destroy these stacks forever?")
+                if answer == False:
+                    print("Destruction aborted. Allowing these stacks to exist.")
+                    return [node for node in delete_nodes if node not in protected_nodes]
+        return delete_nodes
+
+    def keep_dependencies(self, delete_nodes):
+        "Remove the Stacks that a Stack which is not being deleted depends on from the StackNodes to delete"
+        kept_nodes = [node for node in self.nodes if node.provision and node not in delete_nodes]
+        while kept_nodes:
+            node = kept_nodes.pop()
+            for dep_node in node.depends_on:
+                if dep_node in delete_nodes:
+                    delete_nodes.remove(dep_node)
+                    dep_node.stack.log_action("Delete", "Kept", message=f"Used by {node.stack.get_name()}")
+                    kept_nodes.append(dep_node)
+        return delete_nodes
+
+    def delete(self):
+        """Delete all Stacks, starting each one as soon as the Stacks that depend on it have been deleted.
+        Stacks that are not deleted, and every Stack they depend on, are kept."""
+        delete_nodes = self.keep_dependencies(set(self.confirm_delete()))
+        def delete_node(node):
+            if node in delete_nodes:
+                self.delete_node(node)
+        self.run(
+            delete_node,
+            lambda node: node.dependents,
+            lambda node: node.depends_on,
+            lambda node: -node.index,
+        )
@@ -1,26 +1,28 @@
-from botocore.exceptions import ClientError, WaiterError
+from botocore.exceptions import ClientError
 from copy import deepcopy
 from enum import Enum
 from paco.models.exceptions import InvalidPacoReference
 from paco import utils
 from paco.core.yaml import YAML
+from paco.core.cfn_lint import get_cfn_linter
 from paco.core.exception import StackException, PacoErrorCode, PacoException, StackOutputException
 from paco.models import references
 from paco.models import schemas
 from paco.models.locations import get_parent_by_interface
 from paco.stack.interfaces import IStack, ICloudFormationStack
+from paco.stack.status_index import get_stack_status_index
+from paco.stack.watcher import get_stack_watcher
 from paco.utils import md5sum, dict_of_dicts_merge, list_to_comma_string, write_to_file
-from pprint import pprint
+from paco.utils.yaml_diff import diff_yaml_files
 from shutil import copyfile
-from deepdiff import DeepDiff
 from zope.interface import implementer
 import base64
 import os.path
 import pathlib
 import re
 import ruamel.yaml
-import subprocess
 import sys
+import threading
 
 
 yaml=YAML(typ="safe", pure=True)
@@ -108,12 +110,17 @@ class StackOutputParam():
         }
         self.entry_list.append(entry)
 
-    def gen_parameter_value(self):
+    def gen_parameter_value(self, saved_outputs=False):
+        """Comma delimited Stack Output values. If saved_outputs is True, Outputs saved
+        by a previous run are used where possible instead of describing the stacks."""
         param_value = ""
         comma = ''
         for entry in self.entry_list:
             for output_key in entry['output_keys']:
-                output_value = entry['stack'].get_outputs_value(output_key)
+                if saved_outputs:
+                    output_value = entry['stack'].get_saved_outputs_value(output_key)
+                else:
+                    output_value = entry['stack'].get_outputs_value(output_key)
                 if output_value == None:
                     raise PacoException(
                         PacoErrorCode.Unknown,
@@ -159,7 +166,7 @@ class Parameter():
         self.resolved_value = resolved_value
         self.ignore_changes = ignore_changes
 
-    def gen_parameter_value(self):
+    def gen_parameter_value(self, saved_outputs=False):
         return self.value
 
     def gen_parameter(self):
@@ -299,6 +306,7 @@ class StackOutputsManager():
     def __init__(self):
         self.outputs_path = {}
         self.outputs_dict = {}
+        self.lock = threading.RLock()
 
     def load(self, outputs_path, key):
         self.outputs_path[key] = (outputs_path / key).with_suffix('.yaml')
@@ -326,9 +334,26 @@ class StackOutputsManager():
         if len(new_outputs_dict.keys()) == 0:
             return
         key = list(new_outputs_dict.keys())[0]
-        self.load(outputs_path, key)
-        self.outputs_dict[key] = dict_of_dicts_merge(self.outputs_dict[key], new_outputs_dict)
-        self.save(key)
+        with self.lock:
+            self.load(outputs_path, key)
+            self.outputs_dict[key] = dict_of_dicts_merge(self.outputs_dict[key], new_outputs_dict)
+            self.save(key)
+
+    def get_value(self, outputs_path, config_ref):
+        "Return the saved Stack Output value for a reference or None if it has not been saved"
+        ref_parts = config_ref.split('.')
+        key = ref_parts[0]
+        with self.lock:
+            if key not in self.outputs_dict:
+                self.load(outputs_path, key)
+            node = self.outputs_dict[key]
+        for ref_part in ref_parts:
+            if not isinstance(node, dict) or ref_part not in node:
+                return None
+            node = node[ref_part]
+        if not isinstance(node, dict):
+            return None
+        return node.get('__name__', None)
 
 stack_outputs_manager = StackOutputsManager()
 
@@ -377,6 +402,7 @@ class BaseStack():
         self.wait_for_delete = False
         self.tags = StackTags(stack_tags)
         self.tags.add_tag('Paco-Stack', 'true')
+        # Only used by BotoStacks, CloudFormation Stack Outputs are cached by the StackStatusIndex
         self.outputs_value_cache = {}
         self.yaml_path = None
         self.applied_yaml_path = None
@@ -495,7 +521,7 @@ class BaseStack():
         outputs_str = ""
         for param_entry in self.parameters:
             try:
-                param_value = param_entry.gen_parameter_value()
+                param_value = param_entry.gen_parameter_value(saved_outputs=True)
             except StackOutputException:
                 message = """Unable to find output for Parameter '{}' for the resource:
 
@@ -655,7 +681,12 @@ your cache may be out of sync. Try running again the with the --nocache option.
 
         if unchanged == True:
             return
+        # keep the changes together with their prompt when Stacks are provisioned concurrently
+        with self.paco_ctx.interactive_lock:
+            self.confirm_parameter_changes(parameter_list, applied_parameter_list, applied_file_path, new_file_path, param_applied_file_path)
 
+    def confirm_parameter_changes(self, parameter_list, applied_parameter_list, applied_file_path, new_file_path, param_applied_file_path):
+        "Print the changes to the stack's Parameters and ask for confirmation"
         print("--------------------------------------------------------")
         print("Confirm changes to Parameters for CloudFormation Stack: " + self.get_name())
         print()
@@ -828,45 +859,66 @@ your cache may be out of sync. Try running again the with the --nocache option.
         stack = ref.resolve(self.paco_ctx.project)
         return stack.get_outputs_key_from_ref(ref)
 
+    @property
+    def status_index(self):
+        return get_stack_status_index(self.account_ctx, self.aws_region)
+
+    def get_saved_outputs_value(self, key):
+        """Get Stack OutputValue by Stack OutputKey from the Outputs saved in the .paco-work/outputs directory
+        when the --saved-outputs option is used. Falls back to AWS if the Stack has been changed in this run
+        or the Output has not been saved."""
+        if self.paco_ctx.saved_outputs == True and not self.status_index.is_changed(self.get_name()):
+            for stack_output_config in self.stack_output_config_list:
+                if stack_output_config.key == key:
+                    value = stack_outputs_manager.get_value(self.paco_ctx.outputs_path, stack_output_config.config_ref)
+                    if value != None:
+                        return value
+                    break
+        return self.get_outputs_value(key)
+
     def get_outputs_value(self, key):
         "Get Stack OutputValue by Stack OutputKey"
-        if key in self.outputs_value_cache.keys():
-            return self.outputs_value_cache[key]
-
-        while True:
-            try:
-                stack_metadata = self.cfn_client.describe_stacks(StackName=self.get_name())
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].find("does not exist") != -1:
-                    message = self.get_stack_error_message()
-                    message += 'Could not describe stack to get value for Outputs Key: {}\n'.format(key)
-                    message += 'Account: ' + self.account_ctx.get_name()
-                    raise StackException(PacoErrorCode.StackDoesNotExist, message = message)
-                elif e.response['Error']['Code'] == 'ExpiredToken':
-                    self.handle_token_expired()
-                    continue
-                else:
-                    raise StackException(PacoErrorCode.Unknown, message=e.response['Error']['Message'])
-            break
-
-        if 'Outputs' not in stack_metadata['Stacks'][0].keys():
+        cfn_stack_describe = self.describe_outputs(key)
+        if 'Outputs' not in cfn_stack_describe.keys():
             # this error should be caught be the calling code and re-raised with more context
             # for example, if an ASG is looking for an EFS Id output, then the user needs to be
             # informed that the ASG stack is failing to in find the output from the EFS stack
             raise StackOutputException("Could not find the value for {}".format(key))
 
-        for output in stack_metadata['Stacks'][0]['Outputs']:
-            if output['OutputKey'] == key:
-                self.outputs_value_cache[key] = output['OutputValue']
-                return self.outputs_value_cache[key]
+        outputs = self.status_index.get_outputs(self.get_name(), cfn_stack_describe)
+        if key in outputs:
+            return outputs[key]
 
         message = self.get_stack_error_message()
-        message += "Could not find Stack Output {} in stack_metadata:\n\n{}\n".format(key, stack_metadata)
+        message += "Could not find Stack Output {} in stack_metadata:\n\n{}\n".format(key, cfn_stack_describe)
         raise StackException(
             PacoErrorCode.StackOutputMissing,
             message=message
         )
 
+    def describe_outputs(self, key):
+        """Return the describe_stacks dict with the Stack's Outputs.
+        All Stacks with the same name share a single describe through the StackStatusIndex."""
+        found, cfn_stack_describe = self.status_index.get(self.get_name())
+        if not found:
+            try:
+                stack_metadata = self.cfn_client.describe_stacks(StackName=self.get_name())
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].find("does not exist") != -1:
+                    cfn_stack_describe = None
+                else:
+                    raise StackException(PacoErrorCode.Unknown, message=e.response['Error']['Message'])
+            else:
+                cfn_stack_describe = stack_metadata['Stacks'][0]
+            self.status_index.update(self.get_name(), cfn_stack_describe)
+
+        if cfn_stack_describe == None:
+            message = self.get_stack_error_message()
+            message += 'Could not describe stack to get value for Outputs Key: {}\n'.format(key)
+            message += 'Account: ' + self.account_ctx.get_name()
+            raise StackException(PacoErrorCode.StackDoesNotExist, message = message)
+        return cfn_stack_describe
+
     def save_stack_outputs(self):
         "Process and save Stack Outputs to disk and to the StackOutputsManager"
         # process stack output config
@@ -964,8 +1016,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
 
     def generate_template(self):
         "Write template to the filesystem"
-        self.template.paco_sub()
-        self.template.fix_troposphere_manual_ref()
+        self.template.substitute_body()
         # Create folder and write template body to file
         self.build_folder.mkdir(parents=True, exist_ok=True)
         stream = open(self.get_yaml_path(), 'w')
@@ -1091,7 +1142,8 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             self.set_parameter(param_name, ','.join(param_list))
 
     def getFromSquareBrackets(self, s):
-        return re.findall(r"\['?([A-Za-z0-9_]+)'?\]", s)
+        # tagged intrinsic functions are loaded as {'!Join': ...}
+        return re.findall(r"\['?(!?[A-Za-z0-9_:]+)'?\]", s)
 
     def print_diff_list(self, change_t, level=1):
         print('', end='\n')
@@ -1166,22 +1218,15 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
         if applied_file_path.exists() == False:
             return
 
-        yaml = YAML(pure=True)
-        yaml.allow_duplicate_keys = True
-        #yaml.default_flow_sytle = False
-        with open(applied_file_path, 'r') as stream:
-            applied_file_dict= yaml.load(stream)
-        with open(new_file_path, 'r') as stream:
-            new_file_dict= yaml.load(stream)
-
-        deep_diff = DeepDiff(
-            applied_file_dict,
-            new_file_dict,
-            verbose_level=1,
-            view='tree'
-        )
-        if len(deep_diff.keys()) == 0:
+        deep_diff = diff_yaml_files(applied_file_path, new_file_path)
+        if deep_diff == None:
             return
+        # keep the diff together with its prompt when Stacks are validated concurrently
+        with self.paco_ctx.interactive_lock:
+            self.confirm_template_changes(deep_diff, applied_file_path, new_file_path)
+
+    def confirm_template_changes(self, deep_diff, applied_file_path, new_file_path):
+        "Print the changes to the template and ask for confirmation"
         print("--------------------------------------------------------")
         print(f"Confirm template changes to CloudFormation Stack: {self.account_ctx.get_name()}: {self.aws_region}: {self.get_name()}")
         print()
@@ -1227,14 +1272,6 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             sys.exit(1)
         print('', end='\n')
 
-    def handle_token_expired(self, location=''):
-        """Resets the client handler to force a session reload. location is used for debugging
-        to help identify the places where token expiry was failing."""
-        if location != '':
-            location = '_' + location
-        self.log_action("Token", "Retry" + location, "Expired")
-        self._cfn_client = self.account_ctx.get_aws_client('cloudformation', self.aws_region, force=True)
-
     def set_template(self, template):
         self.template = template
 
@@ -1257,35 +1294,38 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             raise StackException(PacoErrorCode.InvalidStackName)
         return new_name
 
+    def set_status(self, cfn_stack_describe):
+        "Set the Stack status from a describe_stacks dict or None if the stack does not exist"
+        if cfn_stack_describe == None:
+            self.status = StackStatus.DOES_NOT_EXIST
+        else:
+            self.status = StackStatus[cfn_stack_describe['StackStatus']]
+            self.stack_id = cfn_stack_describe['StackId']
+            self.cfn_stack_describe = cfn_stack_describe
+
     def get_status(self):
         "Status of the Stack in AWS"
-        while True:
-            try:
-                stack_list = self.cfn_client.describe_stacks(StackName=self.get_name())
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].endswith("does not exist"):
-                    self.status = StackStatus.DOES_NOT_EXIST
-                elif e.response['Error']['Code'] == 'ClientError' and e.response['Error']['Message'].endswith("Rate exceeded"):
-                    # Lets try again in a little bit
-                    msg_prefix = self.log_action("Provision", "Warning", return_it=True)
-                    print(msg_prefix+": Get Status throttled")
-                    time.sleep(1)
-                    continue
-                elif e.response['Error']['Code'] == 'ExpiredToken':
-                    self.handle_token_expired()
-                    continue
-                else:
-                    message = self.get_stack_error_message(
-                        prefix_message=e.response['Error']['Message'],
-                        skip_status = True
-                    )
-                    raise StackException(PacoErrorCode.Unknown, message=message)
+        found, cfn_stack_describe = self.status_index.get(self.get_name())
+        if found:
+            self.set_status(cfn_stack_describe)
+            return
+        try:
+            stack_list = self.cfn_client.describe_stacks(StackName=self.get_name())
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].endswith("does not exist"):
+                self.set_status(None)
             else:
-                self.status = StackStatus[stack_list['Stacks'][0]['StackStatus']]
-                self.stack_id = stack_list['Stacks'][0]['StackId']
-                self.cfn_stack_describe = stack_list['Stacks'][0]
-
-            break
+                message = self.get_stack_error_message(
+                    prefix_message=e.response['Error']['Message'],
+                    skip_status = True
+                )
+                raise StackException(PacoErrorCode.Unknown, message=message)
+        else:
+            self.set_status(stack_list['Stacks'][0])
+        if self.status == StackStatus.DOES_NOT_EXIST:
+            self.status_index.update(self.get_name(), None)
+        else:
+            self.status_index.update(self.get_name(), self.cfn_stack_describe)
 
     def is_creating(self):
         if self.status == StackStatus.CREATE_IN_PROGRESS:
@@ -1329,9 +1369,12 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             if self.paco_ctx.project.shared_state != None:
                 if self.paco_ctx.project.shared_state.cloudformation_region != None:
                     template_region = self.paco_ctx.project.shared_state.cloudformation_region
-            s3_key = f"Paco/CloudFormationTemplates/{self.get_name()}.yaml"
-            bucket_name = self.paco_ctx.paco_buckets.upload_fileobj(
-                file_contents=self.template.body,
+            # templates are stored by the MD5 of their body so that an unchanged template is not uploaded again
+            template_body = self.template.body
+            template_md5 = md5sum(str_data=template_body)
+            s3_key = f"Paco/CloudFormationTemplates/{self.get_name()}/{template_md5}.yaml"
+            bucket_name = self.paco_ctx.paco_buckets.upload_fileobj_if_missing(
+                file_contents=template_body,
                 s3_key=s3_key,
                 account_ctx=self.account_ctx,
                 region=template_region
@@ -1374,6 +1417,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             Tags=self.tags.cf_list(),
         )
         self.stack_id = response['StackId']
+        self.status_index.invalidate(self.get_name())
 
         self.cfn_client.update_termination_protection(
             EnableTerminationProtection=True,
@@ -1395,6 +1439,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
         stack_parameters = self.generate_stack_parameters(action=self.action)
         self.confirm_stack_parameter_changes(stack_parameters)
         self.validate_template_changes()
+        self.status_index.invalidate(self.get_name())
         while True:
             try:
                 template_url = self.sync_template_to_s3bucket()
@@ -1421,9 +1466,6 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
                         message = self.get_stack_error_message()
                         message += "ValidationError: {}\n".format(e.response['Error']['Message'])
                         raise StackException(PacoErrorCode.Unknown, message = message)
-                elif e.response['Error']['Code'] == 'ExpiredToken':
-                    self.handle_token_expired()
-                    continue
                 else:
                     #message = "Stack: {}\nError: {}\n".format(self.get_name(), e.response['Error']['Message'])
                     message = self.get_stack_error_message()
@@ -1436,14 +1478,16 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
                 StackName=self.get_name()
             )
 
-    def delete_stack(self):
-        "Delete an AWS CloudFormation stack"
+    def delete_stack(self, confirmed=False):
+        """Delete an AWS CloudFormation stack.
+        The confirmation prompts are skipped if the delete has already been confirmed."""
         if self.change_protected == True:
             self.log_action("Delete", "Protected")
             return
-        if self.paco_ctx.yes == False:
-            print("\n"+self.get_name())
-            answer = self.paco_ctx.input_confirm_action("DELETE stack? Are you sure?", default='n')
+        if self.paco_ctx.yes == False and confirmed == False:
+            with self.paco_ctx.interactive_lock:
+                print("\n"+self.get_name())
+                answer = self.paco_ctx.input_confirm_action("DELETE stack? Are you sure?", default='n')
             if answer == False:
                 self.log_action("Delete", "Aborted")
                 return
@@ -1451,14 +1495,17 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
         self.action = "delete"
         if self.is_exists() == True:
             # Delete Stack
-            if self.termination_protection == True:
-                print("\nThis Stack has Termination Protection enabled!")
-                print("Stack Name: {}\n".format(self.get_name()))
-                answer = self.paco_ctx.input_confirm_action("Destroy this stack forever?")
+            if self.termination_protection == True and confirmed == False:
+                with self.paco_ctx.interactive_lock:
+                    print("\nThis Stack has Termination Protection enabled!")
+                    print("Stack Name: {}\n".format(self.get_name()))
+                    answer = self.paco_ctx.input_confirm_action("Destroy this stack forever?")
                 if answer == False:
                     print("Destruction aborted. Allowing stack to exist.")
                     return
-            if self.is_deleting() == False:
+            # the status describe says if termination protection has to be turned off
+            if self.is_deleting() == False and self.cfn_stack_describe.get('EnableTerminationProtection', True) == True:
+                self.status_index.invalidate(self.get_name())
                 self.cfn_client.update_termination_protection(
                     EnableTerminationProtection=False,
                     StackName=self.get_name()
@@ -1466,6 +1513,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
         self.log_action("Delete", "Stack")
         self.hooks.run("delete", "pre", self)
         if self.is_exists() == True:
+            self.status_index.invalidate(self.get_name())
             self.cfn_client.delete_stack( StackName=self.get_name() )
             if self.wait_for_delete == True:
                 self.wait_for_complete()
@@ -1488,17 +1536,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             message += "--------- {}  -------------\n".format(
                 ' '*(col_size-len('LogicalId '))
             )
-            while True:
-                try:
-                    stack_events = self.cfn_client.describe_stack_events(StackName=self.get_name())
-                except ClientError as exc:
-                    if exc.response['Error']['Code'] == 'ExpiredToken':
-                        self.handle_token_expired('4')
-                        continue
-                    else:
-                        raise sys.exc_info()
-                break
-
+            stack_events = self.cfn_client.describe_stack_events(StackName=self.get_name())
 
             for stack_event in stack_events['StackEvents']:
                 if stack_event['ResourceStatus'].find('FAILED') != -1:
@@ -1529,14 +1567,15 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
 
         self.get_status()
         if self.is_failed():
-            print("--------------------------------------------------------")
-            self.log_action("Provision", "Failed")
-            print("The stack is in a '{}' state.".format(self.status))
             stack_message = self.get_stack_error_message(skip_status=True)
-            print(stack_message)
-            print("--------------------------------------------------------")
-            answer = self.paco_ctx.input_confirm_action("\nDelete it?", default='y')
-            print('')
+            with self.paco_ctx.interactive_lock:
+                print("--------------------------------------------------------")
+                self.log_action("Provision", "Failed")
+                print("The stack is in a '{}' state.".format(self.status))
+                print(stack_message)
+                print("--------------------------------------------------------")
+                answer = self.paco_ctx.input_confirm_action("\nDelete it?", default='y')
+                print('')
             if answer:
                 self.delete()
                 self.wait_for_complete()
@@ -1565,6 +1604,13 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
 
     def validate(self):
         "Validate Stack in AWS"
+        if self.prepare_validation():
+            self.validate_template()
+            self.validate_template_changes()
+
+    def prepare_validation(self):
+        """Generate the template of an enabled Stack that is not change protected.
+        Returns False if there is nothing to validate."""
         applied_file_path, new_file_path = self.init_template_store_paths()
         short_yaml_path = str(new_file_path).replace(str(self.paco_ctx.home), '')
         col_2_size=12
@@ -1573,27 +1619,28 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
         if self.enabled == False:
             if self.paco_ctx.quiet_changes_only == False:
                 self.paco_ctx.log_action_col("Validate",  "Disabled", self.account_ctx.get_name() + '.' + self.aws_region, short_yaml_path, col_2_size=col_2_size)
-            return
+            return False
         elif self.change_protected:
             if self.paco_ctx.quiet_changes_only == False:
                 self.paco_ctx.log_action_col("Validate", "Protected", self.account_ctx.get_name() + '.' + self.aws_region, short_yaml_path, col_2_size=col_2_size)
-            return
-        yaml_path = self.generate_template()
+            return False
+        self.generate_template()
 
         new_str = ''
         if applied_file_path.exists() == False:
             new_str = ':new'
         self.paco_ctx.log_action_col("Validate", "Template"+new_str, self.account_ctx.get_name() + '.' + self.aws_region, short_yaml_path, col_2_size=col_2_size)
+        return True
 
+    def validate_template(self):
+        "Check the generated template with cfn-lint or the CloudFormation ValidateTemplate API"
+        yaml_path = self.get_yaml_path()
         # Locally lint CloudFormation - (Extra checks but slows Validate down)
         if self.paco_ctx.cfn_lint == True:
-            args = ("cfn-lint", "-i", "W", "-t", yaml_path)
-            popen = subprocess.Popen(args, stdout=subprocess.PIPE)
-            link_ret = popen.wait()
-            cfn_lint_output = popen.stdout.read()
-            if link_ret != 0:
-                message = f"CFN-LINT: Template: {yaml_path}\n{cfn_lint_output}"
-                pprint(message)
+            cfn_lint_errors = get_cfn_linter(self.paco_ctx).lint(yaml_path, self.template.body)
+            if len(cfn_lint_errors) > 0:
+                message = "CFN-LINT: Template: {}\n{}".format(yaml_path, '\n'.join(cfn_lint_errors))
+                print(message)
                 raise StackException(PacoErrorCode.TemplateValidationError, "cfn-lint")
         else:
             try:
@@ -1608,9 +1655,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
                     )
                     raise StackException(PacoErrorCode.TemplateValidationError, message=message)
 
-        self.validate_template_changes()
-
-    def delete(self):
+    def delete(self, confirmed=False):
         "Delete Stack from AWS"
         if self.change_protected == True:
             self.log_action("Delete", "Protected")
@@ -1640,7 +1685,7 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
             pass
         pass
 
-        self.delete_stack()
+        self.delete_stack(confirmed)
         utils.log_action('Delete', 'Stack', 'Cache', self.cache_filename)
         try:
             os.remove(self.cache_filename)
@@ -1654,58 +1699,53 @@ A Stack can cache it's templates to the filesystem or check them against AWS and
 
     def wait_for_complete(self):
         "Wait for a Stack's action to COMPLETE and finish and take"
-        # While loop to handle expired token retries
-        while True:
-            if self.action == None:
-                return
-            self.get_status()
-            waiter = None
-            action_name = "Provision"
-            # get a waiter if Stack is not COMPLETE
-            if self.is_updating():
-                waiter = self.cfn_client.get_waiter('stack_update_complete')
-            elif self.is_creating():
-                waiter = self.cfn_client.get_waiter('stack_create_complete')
-            elif self.is_deleting():
-                action_name = "Delete"
-                waiter = self.cfn_client.get_waiter('stack_delete_complete')
-            elif self.is_complete():
-                pass
-            elif not self.is_exists():
-                pass
-            else:
-                message = self.get_stack_error_message()
-                raise StackException(
-                    PacoErrorCode.WaiterError,
-                    message=message
-                )
-
-            # wait ...
-            if waiter != None:
-                self.log_action(action_name, "Wait")
-                try:
-                    waiter.wait(StackName=self.get_name())
-                except WaiterError as waiter_exception:
-                    if str(waiter_exception).find('The security token included in the request is expired') != -1:
-                        self.handle_token_expired()
-                        continue
-                    self.log_action(action_name, "Error")
-                    message = "Waiter Error:  {}\n".format(waiter_exception)
-                    message += self.get_stack_error_message(message)
-                    raise StackException(PacoErrorCode.WaiterError, message = message)
-                self.log_action(action_name, "Done")
-
-            # handle success actions
-            if self.is_exists():
-                self.stack_success()
-
-            # run post hooks
-            if self.action == "create":
-                self.hooks.run("create", "post", self)
-            elif self.action == "update":
-                self.hooks.run("update", "post", self)
-            elif self.action == "delete":
-                self.hooks.run("delete", "post", self)
+        if self.action == None:
+            return
+        self.get_status()
+        action_name = "Provision"
+        success_statuses = None
+        # wait if Stack is not COMPLETE
+        if self.is_updating():
+            success_statuses = ['UPDATE_COMPLETE']
+        elif self.is_creating():
+            success_statuses = ['CREATE_COMPLETE']
+        elif self.is_deleting():
+            action_name = "Delete"
+            success_statuses = ['DELETE_COMPLETE', 'DOES_NOT_EXIST']
+        elif self.is_complete():
+            pass
+        elif not self.is_exists():
+            pass
+        else:
+            message = self.get_stack_error_message()
+            raise StackException(
+                PacoErrorCode.WaiterError,
+                message=message
+            )
 
-            break
+        # wait ...
+        if success_statuses != None:
+            self.log_action(action_name, "Wait")
+            stack_watcher = get_stack_watcher(self.paco_ctx, self.account_ctx, self.aws_region)
+            status, cfn_stack_describe = stack_watcher.wait(self.get_name())
+            self.set_status(cfn_stack_describe)
+            self.status_index.update(self.get_name(), cfn_stack_describe)
+            if status not in success_statuses:
+                self.log_action(action_name, "Error")
+                message = "Waiter Error:  Stack finished in the {} state\n".format(status)
+                message += self.get_stack_error_message(message, skip_status=True)
+                raise StackException(PacoErrorCode.WaiterError, message = message)
+            self.log_action(action_name, "Done")
+
+        # handle success actions
+        if self.is_exists():
+            self.stack_success()
+
+        # run post hooks
+        if self.action == "create":
+            self.hooks.run("create", "post", self)
+        elif self.action == "update":
+            self.hooks.run("update", "post", self)
+        elif self.action == "delete":
+            self.hooks.run("delete", "post", self)
 
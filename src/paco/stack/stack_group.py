@@ -32,6 +32,9 @@ class StackGroup():
         self.name = group_name
         self.aws_name = aws_name
         self.stacks = []
+        # Stacks of this StackGroup and its nested StackGroups keyed by stack_ref
+        self.stack_ref_index = {}
+        self.parent_groups = []
         self.stack_orders = []
         self.stack_output_config = {}
         self.state = None
@@ -69,6 +72,11 @@ class StackGroup():
 
     def validate(self):
         "Loop through stacks and validate each one"
+        if self.paco_ctx.parallel > 1:
+            # late import for breaking circular dependency
+            from paco.stack.validator import StackValidator
+            StackValidator(self.paco_ctx, self).validate()
+            return
         for order_item in self.stack_orders:
             if order_item.order == StackOrder.PROVISION:
                 if isinstance(order_item.stack, StackGroup):
@@ -79,8 +87,24 @@ class StackGroup():
                         order_item.stack.validate
                     )
 
+    def flatten_stack_orders(self):
+        "List of (StackGroup, StackOrderItem) tuples for this StackGroup and all nested StackGroups in stack order"
+        order_items = []
+        for order_item in self.stack_orders:
+            if isinstance(order_item.stack, StackGroup):
+                if order_item.order == StackOrder.PROVISION:
+                    order_items.extend(order_item.stack.flatten_stack_orders())
+            else:
+                order_items.append((self, order_item))
+        return order_items
+
     def provision(self):
         "Loop through stacks and provision each one"
+        if self.paco_ctx.parallel > 1:
+            # late import for breaking circular dependency
+            from paco.stack.scheduler import StackScheduler
+            StackScheduler(self.paco_ctx, self).provision()
+            return
         wait_last_list = []
         for order_item in self.stack_orders:
             if order_item.order == StackOrder.PROVISION:
@@ -108,6 +132,11 @@ class StackGroup():
 
     def delete(self):
         "Loop through stacks and delete each one"
+        if self.paco_ctx.parallel > 1:
+            # late import for breaking circular dependency
+            from paco.stack.scheduler import StackScheduler
+            StackScheduler(self.paco_ctx, self).delete()
+            return
         for order_item in reversed(self.stack_orders):
             if order_item.order == StackOrder.PROVISION:
                 if isinstance(order_item.stack, StackGroup):
@@ -146,35 +175,55 @@ class StackGroup():
             self.stack_orders.append(stack_order)
         if not stack in self.stacks:
             self.stacks.append(stack)
+            self.index_stack(stack)
+
+    def index_stack(self, stack):
+        "Add a Stack, or the Stacks of a nested StackGroup, to the stack_ref index"
+        if isinstance(stack, StackGroup) == True:
+            stack.parent_groups.append(self)
+            for stack_ref, indexed_stack in stack.stack_ref_index.items():
+                self.add_stack_ref(stack_ref, indexed_stack)
+        else:
+            stack_ref = stack.stack_ref
+            if stack_ref:
+                self.add_stack_ref(stack_ref, stack)
+
+    def add_stack_ref(self, stack_ref, stack):
+        "Index a Stack by stack_ref in this StackGroup and every StackGroup it is nested in"
+        # the first Stack added for a stack_ref is kept
+        if stack_ref in self.stack_ref_index:
+            return
+        self.stack_ref_index[stack_ref] = stack
+        for parent_group in self.parent_groups:
+            parent_group.add_stack_ref(stack_ref, stack)
 
     def get_stack_from_ref(self, ref):
-        "Returns a Stack whose stack_ref matches a given ref. Recursively searches all StackGroups."
-        for stack_obj in self.stacks:
-            if isinstance(stack_obj, StackGroup) == True:
-                # stack_obj is a StackGroup
-                stack = stack_obj.get_stack_from_ref(ref)
-                if stack != None:
-                    return stack
-            else:
-                # stack_obj is a Stack
-                stack_ref = stack_obj.stack_ref
-                if stack_ref and stack_ref != '' and ref.raw.find(stack_ref) != -1:
-                    if stack_ref == ref.ref or ref.ref.startswith(stack_ref + '.'):
-                        return stack_obj
+        "Returns the Stack whose stack_ref is the longest match for a given ref, including Stacks in nested StackGroups."
+        ref_parts = ref.ref.split('.')
+        for idx in range(len(ref_parts), 0, -1):
+            stack = self.stack_ref_index.get('.'.join(ref_parts[:idx]), None)
+            if stack != None:
+                return stack
         # Nothing found, None returned
         return None
 
-    def filtered_stack_action(self, stack, action_method):
-        "Call a stack action only if it falls within the scope"
+    def is_stack_in_scope(self, stack):
+        "True if a stack falls within the scope"
         if self.filter_config == None:
-            return action_method()
+            return True
         stack_ref = None
         if ICloudFormationStack.providedBy(stack):
             stack_ref = stack.template.config_ref
         elif IBotoStack.providedBy(stack):
             stack_ref = stack.resource.paco_ref_parts
         # Exact match or append '.' otherwise foo.bar would match with foo.bar_bad
-        if stack_ref == self.filter_config or stack_ref.startswith(self.filter_config + '.'):
+        return stack_ref == self.filter_config or stack_ref.startswith(self.filter_config + '.')
+
+    def filtered_stack_action(self, stack, action_method):
+        "Call a stack action only if it falls within the scope"
+        if self.filter_config == None:
+            return action_method()
+        if self.is_stack_in_scope(stack):
             action_method()
         else:
             stack.log_action('Filtered', 'Filtered')
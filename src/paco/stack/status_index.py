@@ -0,0 +1,116 @@
+"""
+Index of CloudFormation stack statuses for an account and region.
+
+The first Stack to ask for its status in an account and region fills the index with a
+single paginated describe_stacks sweep. Later Stacks read their status from the index
+instead of making their own describe_stacks call.
+
+The Outputs of a stack are read from the same describe, so every Stack object with the
+same name shares one describe_stacks result.
+
+Only stacks in a terminal state are served from the index. A Stack that Paco acts on
+is invalidated, so its next status check goes to CloudFormation, and it is added back
+to the index once it reaches a terminal state again.
+"""
+
+import threading
+
+
+class StackStatusIndex():
+    "describe_stacks results for every stack in an account and region"
+
+    def __init__(self, account_ctx, aws_region):
+        self.account_ctx = account_ctx
+        self.aws_region = aws_region
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.stacks = {}
+        self.outputs = {}
+        self.stale = set()
+        self.changed = set()
+
+    def load(self):
+        "Describe every stack in the account and region"
+        cfn_client = self.account_ctx.get_aws_client('cloudformation', self.aws_region)
+        stacks = {}
+        paginator = cfn_client.get_paginator('describe_stacks')
+        for page in paginator.paginate():
+            for cfn_stack_describe in page['Stacks']:
+                stacks[cfn_stack_describe['StackName']] = cfn_stack_describe
+        for stack_name, cfn_stack_describe in stacks.items():
+            if stack_name in self.stale:
+                continue
+            if self.is_terminal(cfn_stack_describe):
+                self.stacks[stack_name] = cfn_stack_describe
+            else:
+                self.stale.add(stack_name)
+        self.loaded = True
+
+    def is_terminal(self, cfn_stack_describe):
+        "True if a stack is not in progress"
+        if cfn_stack_describe == None:
+            return True
+        return not cfn_stack_describe['StackStatus'].endswith('_IN_PROGRESS')
+
+    def get(self, stack_name):
+        """Return a tuple of (found, describe_stacks dict) for a stack.
+        A describe of None means the stack does not exist. found is False if the stack
+        needs to be described directly."""
+        with self.lock:
+            if self.loaded == False:
+                self.load()
+            if stack_name in self.stale:
+                return False, None
+            if stack_name in self.stacks:
+                return True, self.stacks[stack_name]
+            # stacks missing from the sweep do not exist
+            return True, None
+
+    def get_outputs(self, stack_name, cfn_stack_describe):
+        """Return a dict of OutputValues keyed by OutputKey for a describe of a stack.
+        The dict is shared by every Stack with the same name until the stack is invalidated."""
+        with self.lock:
+            outputs = self.outputs.get(stack_name)
+            if outputs == None or outputs[0] is not cfn_stack_describe:
+                values = {}
+                for output in cfn_stack_describe.get('Outputs', []):
+                    values[output['OutputKey']] = output['OutputValue']
+                outputs = (cfn_stack_describe, values)
+                if self.stacks.get(stack_name) is cfn_stack_describe:
+                    self.outputs[stack_name] = outputs
+            return outputs[1]
+
+    def update(self, stack_name, cfn_stack_describe):
+        "Record the latest describe of a stack. Stacks that are in progress stay out of the index."
+        with self.lock:
+            self.outputs.pop(stack_name, None)
+            if self.is_terminal(cfn_stack_describe):
+                self.stale.discard(stack_name)
+                self.stacks[stack_name] = cfn_stack_describe
+            else:
+                self.stale.add(stack_name)
+                self.stacks.pop(stack_name, None)
+
+    def is_changed(self, stack_name):
+        "True if Paco has acted on the stack in this run"
+        return stack_name in self.changed
+
+    def invalidate(self, stack_name):
+        "Mark a stack that Paco has acted on so its status is fetched from CloudFormation"
+        with self.lock:
+            self.changed.add(stack_name)
+            self.stale.add(stack_name)
+            self.stacks.pop(stack_name, None)
+            self.outputs.pop(stack_name, None)
+
+
+stack_status_indexes = {}
+stack_status_indexes_lock = threading.Lock()
+
+def get_stack_status_index(account_ctx, aws_region):
+    "Return the StackStatusIndex for an account and region"
+    key = (account_ctx.get_name(), aws_region)
+    with stack_status_indexes_lock:
+        if key not in stack_status_indexes:
+            stack_status_indexes[key] = StackStatusIndex(account_ctx, aws_region)
+        return stack_status_indexes[key]
@@ -0,0 +1,79 @@
+from paco.config.paco_context import PacoContext
+from paco.stack.fanout import StackGroupFanOut
+import tempfile
+import threading
+import time
+import unittest
+
+
+class FakeAccountContext():
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name
+
+
+class FakeStack():
+    aws_region = 'us-west-2'
+
+
+class FakeStackGroup():
+    "Records when it is provisioned and how many StackGroups of its account are running"
+
+    def __init__(self, name, account_name, events, counts, fail=False):
+        self.name = name
+        self.account_ctx = FakeAccountContext(account_name)
+        self.stacks = [FakeStack()]
+        self.events = events
+        self.counts = counts
+        self.fail = fail
+
+    def get_aws_name(self):
+        return self.name
+
+    def provision(self):
+        account_name = self.account_ctx.get_name()
+        with self.counts['lock']:
+            self.counts[account_name] = self.counts.get(account_name, 0) + 1
+            self.counts['max'] = max(self.counts['max'], self.counts[account_name])
+        self.events.append(('start', self.name))
+        time.sleep(0.05)
+        with self.counts['lock']:
+            self.counts[account_name] -= 1
+        self.events.append(('finish', self.name))
+        if self.fail:
+            raise Exception(f'{self.name} failed')
+
+
+class TestStackGroupFanOut(unittest.TestCase):
+
+    def setUp(self):
+        self.paco_ctx = PacoContext(tempfile.mkdtemp())
+        self.paco_ctx.parallel = 2
+        self.events = []
+        self.counts = {'lock': threading.Lock(), 'max': 0}
+
+    def stack_group(self, name, account_name, fail=False):
+        return FakeStackGroup(name, account_name, self.events, self.counts, fail)
+
+    def test_leaders_first_and_account_cap(self):
+        leader = self.stack_group('leader', 'master')
+        followers = [self.stack_group(f'dev{idx}', 'dev') for idx in range(4)]
+        followers += [self.stack_group(f'prod{idx}', 'prod') for idx in range(4)]
+        start = time.time()
+        StackGroupFanOut(self.paco_ctx, [leader] + followers, leaders=[leader]).provision()
+        self.assertEqual(self.events[:2], [('start', 'leader'), ('finish', 'leader')])
+        self.assertEqual(self.counts['max'], 2)
+        # two accounts with two StackGroups at a time need two rounds after the leader
+        self.assertLess(time.time() - start, 0.35)
+
+    def test_failure_stops_new_stack_groups(self):
+        leader = self.stack_group('leader', 'master', fail=True)
+        follower = self.stack_group('follower', 'dev')
+        fanout = StackGroupFanOut(self.paco_ctx, [leader, follower], leaders=[leader])
+        with self.assertRaises(Exception):
+            fanout.provision()
+        self.assertNotIn(('start', 'follower'), self.events)
+        self.assertEqual([item.status for item in fanout.items], ['Failed', 'Skipped'])
@@ -0,0 +1,33 @@
+from paco.stack.stack import StackOutputsManager
+from paco.stack.status_index import StackStatusIndex
+import pathlib
+import tempfile
+import unittest
+
+
+class TestSavedOutputs(unittest.TestCase):
+
+    def setUp(self):
+        self.outputs_path = pathlib.Path(tempfile.mkdtemp())
+
+    def test_get_value(self):
+        manager = StackOutputsManager()
+        manager.add(self.outputs_path, {'netenv': {'mynet': {'prod': {'vpc': {
+            '__name__': 'vpc-123',
+            'subnet': {'__name__': 'subnet-123'},
+        }}}}})
+        # a new manager reads the values back from disk
+        manager = StackOutputsManager()
+        self.assertEqual(manager.get_value(self.outputs_path, 'netenv.mynet.prod.vpc'), 'vpc-123')
+        self.assertEqual(manager.get_value(self.outputs_path, 'netenv.mynet.prod.vpc.subnet'), 'subnet-123')
+        self.assertEqual(manager.get_value(self.outputs_path, 'netenv.mynet.prod'), None)
+        self.assertEqual(manager.get_value(self.outputs_path, 'netenv.mynet.dev.vpc'), None)
+        self.assertEqual(manager.get_value(self.outputs_path, 'service.mynet.vpc'), None)
+
+    def test_changed_stacks(self):
+        index = StackStatusIndex(None, 'us-west-2')
+        self.assertFalse(index.is_changed('stack-a'))
+        index.invalidate('stack-a')
+        index.update('stack-a', {'StackName': 'stack-a', 'StackStatus': 'UPDATE_COMPLETE'})
+        self.assertTrue(index.is_changed('stack-a'))
+        self.assertFalse(index.is_changed('stack-b'))
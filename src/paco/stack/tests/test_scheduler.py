@@ -0,0 +1,175 @@
+from paco.config.paco_context import PacoContext
+from paco.stack import StackGroup, StackOrder, StackOutputParam
+from paco.stack.interfaces import ICloudFormationStack
+from paco.stack.scheduler import StackScheduler
+from paco.core.exception import StackException
+from zope.interface import implementer
+import tempfile
+import threading
+import time
+import unittest
+
+
+class FakeAccountContext():
+
+    def get_name(self):
+        return 'test'
+
+
+class FakeController():
+    stack_group_filter = None
+
+    def get_aws_name(self):
+        return 'Test'
+
+
+class FakeStack():
+    "Records the order that Stacks are provisioned and completed in"
+
+    def __init__(self, name, events, delay=0.0):
+        self.name = name
+        self.events = events
+        self.delay = delay
+        self.parameters = []
+        self.stack_ref = 'test.' + name
+        self.account_ctx = None
+        self.aws_region = 'us-west-2'
+        self.template = None
+        self.dependency_stack = None
+        self.cached = False
+
+    def get_name(self):
+        return self.name
+
+    def depends_on(self, stack):
+        self.parameters.append(StackOutputParam(stack.name + 'Param', stack, 'Output'))
+
+    def provision(self):
+        self.events.append(('provision', self.name))
+
+    def wait_for_complete(self):
+        time.sleep(self.delay)
+        self.events.append(('complete', self.name))
+
+    def delete(self):
+        self.events.append(('delete', self.name))
+
+    def log_action(self, action, stack_action, message=None):
+        self.events.append((stack_action.lower(), self.name))
+
+
+@implementer(ICloudFormationStack)
+class FakeCFNStack(FakeStack):
+    "A CloudFormation Stack that can have termination protection"
+    termination_protection = False
+
+    def delete(self, confirmed=False):
+        self.events.append(('delete', self.name))
+
+
+class TestStackScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.paco_ctx = PacoContext(tempfile.mkdtemp())
+        self.paco_ctx.yes = True
+        self.paco_ctx.parallel = 4
+        self.events = []
+        self.stack_group = StackGroup(self.paco_ctx, None, 'group', 'Group', FakeController())
+
+    def add_stack(self, name, delay=0.0, orders=[StackOrder.PROVISION, StackOrder.WAIT]):
+        stack = FakeStack(name, self.events, delay)
+        self.stack_group.add_stack_order(stack, orders)
+        return stack
+
+    def test_dependencies_complete_first(self):
+        vpc = self.add_stack('vpc', delay=0.05)
+        segment = self.add_stack('segment')
+        other = self.add_stack('other')
+        segment.depends_on(vpc)
+        self.stack_group.provision()
+        self.assertLess(self.events.index(('complete', 'vpc')), self.events.index(('provision', 'segment')))
+        # independent stacks do not wait for the slow vpc stack
+        self.assertLess(self.events.index(('complete', 'other')), self.events.index(('complete', 'vpc')))
+
+    def test_independent_stacks_overlap(self):
+        for idx in range(4):
+            self.add_stack(f'stack{idx}', delay=0.2)
+        start = time.time()
+        self.stack_group.provision()
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(len(self.events), 8)
+
+    def test_dependency_group_waits_for_prior_stacks(self):
+        kms = self.add_stack('kms')
+        role = self.add_stack('role', delay=0.05)
+        kms_update = self.add_stack('kms-update')
+        kms_update.dependency_stack = kms
+        scheduler = StackScheduler(self.paco_ctx, self.stack_group)
+        nodes = {node.stack.name: node for node in scheduler.nodes}
+        self.assertEqual(
+            set(node.stack.name for node in nodes['kms-update'].depends_on),
+            set(['kms', 'role'])
+        )
+
+    def test_cycle_detected(self):
+        first = self.add_stack('first')
+        second = self.add_stack('second')
+        first.depends_on(second)
+        second.depends_on(first)
+        with self.assertRaises(StackException):
+            StackScheduler(self.paco_ctx, self.stack_group)
+
+    def test_failure_stops_dependents(self):
+        broken = self.add_stack('broken')
+        dependent = self.add_stack('dependent')
+        dependent.depends_on(broken)
+        def fail():
+            raise StackException(None, message='failed')
+        broken.provision = fail
+        with self.assertRaises(StackException):
+            self.stack_group.provision()
+        self.assertNotIn(('provision', 'dependent'), self.events)
+
+    def test_cancel_stops_new_stacks(self):
+        vpc = self.add_stack('vpc', delay=0.05)
+        segment = self.add_stack('segment')
+        segment.depends_on(vpc)
+        cancel_event = threading.Event()
+        def cancel():
+            self.events.append(('provision', 'vpc'))
+            cancel_event.set()
+        vpc.provision = cancel
+        with self.assertRaises(StackException):
+            StackScheduler(self.paco_ctx, self.stack_group, cancel_event=cancel_event).provision()
+        # the running stack is waited on and its dependent is not started
+        self.assertIn(('complete', 'vpc'), self.events)
+        self.assertNotIn(('provision', 'segment'), self.events)
+
+    def test_delete_dependents_first(self):
+        vpc = self.add_stack('vpc')
+        segment = self.add_stack('segment', delay=0.05)
+        other = self.add_stack('other')
+        segment.depends_on(vpc)
+        self.stack_group.delete()
+        self.assertLess(self.events.index(('complete', 'segment')), self.events.index(('delete', 'vpc')))
+        # independent stacks do not wait for the slow segment stack
+        self.assertLess(self.events.index(('delete', 'other')), self.events.index(('complete', 'segment')))
+
+    def test_kept_stack_keeps_its_dependencies(self):
+        vpc = FakeCFNStack('vpc', self.events)
+        segment = FakeCFNStack('segment', self.events)
+        segment.termination_protection = True
+        other = FakeCFNStack('other', self.events)
+        for stack in (vpc, segment, other):
+            stack.account_ctx = FakeAccountContext()
+            self.stack_group.add_stack_order(stack)
+        segment.depends_on(vpc)
+        self.paco_ctx.yes = False
+        # delete the stacks but not the stacks with termination protection
+        answers = [True, False]
+        self.paco_ctx.input_confirm_action = lambda *args, **kwargs: answers.pop(0)
+        self.stack_group.delete()
+        self.assertIn(('delete', 'other'), self.events)
+        self.assertNotIn(('delete', 'segment'), self.events)
+        self.assertNotIn(('delete', 'vpc'), self.events)
+        self.assertIn(('kept', 'vpc'), self.events)
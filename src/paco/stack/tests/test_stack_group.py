@@ -0,0 +1,52 @@
+from paco.config.paco_context import PacoContext
+from paco.models.references import Reference
+from paco.stack import StackGroup
+import tempfile
+import unittest
+
+
+class FakeController():
+    stack_group_filter = None
+
+    def get_aws_name(self):
+        return 'Test'
+
+
+class FakeStack():
+
+    def __init__(self, stack_ref):
+        self.stack_ref = stack_ref
+
+
+class TestGetStackFromRef(unittest.TestCase):
+
+    def setUp(self):
+        self.paco_ctx = PacoContext(tempfile.mkdtemp())
+
+    def new_stack_group(self, name):
+        return StackGroup(self.paco_ctx, None, name, name, FakeController())
+
+    def test_longest_match(self):
+        stack_group = self.new_stack_group('app')
+        web = FakeStack('netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.web')
+        web_support = FakeStack('netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.web.logs')
+        stack_group.add_stack_order(web)
+        stack_group.add_stack_order(web_support)
+        ref = Reference('paco.ref netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.web.name')
+        self.assertIs(stack_group.get_stack_from_ref(ref), web)
+        ref = Reference('paco.ref netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.web.logs.arn')
+        self.assertIs(stack_group.get_stack_from_ref(ref), web_support)
+        # stack_refs only match whole ref parts
+        ref = Reference('paco.ref netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.webapp.name')
+        self.assertEqual(stack_group.get_stack_from_ref(ref), None)
+
+    def test_nested_stack_groups(self):
+        stack_group = self.new_stack_group('app')
+        nested_group = self.new_stack_group('site')
+        stack_group.add_stack_order(nested_group)
+        # Stacks added after the nested StackGroup was added are found from the parent
+        db = FakeStack('netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.db')
+        nested_group.add_stack_order(db)
+        ref = Reference('paco.ref netenv.mynet.dev.us-west-2.applications.app.groups.site.resources.db.endpoint.address')
+        self.assertIs(stack_group.get_stack_from_ref(ref), db)
+        self.assertIs(nested_group.get_stack_from_ref(ref), db)
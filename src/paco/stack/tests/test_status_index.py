@@ -0,0 +1,75 @@
+from paco.stack.status_index import StackStatusIndex
+import unittest
+
+
+class FakePaginator():
+
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self):
+        self.client.sweeps += 1
+        return [{'Stacks': self.client.stacks[:2]}, {'Stacks': self.client.stacks[2:]}]
+
+
+class FakeCloudFormation():
+
+    def __init__(self, stacks):
+        self.stacks = stacks
+        self.sweeps = 0
+
+    def get_paginator(self, name):
+        return FakePaginator(self)
+
+
+class FakeAccountContext():
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_name(self):
+        return 'test'
+
+    def get_aws_client(self, client_name, aws_region=None, force=False):
+        return self.client
+
+
+def describe(name, status):
+    return {'StackName': name, 'StackId': 'id-' + name, 'StackStatus': status}
+
+
+class TestStackStatusIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeCloudFormation([
+            describe('vpc', 'CREATE_COMPLETE'),
+            describe('app', 'UPDATE_IN_PROGRESS'),
+            describe('db', 'UPDATE_COMPLETE'),
+        ])
+        self.index = StackStatusIndex(FakeAccountContext(self.client), 'us-west-2')
+
+    def test_single_sweep(self):
+        self.assertEqual(self.index.get('vpc'), (True, describe('vpc', 'CREATE_COMPLETE')))
+        self.assertEqual(self.index.get('db')[1]['StackStatus'], 'UPDATE_COMPLETE')
+        self.assertEqual(self.index.get('missing'), (True, None))
+        self.assertEqual(self.client.sweeps, 1)
+
+    def test_in_progress_is_not_indexed(self):
+        self.assertEqual(self.index.get('app'), (False, None))
+
+    def test_invalidate_and_update(self):
+        self.index.invalidate('vpc')
+        self.assertEqual(self.index.get('vpc'), (False, None))
+        self.index.update('vpc', describe('vpc', 'UPDATE_IN_PROGRESS'))
+        self.assertEqual(self.index.get('vpc'), (False, None))
+        self.index.update('vpc', describe('vpc', 'UPDATE_COMPLETE'))
+        self.assertEqual(self.index.get('vpc')[1]['StackStatus'], 'UPDATE_COMPLETE')
+
+    def test_outputs_shared_until_invalidated(self):
+        vpc = self.index.get('vpc')[1]
+        vpc['Outputs'] = [{'OutputKey': 'VPC', 'OutputValue': 'vpc-123'}, {'OutputKey': 'CIDR', 'OutputValue': '10.0.0.0/16'}]
+        outputs = self.index.get_outputs('vpc', vpc)
+        self.assertEqual(outputs, {'VPC': 'vpc-123', 'CIDR': '10.0.0.0/16'})
+        self.assertIs(self.index.get_outputs('vpc', vpc), outputs)
+        self.index.invalidate('vpc')
+        self.assertNotIn('vpc', self.index.outputs)
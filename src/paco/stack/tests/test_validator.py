@@ -0,0 +1,72 @@
+from paco.config.paco_context import PacoContext
+from paco.stack import StackGroup
+from paco.stack.interfaces import ICloudFormationStack
+from paco.stack.validator import StackValidator
+from zope.interface import implementer
+import tempfile
+import time
+import unittest
+
+
+class FakeController():
+    stack_group_filter = None
+
+    def get_aws_name(self):
+        return 'Test'
+
+
+@implementer(ICloudFormationStack)
+class FakeStack():
+    "Records the order that templates are generated, checked and reported in"
+
+    def __init__(self, name, events, delay=0.0, enabled=True):
+        self.name = name
+        self.events = events
+        self.delay = delay
+        self.enabled = enabled
+        self.stack_ref = 'test.' + name
+
+    def prepare_validation(self):
+        self.events.append(('generate', self.name))
+        return self.enabled
+
+    def validate_template(self):
+        time.sleep(self.delay)
+        self.events.append(('check', self.name))
+
+    def validate_template_changes(self):
+        self.events.append(('report', self.name))
+
+
+class TestStackValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.paco_ctx = PacoContext(tempfile.mkdtemp())
+        self.paco_ctx.parallel = 4
+        self.events = []
+        self.stack_group = StackGroup(self.paco_ctx, None, 'group', 'Group', FakeController())
+
+    def add_stack(self, name, delay=0.0, enabled=True):
+        stack = FakeStack(name, self.events, delay, enabled)
+        self.stack_group.add_stack_order(stack)
+        return stack
+
+    def test_checks_overlap_and_report_in_order(self):
+        for idx in range(4):
+            self.add_stack(f'stack{idx}', delay=0.2 - idx * 0.05)
+        self.add_stack('disabled', enabled=False)
+        start = time.time()
+        self.stack_group.validate()
+        self.assertLess(time.time() - start, 0.4)
+        reports = [name for action, name in self.events if action == 'report']
+        self.assertEqual(reports, ['stack0', 'stack1', 'stack2', 'stack3'])
+
+    def test_failed_check_is_raised(self):
+        broken = self.add_stack('broken')
+        def fail():
+            raise Exception('invalid template')
+        broken.validate_template = fail
+        self.add_stack('other')
+        with self.assertRaises(Exception):
+            StackValidator(self.paco_ctx, self.stack_group).validate()
+        self.assertNotIn(('report', 'broken'), self.events)
@@ -0,0 +1,91 @@
+from botocore.exceptions import ClientError
+from paco.stack.watcher import StackWatcher
+import threading
+import unittest
+
+
+class FakeCloudFormation():
+    "Returns a scripted sequence of statuses for each stack"
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = 0
+
+    def describe_stacks(self, StackName):
+        self.calls += 1
+        statuses = self.statuses[StackName]
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        if status == None:
+            raise ClientError(
+                {'Error': {'Code': 'ValidationError', 'Message': f'Stack with id {StackName} does not exist'}},
+                'DescribeStacks'
+            )
+        if status in ('Throttling', 'AccessDenied'):
+            raise ClientError({'Error': {'Code': status, 'Message': status}}, 'DescribeStacks')
+        return {'Stacks': [{'StackName': StackName, 'StackId': 'id-' + StackName, 'StackStatus': status}]}
+
+
+class FakeAccountContext():
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_name(self):
+        return 'test'
+
+    def get_aws_client(self, client_name, aws_region=None, force=False):
+        return self.client
+
+
+class TestStackWatcher(unittest.TestCase):
+
+    def watcher(self, statuses):
+        self.client = FakeCloudFormation(statuses)
+        return StackWatcher(FakeAccountContext(self.client), 'us-west-2', poll_interval=0.01, max_poll_interval=0.05)
+
+    def test_wait_until_terminal(self):
+        watcher = self.watcher({'app': ['UPDATE_IN_PROGRESS', 'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS', 'UPDATE_COMPLETE']})
+        status, describe = watcher.wait('app')
+        self.assertEqual(status, 'UPDATE_COMPLETE')
+        self.assertEqual(describe['StackId'], 'id-app')
+        self.assertEqual(self.client.calls, 3)
+
+    def test_deleted_stack(self):
+        watcher = self.watcher({'app': ['DELETE_IN_PROGRESS', None]})
+        status, describe = watcher.wait('app')
+        self.assertEqual(status, 'DOES_NOT_EXIST')
+        self.assertEqual(describe, None)
+
+    def test_concurrent_waits_share_polls(self):
+        watcher = self.watcher({
+            'one': ['CREATE_IN_PROGRESS', 'CREATE_COMPLETE'],
+            'two': ['CREATE_IN_PROGRESS', 'CREATE_IN_PROGRESS', 'ROLLBACK_COMPLETE'],
+        })
+        results = {}
+        def wait(name):
+            results[name] = watcher.wait(name)[0]
+        threads = [threading.Thread(target=wait, args=(name,)) for name in ('one', 'two')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, {'one': 'CREATE_COMPLETE', 'two': 'ROLLBACK_COMPLETE'})
+
+    def test_poll_errors(self):
+        watcher = self.watcher({
+            'one': ['CREATE_IN_PROGRESS', 'Throttling', 'Throttling', 'CREATE_COMPLETE'],
+            'two': ['CREATE_IN_PROGRESS', 'AccessDenied'],
+        })
+        results = {}
+        def wait(name):
+            try:
+                results[name] = watcher.wait(name)[0]
+            except ClientError as error:
+                results[name] = error.response['Error']['Code']
+        threads = [threading.Thread(target=wait, args=(name,)) for name in ('one', 'two')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        # throttled polls are retried and an error only fails its own stack
+        self.assertEqual(results, {'one': 'CREATE_COMPLETE', 'two': 'AccessDenied'})
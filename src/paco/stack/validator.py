@@ -0,0 +1,77 @@
+"""
+Pipelined validation of Stacks.
+
+Validating a Stack has three steps: the template is generated, the template is checked
+by uploading it and calling the CloudFormation ValidateTemplate API (or by running
+cfn-lint) and the template is diffed against the last applied template.
+
+A StackValidator generates the templates one at a time in stack order while the checks
+of the templates that have already been generated run on a bounded pool of threads. The
+results are reported, and the diffs shown, in stack order as soon as the checks of every
+Stack before them have finished. Generating templates is CPU bound and needs the project
+model, so it stays on the calling thread while the checks, which wait on the network or
+on cfn-lint, overlap.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from paco.stack.interfaces import ICloudFormationStack
+from paco.stack.stack_group import StackOrder
+
+
+class StackValidator():
+    """Validates the Stacks of one or more StackGroups with the template checks running concurrently.
+
+    max_workers limits the number of templates that are being checked at once.
+    When cancel_event is set no more Stacks are validated.
+    """
+
+    def __init__(self, paco_ctx, stack_groups, max_workers=None, cancel_event=None):
+        self.paco_ctx = paco_ctx
+        if not isinstance(stack_groups, (list, tuple)):
+            stack_groups = [stack_groups]
+        self.stack_groups = stack_groups
+        if max_workers == None:
+            max_workers = paco_ctx.parallel
+        self.max_workers = max(1, max_workers)
+        self.cancel_event = cancel_event
+
+    def is_cancelled(self):
+        return self.cancel_event != None and self.cancel_event.is_set()
+
+    def run_check(self, stack, log_prefix):
+        with self.paco_ctx.log_prefix(log_prefix):
+            stack.validate_template()
+
+    def report(self, pending, block):
+        "Report the Stacks at the front of the queue whose checks have finished, or wait for all of them if block"
+        while pending and (block or pending[0][1].done()):
+            stack, future = pending.popleft()
+            future.result()
+            stack.validate_template_changes()
+
+    def validate(self):
+        "Validate every Stack in stack order"
+        pending = deque()
+        log_prefix = self.paco_ctx.get_log_prefix()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='paco-validate') as executor:
+            try:
+                for stack_group in self.stack_groups:
+                    for owner_group, order_item in stack_group.flatten_stack_orders():
+                        if order_item.order != StackOrder.PROVISION or self.is_cancelled():
+                            continue
+                        stack = order_item.stack
+                        if not owner_group.is_stack_in_scope(stack):
+                            stack.log_action('Filtered', 'Filtered')
+                        elif not ICloudFormationStack.providedBy(stack):
+                            self.report(pending, block=True)
+                            stack.validate()
+                        elif stack.prepare_validation():
+                            pending.append((stack, executor.submit(self.run_check, stack, log_prefix)))
+                        self.report(pending, block=False)
+                self.report(pending, block=True)
+            except Exception:
+                # do not start the checks that are still queued
+                for _, future in pending:
+                    future.cancel()
+                raise
@@ -0,0 +1,189 @@
+"""
+Shared CloudFormation stack completion watcher.
+
+A StackWatcher polls CloudFormation once per account and region for every Stack that
+is being waited on, instead of each Stack running its own boto3 waiter. When only a
+few Stacks are in flight they are described by name, otherwise a single paginated
+describe_stacks sweep fetches the status of all of them. Waiting Stacks are released
+as soon as the poll sees them reach a terminal state.
+
+The poll interval starts at paco_ctx.stack_poll_interval and backs off towards
+paco_ctx.stack_poll_max_interval while nothing changes. It resets whenever a
+Stack changes status or a new Stack starts waiting.
+
+A poll that fails with a throttling, server or connection error is retried by the
+next poll. Only the Stacks whose describe keeps failing, or fails with any other
+error, are released with the error, so one failed call does not fail every Stack
+in the account and region.
+"""
+
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+from paco.config.aws_clients import THROTTLING_ERROR_CODES
+import threading
+
+
+# Stacks in flight at or below this number are described by name
+DESCRIBE_BY_NAME_MAX = 3
+POLL_BACKOFF_FACTOR = 1.5
+# Polls in a row that can fail with a transient error before a Stack is released with the error
+MAX_POLL_ERRORS = 10
+
+
+def is_transient_error(error):
+    "True if a describe_stacks error is likely to succeed when it is retried"
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', None)
+        status_code = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return code in THROTTLING_ERROR_CODES or status_code >= 500
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+class WatchedStack():
+    "A Stack that is waiting to reach a terminal state"
+
+    def __init__(self, stack_name):
+        self.stack_name = stack_name
+        self.event = threading.Event()
+        self.status = None
+        self.describe = None
+        self.error = None
+        # transient errors in a row
+        self.poll_errors = 0
+
+
+class StackWatcher():
+    "Polls the status of in-flight CloudFormation stacks in an account and region"
+
+    def __init__(self, account_ctx, aws_region, poll_interval=3, max_poll_interval=20):
+        self.account_ctx = account_ctx
+        self.aws_region = aws_region
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.interval = poll_interval
+        self.lock = threading.Lock()
+        self.watched = {}
+        self.thread = None
+        self.cfn_client = account_ctx.get_aws_client('cloudformation', aws_region)
+
+    def wait(self, stack_name):
+        """Block until the named stack reaches a terminal state.
+        Returns a tuple of the final StackStatus name and the describe_stacks dict for the stack,
+        or ('DOES_NOT_EXIST', None) if the stack no longer exists."""
+        with self.lock:
+            watched = self.watched.get(stack_name)
+            if watched == None:
+                watched = WatchedStack(stack_name)
+                self.watched[stack_name] = watched
+            # a newly waiting stack starts a fresh poll cadence
+            self.interval = self.poll_interval
+            if self.thread == None:
+                self.thread = threading.Thread(
+                    target=self.poll_loop,
+                    name=f'paco-stack-watcher-{self.account_ctx.get_name()}-{self.aws_region}',
+                    daemon=True
+                )
+                self.thread.start()
+        watched.event.wait()
+        if watched.error != None:
+            raise watched.error
+        return watched.status, watched.describe
+
+    def poll_loop(self):
+        "Poll until no stacks are being waited on"
+        stop = threading.Event()
+        while True:
+            with self.lock:
+                if len(self.watched) == 0:
+                    self.thread = None
+                    return
+                interval = self.interval
+            stop.wait(interval)
+            with self.lock:
+                stack_names = list(self.watched.keys())
+            stack_describes, errors = self.describe_stacks(stack_names)
+            changed = False
+            with self.lock:
+                for stack_name in stack_names:
+                    watched = self.watched[stack_name]
+                    error = errors.get(stack_name)
+                    if error != None:
+                        watched.poll_errors += 1
+                        if is_transient_error(error) and watched.poll_errors < MAX_POLL_ERRORS:
+                            continue
+                        # release only this stack with the error
+                        watched.error = error
+                        del self.watched[stack_name]
+                        watched.event.set()
+                        continue
+                    watched.poll_errors = 0
+                    describe = stack_describes.get(stack_name)
+                    if describe == None:
+                        status = 'DOES_NOT_EXIST'
+                    else:
+                        status = describe['StackStatus']
+                    if status != watched.status:
+                        changed = True
+                    watched.status = status
+                    watched.describe = describe
+                    if not status.endswith('_IN_PROGRESS'):
+                        del self.watched[stack_name]
+                        watched.event.set()
+                if changed:
+                    self.interval = self.poll_interval
+                else:
+                    self.interval = min(self.interval * POLL_BACKOFF_FACTOR, self.max_poll_interval)
+
+    def describe_stacks(self, stack_names):
+        """Return a tuple of a dict of describe_stacks dicts and a dict of errors, both keyed by stack name.
+        Stacks that do not exist are omitted from both."""
+        if len(stack_names) > DESCRIBE_BY_NAME_MAX:
+            try:
+                return self.describe_all_stacks(stack_names), {}
+            except Exception as error:
+                if is_transient_error(error):
+                    return {}, {stack_name: error for stack_name in stack_names}
+                # describe each stack to find the ones that fail
+        stack_describes = {}
+        errors = {}
+        for stack_name in stack_names:
+            try:
+                response = self.cfn_client.describe_stacks(StackName=stack_name)
+            except ClientError as error:
+                if error.response['Error']['Code'] == 'ValidationError' and \
+                    error.response['Error']['Message'].endswith("does not exist"):
+                    continue
+                errors[stack_name] = error
+                continue
+            except Exception as error:
+                errors[stack_name] = error
+                continue
+            stack_describes[stack_name] = response['Stacks'][0]
+        return stack_describes, errors
+
+    def describe_all_stacks(self, stack_names):
+        "Return a dict of describe_stacks dicts keyed by stack name from a paginated sweep of every stack"
+        stack_describes = {}
+        names = set(stack_names)
+        paginator = self.cfn_client.get_paginator('describe_stacks')
+        for page in paginator.paginate():
+            for describe in page['Stacks']:
+                if describe['StackName'] in names:
+                    stack_describes[describe['StackName']] = describe
+        return stack_describes
+
+
+stack_watchers = {}
+stack_watchers_lock = threading.Lock()
+
+def get_stack_watcher(paco_ctx, account_ctx, aws_region):
+    "Return the shared StackWatcher for an account and region"
+    key = (account_ctx.get_name(), aws_region)
+    with stack_watchers_lock:
+        if key not in stack_watchers:
+            stack_watchers[key] = StackWatcher(
+                account_ctx,
+                aws_region,
+                poll_interval=paco_ctx.stack_poll_interval,
+                max_poll_interval=paco_ctx.stack_poll_max_interval,
+            )
+        return stack_watchers[key]
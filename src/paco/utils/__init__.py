@@ -90,7 +90,7 @@ def md5sum(filename=None, str_data=None, bytes_data=None):
     d = hashlib.md5()
     if filename != None:
         with open(filename, mode='rb') as f:
-            for buf in iter(partial(f.read, 128), b''):
+            for buf in iter(partial(f.read, 65536), b''):
                 d.update(buf)
     elif str_data != None:
         d.update(bytearray(str_data, 'utf-8'))
@@ -1,62 +1,145 @@
 """
 Cache the model after it has been parsed from YAML to speed up subsequent runs
+
+The cached model is reused when the fingerprint of the project files, the enabled
+Service plug-ins, the installed paco and paco.models versions and the load options
+are the same as when the model was cached.
 """
 
-import paco.models
+from paco.core.yaml import read_yaml_file
+from paco.models import load_project_from_yaml
+from paco.utils import md5sum, write_to_file
 import os
 import os.path
 import pathlib
 import pickle
-from paco.models import load_project_from_yaml
+import sys
 
 
-def get_max_mtime(path, exclude):
-    """
-    Get the most recently modified time in a directory
-    """
-    mtimes = []
-    for root, dirs, files in os.walk(path, topdown=True):
-        dirs[:] = [d for d in dirs if d not in exclude]
-        mtimes.append(os.path.getmtime(root))
-        for file in files:
-            mtimes.append(os.path.getmtime(root + os.sep + file))
-    return max(mtimes)
-
-def load_cached_project(project_path):
+# Increment when the format of the cache changes
+CACHE_FORMAT_VERSION = 1
+
+# Directories in a Paco project that are not part of the model
+EXCLUDE_DIRS = ('.paco-work', 'build', '.git', '__pycache__')
+
+# YAML and credentials files are fingerprinted by their contents, other files by their size and mtime
+CONTENT_HASH_SUFFIXES = ('.yaml', '.yml')
+CONTENT_HASH_NAMES = ('.credentials', '.credentials.yaml', '.credentials.yml')
+
+def get_distribution_version(name):
+    "Version of an installed distribution or None"
+    import pkg_resources
+    try:
+        return pkg_resources.get_distribution(name).version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+def get_version_stamp():
+    "Versions that the cached model depends upon"
+    return {
+        'cache_format': CACHE_FORMAT_VERSION,
+        'python': '.'.join([str(part) for part in sys.version_info[:3]]),
+        'paco': get_distribution_version('paco-cloud'),
+        'paco.models': get_distribution_version('paco.models'),
+    }
+
+def get_service_plugins():
+    "Sorted list of the installed paco.services entry points with their distribution versions"
+    import pkg_resources
+    plugins = []
+    for entry_point in pkg_resources.iter_entry_points('paco.services'):
+        version = None
+        if entry_point.dist != None:
+            version = entry_point.dist.version
+        plugins.append(f'{entry_point}@{version}')
+    return sorted(plugins)
+
+def fingerprint_project(project_path, previous_files):
+    """Fingerprint the files in a Paco project directory.
+    Contents are only hashed if a file's size or mtime differs from previous_files.
+    Returns the fingerprint and a dict of [size, mtime, hash] lists keyed by relative file path."""
+    files = {}
+    fingerprint = []
+    for root, dirs, filenames in os.walk(project_path, topdown=True):
+        dirs[:] = sorted([name for name in dirs if name not in EXCLUDE_DIRS])
+        for name in sorted(filenames):
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, project_path)
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            file_hash = ''
+            if name.endswith(CONTENT_HASH_SUFFIXES) or name in CONTENT_HASH_NAMES:
+                previous = previous_files.get(rel_path, None)
+                if previous != None and previous[0] == file_stat.st_size and previous[1] == file_stat.st_mtime_ns:
+                    file_hash = previous[2]
+                else:
+                    file_hash = md5sum(path)
+            files[rel_path] = [file_stat.st_size, file_stat.st_mtime_ns, file_hash]
+            if file_hash == '':
+                fingerprint.append(f'{rel_path}:{file_stat.st_size}:{file_stat.st_mtime_ns}')
+            else:
+                fingerprint.append(f'{rel_path}:{file_hash}')
+    return md5sum(str_data='\n'.join(fingerprint)), files
+
+def load_cache_info(info_path):
+    "Load the cache info file or return an empty dict"
+    if not info_path.exists():
+        return {}
+    try:
+        info = read_yaml_file(info_path)
+    except Exception:
+        return {}
+    if not isinstance(info, dict):
+        return {}
+    return info
+
+def load_cached_project(project_path, cache_path, warn=None, validate_local_paths=False, refresh=False):
     """
-    Creates or updates the paco model cache if any files have been modified since
-    the last cache time
+    Return the cached paco model if the project has not changed since it was cached,
+    otherwise load the project from YAML and cache it.
+    If refresh is True the cached model is not used.
     """
-    last_mtime = get_max_mtime(project_path, exclude=('build'))
-    cache_dir = os.path.join(project_path, "build")
-    mtime_cache_file = os.path.join(cache_dir, "cache_last_mtime.txt")
-    model_cache_file = os.path.join(cache_dir, "cache_model.pickle")
-    pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
-
-    # no last modified time cache file, so load project and cache it
-    if not os.path.isfile(mtime_cache_file):
-        with open(mtime_cache_file, 'w') as cache_file:
-            cache_file.write(str(last_mtime))
-        project = load_project_from_yaml(project_path)
-        with open(model_cache_file, 'wb') as model_cache_file:
-            pickle.dump(project, model_cache_file)
-
-    # already cached, either update the cache or use it
-    else:
-        with open(mtime_cache_file) as cache_file:
-            cache_mtime = cache_file.readlines()
-        cache_mtime = float(cache_mtime[0])
-        # if you CTRL-C right after running paco, you can create the mtime file but not the pickle cache
-        if cache_mtime < last_mtime or not os.path.isfile(model_cache_file):
-            # cache is stale
-            project = load_project_from_yaml(project_path)
-            with open(model_cache_file, 'wb') as model_cache_file:
-                pickle.dump(project, model_cache_file)
-            with open(mtime_cache_file, 'w') as cache_file:
-                cache_file.write(str(last_mtime))
-        else:
-            # good to go - return the cache
-            with open(model_cache_file, 'rb') as model_cache_file:
-                project = pickle.load(model_cache_file)
+    project_path = pathlib.Path(project_path)
+    cache_path = pathlib.Path(cache_path)
+    info_path = cache_path / 'model.yaml'
+    model_path = cache_path / 'model.pickle'
+    key = {
+        'versions': get_version_stamp(),
+        'services': get_service_plugins(),
+        'warn': bool(warn),
+        'validate_local_paths': bool(validate_local_paths),
+    }
+    info = load_cache_info(info_path)
+    fingerprint, files = fingerprint_project(project_path, info.get('files', None) or {})
+    if not refresh and info.get('key', None) == key and info.get('fingerprint', None) == fingerprint \
+        and model_path.exists():
+        try:
+            with open(model_path, 'rb') as model_fd:
+                return pickle.load(model_fd)
+        # an unreadable cache is replaced
+        except Exception:
+            pass
 
+    project = load_project_from_yaml(
+        project_path,
+        warn=warn,
+        validate_local_paths=validate_local_paths,
+    )
+    try:
+        model_data = pickle.dumps(project, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, RecursionError, TypeError, AttributeError):
+        # the model can not be cached
+        return project
+    cache_path.mkdir(parents=True, exist_ok=True)
+    model_path_new = model_path.with_name(model_path.name + '.new')
+    with open(model_path_new, 'wb') as model_fd:
+        model_fd.write(model_data)
+    model_path_new.rename(model_path)
+    write_to_file(cache_path, info_path.name, {
+        'key': key,
+        'fingerprint': fingerprint,
+        'files': files,
+    })
     return project
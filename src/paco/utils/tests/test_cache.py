@@ -0,0 +1,28 @@
+from paco.utils.cache import fingerprint_project
+import os
+import pathlib
+import tempfile
+import unittest
+
+
+class TestFingerprintProject(unittest.TestCase):
+
+    def setUp(self):
+        self.project_path = pathlib.Path(tempfile.mkdtemp())
+        (self.project_path / 'project.yaml').write_text('name: test\n')
+        (self.project_path / 'netenv').mkdir()
+        (self.project_path / 'netenv' / 'mynet.yaml').write_text('network: {}\n')
+        (self.project_path / '.paco-work').mkdir()
+        (self.project_path / '.paco-work' / 'state.yaml').write_text('ignored: true\n')
+
+    def test_fingerprint(self):
+        fingerprint, files = fingerprint_project(self.project_path, {})
+        self.assertEqual(sorted(files.keys()), ['netenv/mynet.yaml', 'project.yaml'])
+        # touching a YAML file without changing it keeps the fingerprint
+        os.utime(self.project_path / 'project.yaml', ns=(0, 0))
+        self.assertEqual(fingerprint_project(self.project_path, files)[0], fingerprint)
+        # work files are not part of the fingerprint
+        (self.project_path / '.paco-work' / 'state.yaml').write_text('ignored: false\n')
+        self.assertEqual(fingerprint_project(self.project_path, files)[0], fingerprint)
+        (self.project_path / 'netenv' / 'mynet.yaml').write_text('network: {vpc: {}}\n')
+        self.assertNotEqual(fingerprint_project(self.project_path, files)[0], fingerprint)
@@ -0,0 +1,49 @@
+from paco.stack.stack import Stack
+from paco.utils.yaml_diff import diff_yaml_files
+import contextlib
+import io
+import pathlib
+import tempfile
+import unittest
+
+
+class TestDiffYAMLFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.path = pathlib.Path(tempfile.mkdtemp())
+        self.applied_path = self.path / 'applied.yaml'
+        self.new_path = self.path / 'new.yaml'
+        self.applied_path.write_text("""Resources:
+  Bucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: !Sub '${AWS::StackName}-bucket'
+  Role:
+    Type: AWS::IAM::Role
+    Properties:
+      Path: /
+      RoleName: !Join ['-', [!Ref 'AWS::StackName', 'role']]
+""")
+
+    def test_same_files(self):
+        self.new_path.write_text(self.applied_path.read_text())
+        self.assertEqual(diff_yaml_files(self.applied_path, self.new_path), None)
+        # formatting changes are not changes
+        self.new_path.write_text(self.applied_path.read_text().replace("'", ''))
+        self.assertEqual(diff_yaml_files(self.applied_path, self.new_path), None)
+
+    def test_changed_resource(self):
+        self.new_path.write_text(self.applied_path.read_text().replace('-bucket', '-logs'))
+        deep_diff = diff_yaml_files(self.applied_path, self.new_path)
+        self.assertEqual(list(deep_diff.keys()), ['values_changed'])
+        change = list(deep_diff['values_changed'])[0]
+        self.assertEqual(change.path(), "root['Resources']['Bucket']['Properties']['BucketName']")
+        self.assertEqual(change.t2, '!Sub ${AWS::StackName}-logs')
+
+    def test_changed_path_printed(self):
+        self.new_path.write_text(self.applied_path.read_text().replace("'role'", "'admin'"))
+        deep_diff = diff_yaml_files(self.applied_path, self.new_path)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            Stack.print_diff_object(Stack.__new__(Stack), deep_diff, 'values_changed')
+        self.assertIn('  Role.Properties.RoleName.!Join.1.1:', output.getvalue())
@@ -0,0 +1,58 @@
+"""
+Diff an applied YAML file against a new YAML file.
+
+Files with the same MD5 are not loaded. Otherwise each top-level entry, and each entry
+of the top-level mappings such as the Resources of a CloudFormation template, is hashed
+and only the entries with different hashes are given to DeepDiff.
+"""
+
+from paco.core.cfn_yaml import load_yaml_file
+from paco.utils import md5sum
+import json
+
+
+def hash_value(value):
+    "MD5 of a loaded YAML value"
+    return md5sum(str_data=json.dumps(value, sort_keys=True, default=str))
+
+def remove_unchanged_entries(applied, new):
+    "Return copies of two dicts without the entries that have the same hash in both"
+    applied_changed = {}
+    new_changed = {}
+    for key, value in applied.items():
+        if key not in new or hash_value(value) != hash_value(new[key]):
+            applied_changed[key] = value
+    for key, value in new.items():
+        if key not in applied or key in applied_changed:
+            new_changed[key] = value
+    return applied_changed, new_changed
+
+def remove_unchanged(applied, new):
+    """Remove the top-level entries, and the entries of top-level mappings, that are the same
+    in both documents. The paths of the remaining entries do not change."""
+    if not isinstance(applied, dict) or not isinstance(new, dict):
+        return applied, new
+    applied, new = remove_unchanged_entries(applied, new)
+    for key in applied.keys():
+        if key in new and isinstance(applied[key], dict) and isinstance(new[key], dict):
+            applied[key], new[key] = remove_unchanged_entries(applied[key], new[key])
+    return applied, new
+
+def diff_yaml_files(applied_file_path, new_file_path):
+    "Return a DeepDiff tree view of the changes between two YAML files, or None if they are the same"
+    if md5sum(applied_file_path) == md5sum(new_file_path):
+        return None
+    applied, new = remove_unchanged(
+        load_yaml_file(applied_file_path),
+        load_yaml_file(new_file_path),
+    )
+    from deepdiff import DeepDiff
+    deep_diff = DeepDiff(
+        applied,
+        new,
+        verbose_level=1,
+        view='tree'
+    )
+    if len(deep_diff.keys()) == 0:
+        return None
+    return deep_diff
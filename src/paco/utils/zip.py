@@ -1,55 +1,49 @@
-import shutil
 import os
-
-
-def patched_make_zipfile(base_name, base_dir, verbose=0, dry_run=0, logger=None):
-    """Modified from the original to include symlinks, and also to filter
-    out files which don't make sense in Python zip files, e.g. __pycache__
-
-    Create a zip file from all the files under 'base_dir'.
-
-    The output zip file will be named 'base_name' + ".zip".  Returns the
-    name of the output zip file.
-    """
-    import zipfile  # late import for breaking circular dependency
-
-    zip_filename = base_name
-    archive_dir = os.path.dirname(base_name)
-
-    if archive_dir and not os.path.exists(archive_dir):
-        if logger is not None:
-            logger.info("creating %s", archive_dir)
-        if not dry_run:
-            os.makedirs(archive_dir)
-
-    if logger is not None:
-        logger.info("creating '%s' and adding '%s' to it",
-                    zip_filename, base_dir)
-    if not dry_run:
-        with zipfile.ZipFile(zip_filename, "w",
-                             compression=zipfile.ZIP_DEFLATED) as zf:
-            path = os.path.normpath(base_dir)
-            if path != os.curdir:
-                zf.write(path, path)
-                if logger is not None:
-                    logger.info("adding '%s'", path)
-            # Here be a monkey patch: added followlinks=True
-            for dirpath, dirnames, filenames in os.walk(base_dir, followlinks=True):
-                for name in sorted(dirnames):
-                    if name == '__pycache__':
-                        continue
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    zf.write(path, path)
-                    if logger is not None:
-                        logger.info("adding '%s'", path)
-                for name in filenames:
-                    if name.endswith('.pyc'):
-                        continue
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    if os.path.isfile(path):
-                        zf.write(path, path)
-                        if logger is not None:
-                            logger.info("adding '%s'", path)
-
+import stat
+import zipfile
+
+
+# Zip entries are written with a fixed timestamp so that the same files always create the same zip
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+def list_zip_entries(src_dir):
+    """Return a sorted list of (archive name, path) tuples for the directories and files under src_dir.
+    Symlinks are followed and files which don't make sense in Python zip files, e.g. __pycache__, are skipped."""
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(src_dir, followlinks=True):
+        dirnames[:] = sorted([name for name in dirnames if name != '__pycache__'])
+        for name in dirnames:
+            path = os.path.join(dirpath, name)
+            entries.append((os.path.relpath(path, src_dir), path))
+        for name in sorted(filenames):
+            if name.endswith('.pyc'):
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.isfile(path):
+                entries.append((os.path.relpath(path, src_dir), path))
+    return entries
+
+def write_zip_entry(zf, path, arcname):
+    "Add a file or directory to an open ZipFile with a fixed timestamp"
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    if os.path.isdir(path):
+        zinfo = zipfile.ZipInfo(arcname.rstrip('/') + '/', ZIP_DATE_TIME)
+        zinfo.external_attr = (stat.S_IFDIR | mode) << 16 | 0x10
+        zf.writestr(zinfo, b'')
+    else:
+        zinfo = zipfile.ZipInfo(arcname, ZIP_DATE_TIME)
+        zinfo.external_attr = (stat.S_IFREG | mode) << 16
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        with open(path, 'rb') as fd:
+            zf.writestr(zinfo, fd.read())
+
+def make_zipfile(zip_filename, src_dir):
+    """Create a byte-reproducible zip file of the files under src_dir.
+    Entries are sorted, have fixed timestamps and are named relative to src_dir."""
+    archive_dir = os.path.dirname(zip_filename)
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+    with zipfile.ZipFile(zip_filename, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for arcname, path in list_zip_entries(src_dir):
+            write_zip_entry(zf, path, arcname)
     return zip_filename
-